@@ -3,8 +3,6 @@
 Analyze disease causes in IHME data files
 """
 
-import csv
-import glob
 from pathlib import Path
 from collections import Counter
 
@@ -12,10 +10,10 @@ from collections import Counter
 import os
 os.chdir(Path(__file__).parent)
 
-portfolios_dir = Path('Portfolios')
+import data_access
 
 # Check original IHME files
-ihme_files = sorted(portfolios_dir.glob('IHME-GBD_2021_DATA-*.csv'))
+ihme_files = data_access.ihme_files('IHME-GBD_2021_DATA-*.csv')
 
 print(f"Checking {len(ihme_files)} original IHME files...")
 
@@ -26,20 +24,14 @@ measure_cause_combos = []
 for ihme_file in ihme_files[:2]:
     print(f"\nAnalyzing {ihme_file.name}...")
 
-    with open(ihme_file, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
+    table = data_access.load_csv(ihme_file)
 
-        for row in reader:
-            cause = row.get('cause_name', '')
-            measure = row.get('measure_name', '')
-
-            if cause:
-                causes.add(cause)
-                measure_cause_combos.append((measure, cause))
-
-            # Just sample first 1000 rows per file
-            if reader.line_num > 1000:
-                break
+    # Just sample first 1000 rows per file
+    sample = slice(0, 1000)
+    for measure, cause in zip(table.column('measure_name')[sample], table.column('cause_name')[sample]):
+        if cause:
+            causes.add(cause)
+            measure_cause_combos.append((measure, cause))
 
 print(f"\n{'='*60}")
 print(f"Total unique causes found: {len(causes)}")
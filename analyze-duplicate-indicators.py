@@ -5,32 +5,27 @@ have the most recent data. Prioritize the most recent data sources.
 """
 
 import json
-from pathlib import Path
 from collections import defaultdict
 
+import data_access
+
 def get_year_range(compiled_data, filename):
     """Get the year range available in a data file."""
-    if filename not in compiled_data or not compiled_data[filename]:
+    table = compiled_data.get(filename)
+    if table is None or not len(table):
         return None, None
 
     years = set()
-    for row in compiled_data[filename]:
-        # Try different year column names
-        year_value = None
-        if 'year' in row and row['year']:
-            year_value = row['year']
-        elif 'YEAR' in row and row['YEAR']:
-            year_value = row['YEAR']
-        elif 'DIM_TIME' in row and row['DIM_TIME']:
-            year_value = row['DIM_TIME']
-        elif 'Year' in row and row['Year']:
-            year_value = row['Year']
-
-        if year_value:
+    # Try different year column names
+    for column in ('year', 'YEAR', 'DIM_TIME', 'Year'):
+        if column not in table.fieldnames:
+            continue
+        for year_value in table.values(column):
             try:
                 years.add(int(year_value))
             except (ValueError, TypeError):
                 pass
+        break
 
     if not years:
         return None, None
@@ -53,8 +48,7 @@ def analyze_indicators():
         config = json.load(f)
 
     # Load compiled data
-    with open('data/compiled-indicators.json', 'r', encoding='utf-8') as f:
-        compiled_data = json.load(f)
+    compiled_data = data_access.load_compiled()
 
     print("=" * 80)
     print("INDICATOR DUPLICATE & RECENCY ANALYSIS")
@@ -1,9 +1,8 @@
 #!/usr/bin/env python3
 """Analyze the 5 new IHME 2023 files"""
 
-import csv
-from pathlib import Path
-from collections import defaultdict
+import country_portfolios
+import data_access
 
 new_files = [
     'IHME-GBD_2023_DATA-1e52c43e-1.csv',
@@ -13,82 +12,55 @@ new_files = [
     'IHME-GBD_2023_DATA-b0091085-1.csv'
 ]
 
-portfolios_dir = Path('Portfolios')
-
-TARGET_COUNTRIES = [
-    'Afghanistan', 'Bangladesh', 'Burkina Faso', 'Cameroon',
-    'Central African Republic', 'Chad', 'Colombia', 'Congo DR',
-    'Ethiopia', 'Haiti', 'Lebanon', 'Mali', 'Mozambique', 'Myanmar',
-    'Niger', 'Nigeria', 'Pakistan', 'Somalia', 'South Sudan', 'Sudan',
-    'Syria', 'Uganda', 'Ukraine', 'Venezuela', 'Yemen'
-]
+# Target countries of the default portfolio (data/portfolios.json)
+TARGET_COUNTRIES = country_portfolios.countries()
 
 for filename in new_files:
-    filepath = portfolios_dir / filename
+    filepath = data_access.PORTFOLIOS_DIR / filename
     print(f"\n{'='*60}")
     print(f"FILE: {filename}")
     print('='*60)
 
     try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-
-            measures = set()
-            years = set()
-            countries = set()
-            ages = set()
-            sexes = set()
-            metrics = set()
-            causes = set()
-            reis = set()
-
-            row_count = 0
-            target_country_rows = 0
+        table = data_access.load_csv(filepath)
 
-            for row in reader:
-                row_count += 1
+        # Collect unique values
+        measures = table.values('measure_name')
+        years = table.values('year')
+        # Compare in the app's spellings (IHME writes e.g. 'Syrian Arab Republic')
+        countries = {country_portfolios.normalize(c) for c in table.values('location_name')}
+        ages = table.values('age_name')
+        sexes = table.values('sex_name')
+        metrics = table.values('metric_name')
+        causes = table.values('cause_name')
+        reis = table.values('rei_name')
 
-                # Collect unique values
-                if row.get('measure_name'):
-                    measures.add(row['measure_name'])
-                if row.get('year'):
-                    years.add(row['year'])
-                if row.get('location_name'):
-                    countries.add(row['location_name'])
-                if row.get('age_name'):
-                    ages.add(row['age_name'])
-                if row.get('sex_name'):
-                    sexes.add(row['sex_name'])
-                if row.get('metric_name'):
-                    metrics.add(row['metric_name'])
-                if row.get('cause_name'):
-                    causes.add(row['cause_name'])
-                if row.get('rei_name'):
-                    reis.add(row['rei_name'])
+        row_count = len(table)
 
-                # Check if target country
-                if row.get('location_name') in TARGET_COUNTRIES:
-                    target_country_rows += 1
+        # Check if target country
+        target_countries = set(TARGET_COUNTRIES)
+        target_country_rows = sum(len(positions) for c, positions in table.index('location_name').items()
+                                  if country_portfolios.normalize(c) in target_countries)
 
-            print(f"\nTotal rows: {row_count}")
-            print(f"Target country rows: {target_country_rows}")
-            print(f"\nYears: {sorted(years)}")
-            print(f"\nMeasures: {sorted(measures)}")
-            print(f"\nMetrics: {sorted(metrics)}")
-            print(f"\nSexes: {sorted(sexes)}")
-            print(f"\nAges (sample): {sorted(list(ages))[:10]}")
+        print(f"\nTotal rows: {row_count}")
+        print(f"Target country rows: {target_country_rows}")
+        print(f"\nYears: {sorted(years)}")
+        print(f"\nMeasures: {sorted(measures)}")
+        print(f"\nMetrics: {sorted(metrics)}")
+        print(f"\nSexes: {sorted(sexes)}")
+        print(f"\nAges (sample): {sorted(list(ages))[:10]}")
 
-            if causes:
-                print(f"\nCauses (sample): {sorted(list(causes))[:5]}")
-            if reis:
-                print(f"\nRisk factors (sample): {sorted(list(reis))[:5]}")
+        if causes:
+            print(f"\nCauses (sample): {sorted(list(causes))[:5]}")
+        if reis:
+            print(f"\nRisk factors (sample): {sorted(list(reis))[:5]}")
 
-            # Check target countries coverage
-            target_in_file = [c for c in TARGET_COUNTRIES if c in countries]
-            print(f"\nTarget countries in file: {len(target_in_file)}/25")
-            if len(target_in_file) < 25:
-                missing = [c for c in TARGET_COUNTRIES if c not in countries]
-                print(f"Missing: {', '.join(missing)}")
+        # Check target countries coverage
+        target_in_file = [c for c in TARGET_COUNTRIES if c in countries]
+        print(f"\nTarget countries in file: {len(target_in_file)}/{len(TARGET_COUNTRIES)}")
+        if len(target_in_file) < len(TARGET_COUNTRIES):
+            missing = [c for c in TARGET_COUNTRIES if c not in countries]
+            print(f"Missing: {', '.join(missing)}")
 
     except Exception as e:
         print(f"ERROR: {e}")
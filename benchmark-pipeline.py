@@ -0,0 +1,470 @@
+#!/usr/bin/env python3
+"""
+Benchmark the build pipeline on synthetic data at several scales
+
+For every scenario (a row scale and a country count) synthetic WHO-,
+World Bank- and IHME-shaped CSVs are generated from the files in
+Portfolios/: each source is used as a template (its header, indicator
+codes and dimension values) and replicated `scale` times, with countries
+spread over `countries` names (the real ones first, then "Synthetic
+Country NNN"), years shifted (World Bank: series codes suffixed) so
+replicas do not collide, and values jittered. The data is written under
+.build-cache/benchmark/ and reused while the templates are unchanged.
+
+Each stage then runs in a fresh process against the scenario directory:
+
+  consolidate-ihme     consolidate-all-ihme.py
+  consolidate-stream   consolidate-all-ihme.py --stream
+  compile-projected    compile-data.py --project --reduce-who
+  compile              compile-data.py
+  duplicate-analysis   analyze-duplicate-indicators.py (cold data-access cache)
+
+recording wall time (best of --repeat runs), throughput over the stage's
+input and peak RSS. Results are compared with benchmark-baselines.json
+(written by --save-baseline); a stage slower or larger than its baseline
+by more than --threshold is reported as a regression and the exit status
+is 1. Everything runs offline with the standard library (Linux/Unix, for
+resource peak RSS).
+
+  python benchmark-pipeline.py                         # scale 1, 25 and 200 countries
+  python benchmark-pipeline.py --scale 1 --scale 10 --scale 100 --countries 200
+  python benchmark-pipeline.py --save-baseline         # record this machine's baseline
+"""
+
+import argparse
+import contextlib
+import csv
+import importlib.util
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import country_portfolios
+from long_format import WB_YEAR_COLUMN, WHO_VALUE_COLUMNS
+
+ROOT = Path(__file__).resolve().parent
+TEMPLATE_DIR = ROOT / 'Portfolios'
+WORK_DIR = ROOT / '.build-cache' / 'benchmark'
+BASELINE_FILE = ROOT / 'benchmark-baselines.json'
+SYNTHETIC_MANIFEST = 'synthetic.json'
+
+# Bump when the generated data changes shape, so cached scenarios are rebuilt
+GENERATOR_VERSION = 1
+
+# Source files generated for each scenario (compile-data.py and consolidate-all-ihme.py inputs)
+TEMPLATE_PATTERNS = ['*_ALL_LATEST.csv', 'WB Data 25b.csv', 'IHME*.csv']
+
+# Config the stages read relative to the working directory
+CONFIG_FILES = ['indicator-categories.json', 'who-dimension-spec.json']
+
+# (country name, country code, year) columns per source shape
+COUNTRY_COLUMNS = {
+    'who': ('GEO_NAME_SHORT', 'DIM_GEO_CODE_M49', 'DIM_TIME'),
+    'wb': ('Country Name', 'Country Code', None),
+    'ihme': ('location_name', 'location_id', 'year'),
+}
+
+IHME_VALUE_COLUMNS = ['val', 'lower', 'upper']
+
+# Stages in the order they run (duplicate-analysis reads compile's output)
+STAGES = ['consolidate-ihme', 'consolidate-stream', 'compile-projected', 'compile', 'duplicate-analysis']
+
+# Relative jitter applied to synthetic values
+VALUE_JITTER = 0.05
+
+
+def load_script(file_name):
+    """Import one of the hyphen-named pipeline scripts as a module"""
+    path = ROOT / file_name
+    spec = importlib.util.spec_from_file_location(path.stem.replace('-', '_'), path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def target_names():
+    """Every spelling of a country of the default portfolio"""
+    return set(country_portfolios.spellings(country_portfolios.countries()))
+
+
+def template_files():
+    """Source files the synthetic data is modelled on, sorted by name"""
+    templates = set()
+    for pattern in TEMPLATE_PATTERNS:
+        templates.update(TEMPLATE_DIR.glob(pattern))
+    return sorted(templates)
+
+
+def source_kind(header):
+    """'ihme', 'who' or 'wb' from a CSV header"""
+    if 'location_name' in header:
+        return 'ihme'
+    if 'GEO_NAME_SHORT' in header:
+        return 'who'
+    return 'wb'
+
+
+def jitter(value, rng):
+    """A numeric string scaled by a small random factor; other strings unchanged"""
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return value
+    return format(number * (1 + rng.uniform(-VALUE_JITTER, VALUE_JITTER)), '.8g')
+
+
+def synthesize_file(template, target, scale, countries, seed, targets):
+    """Write a synthetic copy of template with `scale` replicas over `countries` names
+
+    Countries of the template take slots in first-seen order, target
+    countries first; replica r of a row goes to slot (original slot + r *
+    template countries) modulo `countries`, and each time a slot is
+    reused the year moves back one (World Bank rows, which hold all years,
+    get a suffixed series code instead). Returns {'rows', 'bytes', 'countries'}.
+    """
+    with open(template, 'r', encoding='utf-8', newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        rows = [values for values in reader if values]
+
+    kind = source_kind(header)
+    columns = {name: i for i, name in enumerate(header)}
+    name_i, code_i, year_i = (columns.get(c) for c in COUNTRY_COLUMNS[kind])
+    if kind == 'who':
+        value_columns = [columns[c] for c in WHO_VALUE_COLUMNS if c in columns]
+    elif kind == 'ihme':
+        value_columns = [columns[c] for c in IHME_VALUE_COLUMNS if c in columns]
+    else:
+        value_columns = [i for i, name in enumerate(header) if WB_YEAR_COLUMN.match(name)]
+    series_i, series_name_i = columns.get('Series Code'), columns.get('Series Name')
+
+    names = list(dict.fromkeys(values[name_i] for values in rows if len(values) > name_i))
+    names.sort(key=lambda name: name not in targets)
+    slots = {name: i for i, name in enumerate(names)}
+    codes = {}
+    if code_i is not None:
+        for values in rows:
+            if len(values) > code_i:
+                codes.setdefault(values[name_i], values[code_i])
+
+    universe = countries or len(names) or 1
+    rng = random.Random(f'{seed}:{template.name}')
+    used = set()
+    written = 0
+
+    with open(target, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        for replica in range(scale):
+            for values in rows:
+                if len(values) <= name_i:
+                    continue
+                position = slots[values[name_i]] + replica * len(names)
+                slot, wrap = position % universe, position // universe
+                out = list(values)
+
+                name = names[slot] if slot < len(names) else f'Synthetic Country {slot:03d}'
+                out[name_i] = name
+                if code_i is not None and code_i < len(out):
+                    out[code_i] = codes.get(name, f'X{slot:03d}')
+                if wrap:
+                    if year_i is not None and out[year_i].isdigit():
+                        out[year_i] = str(int(out[year_i]) - wrap)
+                    elif series_i is not None:
+                        out[series_i] = f'{out[series_i]}.S{wrap}'
+                        out[series_name_i] = f'{out[series_name_i]} (synthetic {wrap})'
+                for i in value_columns:
+                    if i < len(out):
+                        out[i] = jitter(out[i], rng)
+
+                writer.writerow(out)
+                used.add(slot)
+                written += 1
+
+    return {'rows': written, 'bytes': target.stat().st_size, 'countries': len(used)}
+
+
+def template_signature(templates):
+    """Size and mtime of each template, to detect when cached scenarios are stale"""
+    return {t.name: [t.stat().st_size, t.stat().st_mtime_ns] for t in templates}
+
+
+def prepare_scenario(scale, countries, seed, jobs):
+    """Generate (or reuse) a scenario's synthetic data; returns (directory, manifest)"""
+    directory = WORK_DIR / f'scale-{scale}-countries-{countries}'
+    manifest_file = directory / SYNTHETIC_MANIFEST
+    templates = template_files()
+    expected = {
+        'version': GENERATOR_VERSION,
+        'scale': scale,
+        'countries': countries,
+        'seed': seed,
+        'templates': template_signature(templates)
+    }
+
+    (directory / 'data').mkdir(parents=True, exist_ok=True)
+    for name in CONFIG_FILES:
+        shutil.copyfile(ROOT / 'data' / name, directory / 'data' / name)
+
+    if manifest_file.exists():
+        with open(manifest_file, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if {key: manifest.get(key) for key in expected} == expected:
+            return directory, manifest
+
+    portfolios = directory / 'Portfolios'
+    shutil.rmtree(portfolios, ignore_errors=True)
+    portfolios.mkdir()
+
+    template_mb = sum(t.stat().st_size for t in templates) / (1024 * 1024)
+    print(f"Generating {len(templates)} synthetic files in {directory.relative_to(ROOT)}/ "
+          f"(about {template_mb * scale:,.0f} MB)...")
+    start = time.perf_counter()
+
+    targets = target_names()
+    arguments = [(t, portfolios / t.name, scale, countries, seed, targets) for t in templates]
+    if jobs > 1 and len(arguments) > 1:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(arguments))) as pool:
+            stats = list(pool.map(synthesize_file, *zip(*arguments)))
+    else:
+        stats = [synthesize_file(*a) for a in arguments]
+
+    manifest = dict(expected, files=dict(zip((t.name for t in templates), stats)))
+    with open(manifest_file, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1)
+
+    rows = sum(s['rows'] for s in stats)
+    print(f"   {rows:,} rows in {time.perf_counter() - start:.1f}s")
+    return directory, manifest
+
+
+def input_totals(manifest, names):
+    """(rows, bytes) of the generated files with the given names"""
+    files = [manifest['files'][name] for name in names if name in manifest['files']]
+    return sum(f['rows'] for f in files), sum(f['bytes'] for f in files)
+
+
+def compile_inputs(manifest, compile_data):
+    """(rows, bytes) of the files compile-data.py reads"""
+    names = [f.name for f in compile_data.get_source_files(Path('Portfolios')) if f.exists()]
+    return input_totals(manifest, names)
+
+
+def run_stage(name, manifest):
+    """Run one stage in this process (cwd = scenario directory); returns (rows, bytes) read"""
+    if name in ('consolidate-ihme', 'consolidate-stream'):
+        consolidate = load_script('consolidate-all-ihme.py')
+        # Write beside the scenario, not over the compile input in Portfolios/
+        consolidate.output_file = Path('consolidated-ihme.csv')
+        ihme_files = sorted(consolidate.portfolios_dir.glob('IHME*.csv'))
+        consolidate.consolidate(stream=name == 'consolidate-stream')
+        return input_totals(manifest, [f.name for f in ihme_files])
+
+    if name in ('compile', 'compile-projected'):
+        compile_data = load_script('compile-data.py')
+        projected = name == 'compile-projected'
+        compile_data.compile_data(project=projected, reduce_who=projected)
+        return compile_inputs(manifest, compile_data)
+
+    if name == 'duplicate-analysis':
+        import data_access
+        data_access.CACHE_DIR = Path('.build-cache') / 'data-access'
+        shutil.rmtree(data_access.CACHE_DIR, ignore_errors=True)
+        analysis = load_script('analyze-duplicate-indicators.py')
+        compiled_file = data_access.COMPILED_FILE
+        analysis.analyze_indicators()
+        tables = data_access.load_compiled()
+        return sum(len(t) for t in tables.values()), compiled_file.stat().st_size
+
+    raise ValueError(f"Unknown stage: {name}")
+
+
+def stage_main(name, directory):
+    """Child process entry point: run a stage quietly and print its measurements as JSON"""
+    os.chdir(directory)
+    with open(SYNTHETIC_MANIFEST, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        rows, size = run_stage(name, manifest)
+        seconds = time.perf_counter() - start
+
+    # ru_maxrss is in KB on Linux; include worker processes, if any
+    peak_kb = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                  resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    print(json.dumps({'seconds': seconds, 'rows': rows, 'bytes': size,
+                      'peak_rss_mb': peak_kb / 1024}))
+
+
+def measure_stage(name, directory, repeat):
+    """Run a stage `repeat` times in fresh processes; best time, highest peak RSS"""
+    runs = []
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, str(Path(__file__).resolve()), '--run-stage', name,
+             '--workdir', str(directory)],
+            capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"Stage {name} failed:\n{result.stderr.strip()}")
+        runs.append(json.loads(result.stdout.strip().splitlines()[-1]))
+
+    seconds = min(run['seconds'] for run in runs)
+    rows, size = runs[0]['rows'], runs[0]['bytes']
+    return {
+        'seconds': round(seconds, 4),
+        'runs': [round(run['seconds'], 4) for run in runs],
+        'rows': rows,
+        'bytes': size,
+        'rows_per_s': round(rows / seconds) if seconds else None,
+        'mb_per_s': round(size / (1024 * 1024) / seconds, 2) if seconds else None,
+        'peak_rss_mb': round(max(run['peak_rss_mb'] for run in runs), 1)
+    }
+
+
+def scenario_key(scale, countries):
+    return f'scale={scale} countries={countries}'
+
+
+def compare(result, baseline, threshold):
+    """Change against a baseline stage entry: (text, regressed)"""
+    if not baseline:
+        return 'no baseline', False
+    time_change = result['seconds'] / baseline['seconds'] - 1 if baseline['seconds'] else 0
+    memory_change = (result['peak_rss_mb'] / baseline['peak_rss_mb'] - 1
+                     if baseline['peak_rss_mb'] else 0)
+    regressed = time_change > threshold or memory_change > threshold
+    text = f"time {time_change:+.0%}, memory {memory_change:+.0%}"
+    return text + ('  REGRESSION' if regressed else ''), regressed
+
+
+def print_scenario(key, manifest, stages, baselines, threshold):
+    """Print one scenario's results; returns the number of regressions"""
+    rows, size = input_totals(manifest, manifest['files'])
+    countries = max(f['countries'] for f in manifest['files'].values())
+    print(f"\n{key}: {len(manifest['files'])} files, {rows:,} rows, "
+          f"{size / (1024 * 1024):,.1f} MB, up to {countries} countries per file")
+    print(f"  {'stage':<20} {'time (s)':>9} {'rows/s':>11} {'MB/s':>7} {'peak MB':>8}  vs baseline")
+
+    regressions = 0
+    for name, result in stages.items():
+        text, regressed = compare(result, baselines.get(name), threshold)
+        regressions += regressed
+        print(f"  {name:<20} {result['seconds']:>9.2f} {result['rows_per_s'] or 0:>11,} "
+              f"{result['mb_per_s'] or 0:>7.1f} {result['peak_rss_mb']:>8.1f}  {text}")
+    return regressions
+
+
+def load_baselines():
+    if not BASELINE_FILE.exists():
+        return {}
+    with open(BASELINE_FILE, 'r', encoding='utf-8') as f:
+        return json.load(f).get('scenarios', {})
+
+
+def save_baselines(results):
+    """Merge these results into the baseline file (other scenarios are kept)"""
+    scenarios = load_baselines()
+    for key, stages in results.items():
+        scenarios.setdefault(key, {}).update(
+            (name, {'seconds': r['seconds'], 'peak_rss_mb': r['peak_rss_mb']})
+            for name, r in stages.items())
+
+    with open(BASELINE_FILE, 'w', encoding='utf-8') as f:
+        json.dump({
+            'version': 1,
+            'machine': f"{platform.machine()} {platform.system()}, {os.cpu_count()} CPUs",
+            'python': platform.python_version(),
+            'scenarios': dict(sorted(scenarios.items()))
+        }, f, indent=1)
+    print(f"\nBaselines written to {BASELINE_FILE.name}")
+
+
+def benchmark(scales, country_counts, stages, repeat, threshold, seed, jobs,
+              save_baseline=False, output=None):
+    baselines = load_baselines()
+    results = {}
+    regressions = 0
+
+    for scale in scales:
+        for countries in country_counts:
+            directory, manifest = prepare_scenario(scale, countries, seed, jobs)
+            key = scenario_key(scale, countries)
+            results[key] = {name: measure_stage(name, directory, repeat)
+                            for name in STAGES if name in stages}
+            regressions += print_scenario(key, manifest, results[key],
+                                          baselines.get(key, {}), threshold)
+
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=1)
+        print(f"\nResults written to {output}")
+
+    if save_baseline:
+        save_baselines(results)
+        return 0
+
+    if regressions:
+        print(f"\n{regressions} stage(s) regressed by more than {threshold:.0%}")
+        return 1
+    return 0
+
+
+def job_count(value):
+    """argparse type for --jobs: a positive integer, or 0 for one per CPU"""
+    jobs = int(value)
+    if jobs < 0:
+        raise argparse.ArgumentTypeError('must be >= 0')
+    return jobs or os.cpu_count() or 1
+
+
+def positive_int(value):
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError('must be >= 1')
+    return number
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scale', type=positive_int, action='append',
+                        help='row multiplier over the current sources (repeatable; default: 1)')
+    parser.add_argument('--countries', type=positive_int, action='append',
+                        help='countries the rows are spread over (repeatable; default: 25 and 200)')
+    parser.add_argument('--stage', choices=STAGES, action='append',
+                        help='limit to a stage (repeatable; default: all)')
+    parser.add_argument('--repeat', type=positive_int, default=3,
+                        help='runs per stage; the fastest is reported (default: 3)')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='relative slowdown or memory growth reported as a regression '
+                             '(default: 0.25)')
+    parser.add_argument('--seed', type=int, default=0, help='synthetic data seed (default: 0)')
+    parser.add_argument('-j', '--jobs', type=job_count, default=0,
+                        help='generate files in N worker processes (default 0 = one per CPU)')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help=f'record the results as the baseline in {BASELINE_FILE.name}')
+    parser.add_argument('--output', type=Path, help='also write the results as JSON')
+    # Internal: run one stage in a child process
+    parser.add_argument('--run-stage', choices=STAGES, help=argparse.SUPPRESS)
+    parser.add_argument('--workdir', type=Path, help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    if args.run_stage:
+        stage_main(args.run_stage, args.workdir)
+        sys.exit(0)
+
+    sys.exit(benchmark(scales=args.scale or [1], country_counts=args.countries or [25, 200],
+                       stages=args.stage or STAGES, repeat=args.repeat,
+                       threshold=args.threshold, seed=args.seed, jobs=args.jobs,
+                       save_baseline=args.save_baseline, output=args.output))
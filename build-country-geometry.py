@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+Build the compact country geometry artifact the map draws from
+
+Reads data/countries.geojson, keeps the countries configured in
+data/indicator-categories.json (matched by ISO3; Somaliland is drawn as
+part of Somalia) and writes data/country-geometry.json:
+
+  {
+    "version": 1,
+    "transform": {"scale": [sx, sy], "translate": [x0, y0]},
+    "countries": {"AFG": {"name", "centroid": [lat, lng], "bbox": [w, s, e, n]}},
+    "geometries": {"AFG": [polygon, ...]},    polygon = [ring, ...], ring = [arc index, ...]
+    "levels": [{"name", "tolerance", "minZoom", "arcs": [[[x, y], [dx, dy], ...], ...]}]
+  }
+
+As in TopoJSON, coordinates are quantised to integers, rings are cut into
+arcs at the points where neighbouring borders meet, arcs shared by two
+countries are stored once (~index means the arc reversed) and each arc
+is delta-encoded. Every level holds the same arcs simplified with
+Douglas-Peucker at its own tolerance; arc endpoints are always kept, so
+neighbouring countries stay gap-free at every level. js/app.js decodes
+the level matching the current zoom.
+"""
+
+import json
+import os
+from pathlib import Path
+
+SOURCE_FILE = Path('data') / 'countries.geojson'
+CATEGORIES_FILE = Path('data') / 'indicator-categories.json'
+OUTPUT_FILE = Path('data') / 'country-geometry.json'
+
+# Written by package-artifacts.py; invalidated when the geometry is rebuilt
+ARTIFACT_MANIFEST_FILE = Path('data') / 'artifacts-manifest.json'
+
+# Quantisation grid (points per axis over the selected countries' extent)
+QUANTIZATION = 100000
+
+# Simplification levels (tolerance in degrees), coarsest first
+LEVELS = [
+    {'name': 'low', 'tolerance': 0.1, 'minZoom': 0},
+    {'name': 'medium', 'tolerance': 0.02, 'minZoom': 4},
+    {'name': 'high', 'tolerance': 0.004, 'minZoom': 6},
+]
+
+# Features drawn as part of another country (ISO3 of the feature -> ISO3 drawn as)
+MERGED_FEATURES = {'SOL': 'SOM'}  # Somaliland
+
+
+def feature_codes(properties):
+    """ISO3 codes a Natural Earth feature can be matched on"""
+    codes = [properties.get(key) for key in ('ISO_A3', 'ADM0_A3', 'ADM0_A3_US')]
+    codes = [MERGED_FEATURES.get(code, code) for code in codes if code and code != '-99']
+    return codes
+
+
+def feature_polygons(geometry):
+    """Polygon and MultiPolygon geometries as a list of polygons (lists of rings)"""
+    if geometry['type'] == 'Polygon':
+        return [geometry['coordinates']]
+    if geometry['type'] == 'MultiPolygon':
+        return geometry['coordinates']
+    return []
+
+
+def select_countries(source, countries):
+    """{ISO3: [polygons]} for the configured countries"""
+    wanted = {country['code'] for country in countries}
+    selected = {}
+    for feature in source['features']:
+        for code in feature_codes(feature['properties']):
+            if code in wanted:
+                selected.setdefault(code, []).extend(feature_polygons(feature['geometry']))
+                break
+    return selected
+
+
+def ring_area(ring):
+    """Signed planar area of a ring (shoelace)"""
+    return sum(x0 * y1 - x1 * y0 for (x0, y0), (x1, y1) in zip(ring, ring[1:])) / 2
+
+
+def ring_centroid(ring):
+    """Planar centroid of a ring"""
+    area = ring_area(ring)
+    if not area:
+        xs, ys = zip(*ring)
+        return sum(xs) / len(xs), sum(ys) / len(ys)
+    cx = cy = 0.0
+    for (x0, y0), (x1, y1) in zip(ring, ring[1:]):
+        cross = x0 * y1 - x1 * y0
+        cx += (x0 + x1) * cross
+        cy += (y0 + y1) * cross
+    return cx / (6 * area), cy / (6 * area)
+
+
+def country_summary(name, polygons):
+    """Centroid of the largest polygon (e.g. the mainland) and overall bounding box"""
+    largest = max(polygons, key=lambda polygon: abs(ring_area(polygon[0])))
+    x, y = ring_centroid(largest[0])
+    points = [point for polygon in polygons for ring in polygon for point in ring]
+    xs = [point[0] for point in points]
+    ys = [point[1] for point in points]
+    return {
+        'name': name,
+        'centroid': [round(y, 4), round(x, 4)],
+        'bbox': [round(min(xs), 4), round(min(ys), 4), round(max(xs), 4), round(max(ys), 4)]
+    }
+
+
+def make_transform(selected):
+    """TopoJSON-style quantisation transform over the selected extent"""
+    points = [point for polygons in selected.values() for polygon in polygons
+              for ring in polygon for point in ring]
+    x0 = min(point[0] for point in points)
+    y0 = min(point[1] for point in points)
+    x1 = max(point[0] for point in points)
+    y1 = max(point[1] for point in points)
+    return {
+        'scale': [(x1 - x0) / (QUANTIZATION - 1) or 1, (y1 - y0) / (QUANTIZATION - 1) or 1],
+        'translate': [x0, y0]
+    }
+
+
+def quantise_ring(ring, transform):
+    """Quantise a closed ring, dropping repeated points; returns the open ring"""
+    (sx, sy), (tx, ty) = transform['scale'], transform['translate']
+    quantised = []
+    for x, y in ring:
+        point = (round((x - tx) / sx), round((y - ty) / sy))
+        if not quantised or quantised[-1] != point:
+            quantised.append(point)
+    if len(quantised) > 1 and quantised[0] == quantised[-1]:
+        quantised.pop()
+    return quantised
+
+
+def find_junctions(rings):
+    """Points where rings meet with different neighbours (where shared borders start or end)"""
+    neighbours = {}
+    junctions = set()
+    for ring in rings:
+        count = len(ring)
+        for i, point in enumerate(ring):
+            pair = frozenset((ring[i - 1], ring[(i + 1) % count]))
+            seen = neighbours.setdefault(point, pair)
+            if seen != pair:
+                junctions.add(point)
+    return junctions
+
+
+def canonical_ring(ring):
+    """Rotate a junction-free ring to start at its smallest point (so equal rings match)"""
+    start = ring.index(min(ring))
+    return ring[start:] + ring[:start]
+
+
+def cut_ring(ring, junctions):
+    """Split an open ring into closed arcs at its junctions"""
+    cuts = [i for i, point in enumerate(ring) if point in junctions]
+    if not cuts:
+        ring = canonical_ring(ring)
+        return [ring + [ring[0]]]
+
+    rotated = ring[cuts[0]:] + ring[:cuts[0]] + [ring[cuts[0]]]
+    offsets = [cut - cuts[0] for cut in cuts] + [len(ring)]
+    return [rotated[start:end + 1] for start, end in zip(offsets, offsets[1:])]
+
+
+def build_topology(selected, transform):
+    """Quantise, cut and deduplicate; returns (arcs, {ISO3: [[ring arc refs]]})"""
+    quantised = {
+        code: [[quantise_ring(ring, transform) for ring in polygon] for polygon in polygons]
+        for code, polygons in selected.items()
+    }
+    all_rings = [ring for polygons in quantised.values() for polygon in polygons
+                 for ring in polygon if len(ring) >= 3]
+    junctions = find_junctions(all_rings)
+
+    arcs = []
+    arc_index = {}
+
+    def arc_ref(arc):
+        key = tuple(arc)
+        if key in arc_index:
+            return arc_index[key]
+        reverse = key[::-1]
+        if reverse in arc_index:
+            return ~arc_index[reverse]
+        if arc[0] == arc[-1] and len(arc) > 2:
+            # Closed junction-free ring: match the same ring traversed backwards
+            backwards = canonical_ring(arc[-2::-1])
+            backwards_key = tuple(backwards + [backwards[0]])
+            if backwards_key in arc_index:
+                return ~arc_index[backwards_key]
+        arc_index[key] = len(arcs)
+        arcs.append(arc)
+        return arc_index[key]
+
+    geometries = {}
+    for code, polygons in quantised.items():
+        geometries[code] = [
+            [[arc_ref(arc) for arc in cut_ring(ring, junctions)] for ring in polygon if len(ring) >= 3]
+            for polygon in polygons
+        ]
+        geometries[code] = [polygon for polygon in geometries[code] if polygon]
+    return arcs, geometries
+
+
+def perpendicular_distance_sq(point, start, end):
+    """Squared distance from point to the segment start-end"""
+    (px, py), (ax, ay), (bx, by) = point, start, end
+    dx, dy = bx - ax, by - ay
+    if dx == 0 and dy == 0:
+        return (px - ax) ** 2 + (py - ay) ** 2
+    t = max(0.0, min(1.0, ((px - ax) * dx + (py - ay) * dy) / (dx * dx + dy * dy)))
+    return (px - ax - t * dx) ** 2 + (py - ay - t * dy) ** 2
+
+
+def simplify(arc, tolerance):
+    """Douglas-Peucker (iterative), always keeping both endpoints"""
+    if len(arc) <= 2 or tolerance <= 0:
+        return list(arc)
+
+    keep = [False] * len(arc)
+    keep[0] = keep[-1] = True
+    tolerance_sq = tolerance * tolerance
+    stack = [(0, len(arc) - 1)]
+    while stack:
+        first, last = stack.pop()
+        farthest, distance = None, tolerance_sq
+        for i in range(first + 1, last):
+            d = perpendicular_distance_sq(arc[i], arc[first], arc[last])
+            if d > distance:
+                farthest, distance = i, d
+        if farthest is not None:
+            keep[farthest] = True
+            stack.append((first, farthest))
+            stack.append((farthest, last))
+    return [point for point, kept in zip(arc, keep) if kept]
+
+
+def delta_encode(arc):
+    """First point absolute, the rest as offsets from the previous point"""
+    encoded = [list(arc[0])]
+    for (x0, y0), (x1, y1) in zip(arc, arc[1:]):
+        encoded.append([x1 - x0, y1 - y0])
+    return encoded
+
+
+def build(source_file=SOURCE_FILE, output_file=OUTPUT_FILE):
+    with open(CATEGORIES_FILE, 'r', encoding='utf-8') as f:
+        countries = json.load(f)['countries']
+    with open(source_file, 'r', encoding='utf-8') as f:
+        source = json.load(f)
+
+    selected = select_countries(source, countries)
+    missing = [country['name'] for country in countries if country['code'] not in selected]
+
+    transform = make_transform(selected)
+    arcs, geometries = build_topology(selected, transform)
+    unit = min(transform['scale'])
+
+    levels = []
+    for level in LEVELS:
+        simplified = [simplify(arc, level['tolerance'] / unit) for arc in arcs]
+        levels.append(dict(level, arcs=[delta_encode(arc) for arc in simplified]))
+
+    names = {country['code']: country['name'] for country in countries}
+    document = {
+        'version': 1,
+        'transform': transform,
+        'countries': {code: country_summary(names[code], polygons)
+                      for code, polygons in sorted(selected.items())},
+        'geometries': dict(sorted(geometries.items())),
+        'levels': levels
+    }
+
+    temp_file = output_file.with_name(output_file.name + '.tmp')
+    with open(temp_file, 'w', encoding='utf-8') as f:
+        json.dump(document, f, separators=(',', ':'))
+    os.replace(temp_file, output_file)
+
+    source_kb = source_file.stat().st_size / 1024
+    output_kb = output_file.stat().st_size / 1024
+    print(f"Country geometry written to {output_file}")
+    print(f"   Countries: {len(selected)}/{len(countries)}"
+          + (f" (missing: {', '.join(missing)})" if missing else ''))
+    print(f"   Arcs: {len(arcs)} shared by {len(geometries)} countries")
+    for level in levels:
+        points = sum(len(arc) for arc in level['arcs'])
+        print(f"   {level['name']} (tolerance {level['tolerance']}°, zoom {level['minZoom']}+): {points:,} points")
+    print(f"   File size: {output_kb:.1f} KB (source {source_kb:.1f} KB)")
+
+    if ARTIFACT_MANIFEST_FILE.exists():
+        # The packaged (content-hashed) copy of the geometry is now stale
+        ARTIFACT_MANIFEST_FILE.unlink()
+        print(f"\nRemoved stale {ARTIFACT_MANIFEST_FILE}; run package-artifacts.py to repackage")
+
+
+if __name__ == '__main__':
+    os.chdir(Path(__file__).parent)
+    build()
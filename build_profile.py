@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Stage-level run reports for the build scripts (compile-data.py and
+consolidate-all-ihme.py --profile)
+
+A Profiler records one entry per stage (wall time, CPU time, rows in and
+out, rows/s, peak RSS) and per source file (the stages that parsed it,
+measured in the process that did the work, so worker processes report
+their own times). write() saves them as a JSON run report:
+
+  {
+    "version": 1,
+    "script": "compile-data.py",
+    "started": "2026-10-18T09:30:00",
+    "options": {...},                          the script's command-line options
+    "host": {"python", "platform", "cpus"},
+    "total": {"wall_s", "cpu_s", "peak_rss_mb"},
+    "stages": [{"name", "wall_s", "cpu_s", "rows_in", "rows_out", "rows_per_s", "peak_rss_mb"}, ...],
+    "sources": {"<file>": {"wall_s", "cpu_s", "rows_in", "rows_out", "rows_per_s",
+                           "peak_rss_mb", "stages": [...]}}
+  }
+
+Stages and sources are keyed by name, so reports of different builds can
+be compared with compare-build-profiles.py. CPU time includes finished
+worker processes; peak RSS is the high-water mark so far of the process
+(and its reaped workers), and is None where the resource module is
+missing (Windows).
+"""
+
+import cProfile
+import json
+import os
+import platform
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+REPORT_DIR = Path('.build-cache') / 'profiles'
+
+
+def cpu_seconds():
+    """CPU time of this process and its finished child processes"""
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process and its reaped children (None if unknown)"""
+    if resource is None:
+        return None
+    # ru_maxrss is in KB on Linux
+    peak_kb = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                  resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    return round(peak_kb / 1024, 1)
+
+
+def rows_per_second(rows, seconds):
+    return round(rows / seconds) if rows is not None and seconds > 0 else None
+
+
+def counted(items, counts, key):
+    """Pass items through, counting them into counts[key]"""
+    counts.setdefault(key, 0)
+    for item in items:
+        counts[key] += 1
+        yield item
+
+
+class Profiler:
+    """Collects stage and source records for a run report
+
+    A disabled profiler records nothing, so instrumented code can call
+    stage() unconditionally.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.stages = []
+        self.sources = {}
+        self.started = datetime.now().isoformat(timespec='seconds')
+        self._wall = time.perf_counter()
+        self._cpu = cpu_seconds()
+
+    @contextmanager
+    def stage(self, name, rows_in=None):
+        """Time the enclosed block; the caller may set record['rows_in'] / ['rows_out']"""
+        record = {'name': name, 'rows_in': rows_in, 'rows_out': None}
+        if not self.enabled:
+            yield record
+            return
+
+        wall, cpu = time.perf_counter(), cpu_seconds()
+        try:
+            yield record
+        finally:
+            wall = time.perf_counter() - wall
+            record.update(
+                wall_s=round(wall, 4),
+                cpu_s=round(cpu_seconds() - cpu, 4),
+                rows_per_s=rows_per_second(
+                    record['rows_in'] if record['rows_in'] is not None else record['rows_out'], wall),
+                peak_rss_mb=peak_rss_mb())
+            self.stages.append(record)
+
+    def add_source(self, name, stages, rows_in=None, rows_out=None, **extra):
+        """Record a source file from the stage records of the process that parsed it
+
+        rows_in / rows_out default to the first stage's input and the last
+        stage's output; extra keys (e.g. cached=True) are stored as given.
+        """
+        if not self.enabled:
+            return
+        if len(stages) == 1 and stages[0]['rows_in'] is None:
+            # Counts known only to the caller (see profile_call)
+            stages[0].update(rows_in=rows_in, rows_out=rows_out,
+                             rows_per_s=rows_per_second(rows_in, stages[0]['wall_s']))
+        wall = sum(stage['wall_s'] for stage in stages)
+        if rows_in is None and stages:
+            rows_in = stages[0]['rows_in']
+        if rows_out is None and stages:
+            rows_out = stages[-1]['rows_out']
+        peaks = [stage['peak_rss_mb'] for stage in stages if stage['peak_rss_mb'] is not None]
+        self.sources[name] = dict({
+            'wall_s': round(wall, 4),
+            'cpu_s': round(sum(stage['cpu_s'] for stage in stages), 4),
+            'rows_in': rows_in,
+            'rows_out': rows_out,
+            'rows_per_s': rows_per_second(rows_in, wall),
+            'peak_rss_mb': max(peaks) if peaks else None,
+            'stages': stages
+        }, **extra)
+
+    def report(self, script, options=None):
+        """The run report as a dict"""
+        return {
+            'version': 1,
+            'script': script,
+            'started': self.started,
+            'options': {key: str(value) if isinstance(value, Path) else value
+                        for key, value in (options or {}).items()},
+            'host': {'python': platform.python_version(), 'platform': platform.platform(),
+                     'cpus': os.cpu_count()},
+            'total': {'wall_s': round(time.perf_counter() - self._wall, 4),
+                      'cpu_s': round(cpu_seconds() - self._cpu, 4),
+                      'peak_rss_mb': peak_rss_mb()},
+            'stages': self.stages,
+            'sources': self.sources
+        }
+
+    def write(self, path, script, options=None):
+        """Write the run report and print a per-stage summary"""
+        report = self.report(script, options)
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+        print(f"\nRun report written to {path}")
+        print(f"   Total: {report['total']['wall_s']:.2f}s wall, {report['total']['cpu_s']:.2f}s CPU, "
+              f"peak RSS {report['total']['peak_rss_mb']} MB")
+        for stage in report['stages']:
+            rate = f", {stage['rows_per_s']:,} rows/s" if stage['rows_per_s'] else ''
+            print(f"   {stage['name']}: {stage['wall_s']:.3f}s{rate}")
+        return report
+
+
+DISABLED = Profiler(enabled=False)
+
+
+def profile_call(func, name, *args):
+    """Call func(*args) as a single stage; returns (result, stage records)
+
+    Module-level so it can wrap a worker function in a process pool.
+    """
+    profiler = Profiler()
+    with profiler.stage(name):
+        result = func(*args)
+    return result, profiler.stages
+
+
+def default_report_path(script):
+    """.build-cache/profiles/<script>-<timestamp>.json"""
+    stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+    return REPORT_DIR / f"{Path(script).stem}-{stamp}.json"
+
+
+def run_with_cprofile(path, func, *args, **kwargs):
+    """Call func under cProfile and dump the stats to path (pstats format)
+
+    The file opens with `python -m pstats`, snakeviz, gprof2dot or
+    flameprof (flame graphs). Only the calling process is profiled.
+    """
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        profile.disable()
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        profile.dump_stats(path)
+        print(f"\ncProfile stats written to {path}")
@@ -1,9 +1,7 @@
 #!/usr/bin/env python3
 """Check Life Expectancy 2023 data"""
 
-import json
-import csv
-from pathlib import Path
+import data_access
 
 print("="*70)
 print("CHECKING LIFE EXPECTANCY 2023 DATA")
@@ -11,13 +9,11 @@ print("="*70)
 
 # Check compiled JSON
 print("\n1. COMPILED JSON CHECK:")
-with open('data/compiled-indicators.json', 'r', encoding='utf-8') as f:
-    compiled_data = json.load(f)
+compiled_data = data_access.load_compiled()
 
 for filename in compiled_data.keys():
     if 'IHME' in filename:
-        rows = compiled_data[filename]
-        life_exp_rows = [r for r in rows if r.get('measure_name') == 'Life expectancy']
+        life_exp_rows = compiled_data[filename].where(measure_name='Life expectancy')
 
         if life_exp_rows:
             years = set(r.get('year') for r in life_exp_rows)
@@ -34,8 +30,6 @@ print("\n" + "="*70)
 print("2. SOURCE FILES CHECK:")
 print("="*70)
 
-portfolios_dir = Path('Portfolios')
-
 # Check the file that should have Life Expectancy at birth for 2023
 files_to_check = [
     'IHME-GBD_2023_DATA-807bce6c-1.csv',
@@ -48,40 +42,34 @@ files_to_check = [
 ]
 
 for filename in files_to_check:
-    filepath = portfolios_dir / filename
+    filepath = data_access.PORTFOLIOS_DIR / filename
     if not filepath.exists():
         continue
 
-    with open(filepath, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
+    life_exp_rows = data_access.load_csv(filepath).where(measure_name='Life expectancy')
 
-        life_exp_rows = []
-        for row in reader:
-            if row.get('measure_name') == 'Life expectancy':
-                life_exp_rows.append(row)
+    if life_exp_rows:
+        print(f"\n{filename}")
+        print(f"  Total Life expectancy rows: {len(life_exp_rows)}")
 
-        if life_exp_rows:
-            print(f"\n{filename}")
-            print(f"  Total Life expectancy rows: {len(life_exp_rows)}")
-
-            # Check age groups
-            ages = set(r.get('age_name') for r in life_exp_rows)
-            print(f"  Age groups: {sorted(ages)}")
-
-            # Check if has "0-6 days"
-            birth_rows = [r for r in life_exp_rows if r.get('age_name') == '0-6 days']
-            print(f"  Rows with '0-6 days' (at birth): {len(birth_rows)}")
-
-            if birth_rows:
-                print(f"  Sample '0-6 days' data:")
-                for row in birth_rows[:5]:
-                    print(f"    {row.get('location_name')}: {row.get('val')} {row.get('metric_name')}, Sex: {row.get('sex_name')}")
-
-            # Check other age groups
-            if not birth_rows and life_exp_rows:
-                print(f"  Sample data (other age groups):")
-                for row in life_exp_rows[:3]:
-                    print(f"    Age {row.get('age_name')}: {row.get('location_name')} - {row.get('val')}")
+        # Check age groups
+        ages = set(r.get('age_name') for r in life_exp_rows)
+        print(f"  Age groups: {sorted(ages)}")
+
+        # Check if has "0-6 days"
+        birth_rows = [r for r in life_exp_rows if r.get('age_name') == '0-6 days']
+        print(f"  Rows with '0-6 days' (at birth): {len(birth_rows)}")
+
+        if birth_rows:
+            print(f"  Sample '0-6 days' data:")
+            for row in birth_rows[:5]:
+                print(f"    {row.get('location_name')}: {row.get('val')} {row.get('metric_name')}, Sex: {row.get('sex_name')}")
+
+        # Check other age groups
+        if not birth_rows and life_exp_rows:
+            print(f"  Sample data (other age groups):")
+            for row in life_exp_rows[:3]:
+                print(f"    Age {row.get('age_name')}: {row.get('location_name')} - {row.get('val')}")
 
 print("\n" + "="*70)
 print("3. CONCLUSION:")
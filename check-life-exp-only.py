@@ -1,56 +1,66 @@
 #!/usr/bin/env python3
 """Check specifically for Life Expectancy 2023 data"""
 
-import json
+import data_access
+import indicator_store
+
+
+def life_expectancy_rows():
+    """(source, year, country, value, age) of every IHME Life expectancy observation
+
+    Read from the Arrow store (compile-data.py --store) when it and pyarrow
+    are available, otherwise from the compiled JSON.
+    """
+    if indicator_store.pa is not None and indicator_store.STORE_FILE.exists():
+        table = indicator_store.select(indicator_store.open_store(),
+                                       columns=['source', 'year', 'country', 'value', 'age'],
+                                       provider='IHME', indicator='Life expectancy')
+        columns = table.to_pydict()
+        return list(zip(columns['source'], map(str, columns['year']), columns['country'],
+                        columns['value'], columns['age']))
+
+    compiled_data = data_access.load_compiled()
+    return [(filename, row.get('year'), row.get('location_name'), row.get('val'), row.get('age_name'))
+            for filename in compiled_data if 'IHME' in filename
+            for row in compiled_data[filename].where(measure_name='Life expectancy')]
+
 
 print("="*70)
 print("CHECKING LIFE EXPECTANCY DATA (NOT HALE)")
 print("="*70)
 
-with open('data/compiled-indicators.json', 'r', encoding='utf-8') as f:
-    compiled_data = json.load(f)
+by_source = {}
+for row in life_expectancy_rows():
+    by_source.setdefault(row[0], []).append(row)
 
 # Check for Life expectancy (not HALE)
-for filename in sorted(compiled_data.keys()):
-    if 'IHME' not in filename:
-        continue
-
-    rows = compiled_data[filename]
-    life_exp_rows = [r for r in rows if r.get('measure_name') == 'Life expectancy']
-
-    if life_exp_rows:
-        years = {}
-        for row in life_exp_rows:
-            year = row.get('year')
-            years[year] = years.get(year, 0) + 1
-
-        print(f"\n{filename}")
-        print(f"  Total Life expectancy rows: {len(life_exp_rows)}")
-        print(f"  Years breakdown:")
-        for year in sorted(years.keys()):
-            print(f"    {year}: {years[year]} rows")
-
-        # Show sample data for each year
-        for year in sorted(years.keys()):
-            year_rows = [r for r in life_exp_rows if r.get('year') == year]
-            if year_rows:
-                sample = year_rows[0]
-                print(f"  Sample {year}: {sample.get('location_name')} - {sample.get('val')} years, age: {sample.get('age_name')}")
+for filename in sorted(by_source.keys()):
+    life_exp_rows = by_source[filename]
+
+    years = {}
+    for row in life_exp_rows:
+        years.setdefault(row[1], []).append(row)
+
+    print(f"\n{filename}")
+    print(f"  Total Life expectancy rows: {len(life_exp_rows)}")
+    print(f"  Years breakdown:")
+    for year in sorted(years.keys()):
+        print(f"    {year}: {len(years[year])} rows")
+
+    # Show sample data for each year
+    for year in sorted(years.keys()):
+        _, _, country, value, age = years[year][0]
+        print(f"  Sample {year}: {country} - {value} years, age: {age}")
 
 print("\n" + "="*70)
 print("SUMMARY")
 print("="*70)
 
-all_life_exp = []
-for filename in compiled_data.keys():
-    if 'IHME' in filename:
-        rows = compiled_data[filename]
-        life_exp_rows = [r for r in rows if r.get('measure_name') == 'Life expectancy']
-        all_life_exp.extend(life_exp_rows)
+all_life_exp = [row for rows in by_source.values() for row in rows]
 
 years_summary = {}
 for row in all_life_exp:
-    year = row.get('year')
+    year = row[1]
     years_summary[year] = years_summary.get(year, 0) + 1
 
 print(f"\nTotal 'Life expectancy' rows: {len(all_life_exp)}")
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Compare two build run reports (compile-data.py / consolidate-all-ihme.py --profile)
+
+Stages and source files are matched by name. For each, the wall time,
+throughput and peak RSS of both runs are printed with the change; an
+entry slower (or using more memory) than the base by more than
+--threshold is reported as a regression and the exit status is 1.
+Entries faster than --min-seconds in both runs are not flagged, since
+their timings are mostly noise.
+
+  python compare-build-profiles.py base.json new.json
+  python compare-build-profiles.py --script compile-data    # two newest reports in .build-cache/profiles/
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+import build_profile
+
+
+def load_report(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        report = json.load(f)
+    if report.get('version') != 1:
+        raise ValueError(f"Unsupported run report version: {report.get('version')}")
+    return report
+
+
+def latest_reports(script):
+    """The two newest reports of a script in the default report directory (oldest first)"""
+    report_dir = Path(__file__).resolve().parent / build_profile.REPORT_DIR
+    reports = sorted(report_dir.glob(f"{Path(script).stem}-*.json"))
+    if len(reports) < 2:
+        raise SystemExit(f"Need two {script} reports in {build_profile.REPORT_DIR}/ "
+                         f"(found {len(reports)}); run it with --profile")
+    return reports[-2:]
+
+
+def change(new, base):
+    """Relative change, or None when either side is missing or zero"""
+    if not new or not base:
+        return None
+    return new / base - 1
+
+
+def compare_entry(base, new, threshold, min_seconds):
+    """(text, regressed) for one stage or source"""
+    if base is None:
+        return 'new', False
+    if new is None:
+        return 'removed', False
+    time_change = change(new['wall_s'], base['wall_s'])
+    memory_change = change(new['peak_rss_mb'], base['peak_rss_mb'])
+    significant = max(new['wall_s'], base['wall_s']) >= min_seconds
+    regressed = significant and ((time_change or 0) > threshold or (memory_change or 0) > threshold)
+    text = ', '.join(f"{label} {value:+.0%}" for label, value in
+                     (('time', time_change), ('memory', memory_change)) if value is not None)
+    return (text or '-') + ('  REGRESSION' if regressed else ''), regressed
+
+
+def print_section(title, base_entries, new_entries, threshold, min_seconds):
+    """Print one table (stages or sources); returns the number of regressions"""
+    names = list(new_entries) + [name for name in base_entries if name not in new_entries]
+    width = max([len(title)] + [len(name) for name in names])
+    print(f"\n  {title:<{width}} {'base (s)':>9} {'new (s)':>9} {'rows/s':>11} {'peak MB':>8}  change")
+
+    regressions = 0
+    for name in names:
+        base, new = base_entries.get(name), new_entries.get(name)
+        text, regressed = compare_entry(base, new, threshold, min_seconds)
+        regressions += regressed
+        current = new or base
+        base_time = f"{base['wall_s']:>9.3f}" if base else f"{'-':>9}"
+        new_time = f"{new['wall_s']:>9.3f}" if new else f"{'-':>9}"
+        print(f"  {name:<{width}} {base_time} {new_time} {current['rows_per_s'] or 0:>11,} "
+              f"{current['peak_rss_mb'] or 0:>8.1f}  {text}")
+    return regressions
+
+
+def compare_reports(base_file, new_file, threshold, min_seconds):
+    base, new = load_report(base_file), load_report(new_file)
+    print(f"Base: {base_file} ({base['script']}, {base['started']})")
+    print(f"New:  {new_file} ({new['script']}, {new['started']})")
+    if base['script'] != new['script']:
+        print("Warning: comparing reports of different scripts")
+    changed = sorted(key for key in set(base['options']) | set(new['options'])
+                     if base['options'].get(key) != new['options'].get(key))
+    for key in changed:
+        print(f"Option {key}: {base['options'].get(key)!r} -> {new['options'].get(key)!r}")
+
+    total_text, _ = compare_entry(base['total'], new['total'], threshold, min_seconds)
+    print(f"\nTotal: {base['total']['wall_s']:.2f}s -> {new['total']['wall_s']:.2f}s ({total_text})")
+
+    regressions = print_section('stage', {s['name']: s for s in base['stages']},
+                                {s['name']: s for s in new['stages']}, threshold, min_seconds)
+    regressions += print_section('source', base['sources'], new['sources'], threshold, min_seconds)
+
+    if regressions:
+        print(f"\n{regressions} stage(s)/source(s) regressed by more than {threshold:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('reports', nargs='*', type=Path, metavar='REPORT',
+                        help='base and new run report (default: the two newest of --script)')
+    parser.add_argument('--script', default='compile-data',
+                        help='script whose newest reports are compared when none are given '
+                             '(default: compile-data)')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='relative slowdown or memory growth reported as a regression '
+                             '(default: 0.25)')
+    parser.add_argument('--min-seconds', type=float, default=0.05,
+                        help='ignore entries faster than this in both runs (default: 0.05)')
+    args = parser.parse_args()
+
+    if len(args.reports) not in (0, 2):
+        parser.error('give two reports (base and new), or none')
+    base_file, new_file = args.reports or latest_reports(args.script)
+    sys.exit(compare_reports(base_file, new_file, args.threshold, args.min_seconds))
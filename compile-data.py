@@ -3,50 +3,147 @@
 Compile all CSV indicator files into a single JSON file for faster loading
 """
 
+import argparse
 import csv
+import hashlib
 import json
 import os
+import math
+import re
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import repeat
 from pathlib import Path
 
-# Target countries (with alternative names for matching)
-TARGET_COUNTRIES = [
-    'Afghanistan', 'Bangladesh', 'Burkina Faso', 'Cameroon',
-    'Central African Republic', 'Chad', 'Colombia', 'Congo DR',
-    'Ethiopia', 'Haiti', 'Lebanon', 'Mali', 'Mozambique', 'Myanmar',
-    'Niger', 'Nigeria', 'Pakistan', 'Somalia', 'South Sudan', 'Sudan',
-    'Syria', 'Uganda', 'Ukraine', 'Venezuela', 'Yemen'
-]
-
-# Country name variations (maps data file names to standard names)
-COUNTRY_NAME_MAPPING = {
-    'Democratic Republic of the Congo': 'Congo DR',
-    'Congo, Dem. Rep.': 'Congo DR',
-    'Syrian Arab Republic': 'Syria',
-    'Venezuela, RB': 'Venezuela',
-    'Venezuela (Bolivarian Republic of)': 'Venezuela',
-    'Myanmar (Burma)': 'Myanmar',
-    'Yemen, Rep.': 'Yemen'
-}
+import build_profile
+import country_portfolios
+import ihme_filters
+import indicator_coverage
+import indicator_db
+import indicator_store
+from indicator_codec import DEFAULT_SIG_DIGITS, encode_columnar
+from long_format import WB_YEAR_COLUMN, WHO_METADATA_COLUMNS, WHO_VALUE_COLUMNS
 
-def parse_csv_file(filepath):
-    """Parse a CSV file and return structured data"""
-    data = []
+# Target countries of the default portfolio, and the other spellings the
+# sources use for them (data/portfolios.json)
+TARGET_COUNTRIES = country_portfolios.countries()
+COUNTRY_NAME_MAPPING = country_portfolios.aliases()
+
+# Resolved before main() changes directory
+SCRIPT_PATH = Path(__file__).resolve()
+
+# Incremental build cache (per-source filtered rows + manifest)
+CACHE_DIR = Path('.build-cache')
+MANIFEST_NAME = 'manifest.json'
+
+# Indicator configuration and pre-resolved lookup index for the web app
+CATEGORIES_FILE = Path('data') / 'indicator-categories.json'
+INDEX_FILE = Path('data') / 'indicator-index.json'
+
+# Preferred (total/aggregate) slice per WHO dimension, for --reduce-who
+WHO_DIMENSION_SPEC_FILE = Path('data') / 'who-dimension-spec.json'
+
+# Ready-to-render country profiles (one file per ISO3 code)
+PROFILES_DIR = Path('data') / 'profiles'
+
+# Years searched (newest first) for a country's latest value, as in loadCountryProfile()
+PROFILE_YEARS = [2023, 2022, 2021, 2020, 2019]
+
+# Dense country x year matrices for the time-series chart
+CUBES_FILE = Path('data') / 'timeseries-cubes.json'
+
+# Per-indicator shards for lazy loading (compile-data.py --shards)
+SHARDS_DIR = Path('data') / 'shards'
+SHARD_MANIFEST_NAME = 'manifest.json'
+
+# Written by package-artifacts.py; invalidated by every build
+ARTIFACT_MANIFEST_FILE = Path('data') / 'artifacts-manifest.json'
+
+# Columns kept by the config-driven projection (compile-data.py --project)
+WB_KEY_COLUMNS = ['Series Name', 'Series Code', 'Country Name', 'Country Code']
+IHME_VALUE_COLUMNS = ['location_name', 'measure_name', 'year', 'val', 'lower', 'upper']
+WHO_KEY_COLUMNS = ['IND_CODE', 'IND_NAME', 'GEO_NAME_SHORT', 'DIM_TIME']
+
+# Per-portfolio outputs (compile-data.py --portfolio)
+PORTFOLIO_OUTPUT_DIR = Path('data') / 'portfolios'
 
+# Country outlines whose names and ISO3 codes tell countries from aggregates
+# (World Bank regions and income groups, WHO regions) in "*" portfolios
+COUNTRY_REFERENCE_FILE = Path('data') / 'countries.geojson'
+REFERENCE_CODE_FIELDS = ['ISO_A3', 'ADM0_A3', 'WB_A3']
+REFERENCE_NAME_FIELDS = ['ADMIN', 'NAME', 'NAME_LONG', 'FORMAL_EN', 'BRK_NAME', 'GEOUNIT']
+ISO3_PATTERN = re.compile(r'[A-Z]{3}')
+
+def country_pattern(countries):
+    """Regex matching any spelling of the given countries (None when every country is kept)
+
+    Used as a cheap pre-check on raw CSV records before they are split
+    into fields.
+    """
+    if countries is None:
+        return None
+    return _country_pattern(tuple(countries))
+
+@lru_cache(maxsize=None)
+def _country_pattern(countries):
+    return re.compile('|'.join(re.escape(name) for name in country_portfolios.spellings(countries)))
+
+def iter_csv_records(f):
+    """Yield raw CSV records from a text file, joining quoted fields that span lines"""
+    pending = ''
+    for line in f:
+        if pending:
+            line = pending + line
+        # An odd number of quotes means a quoted field continues on the next line
+        if line.count('"') % 2:
+            pending = line
+            continue
+        pending = ''
+        yield line
+    if pending:
+        yield pending
+
+def iter_csv_rows(filepath, pattern=None, counts=None):
+    """Stream (header, values) pairs from a CSV file
+
+    When a pattern is given, records it does not match are skipped before
+    being split into fields. When a counts dict is given, the records read
+    are counted into counts['records'].
+    """
     try:
         with open(filepath, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                data.append(row)
+            records = iter_csv_records(f)
+            header = next(csv.reader(records), None)
+            if header is None:
+                return
+            if counts is not None:
+                records = build_profile.counted(records, counts, 'records')
+            if pattern is not None:
+                records = filter(pattern.search, records)
+            for values in csv.reader(records):
+                if values:
+                    yield header, values
     except Exception as e:
         print(f"Error reading {filepath}: {e}")
 
-    return data
+def parse_csv_file(filepath):
+    """Parse a CSV file and yield structured rows"""
+    for header, values in iter_csv_rows(filepath):
+        yield make_row(header, values)
 
-def compile_data():
-    """Compile all CSV files into a single JSON structure"""
-    portfolios_dir = Path('Portfolios')
-    compiled_data = {}
+def make_row(header, values):
+    """Build a row dict the way csv.DictReader does (None for missing fields)"""
+    row = dict(zip(header, values))
+    if len(values) > len(header):
+        row[None] = values[len(header):]
+    elif len(values) < len(header):
+        for key in header[len(values):]:
+            row[key] = None
+    return row
 
+def get_source_files(portfolios_dir):
+    """List the source CSV files in the order they are compiled"""
     # Get all CSV files
     csv_files = list(portfolios_dir.glob('*_ALL_LATEST.csv'))
     csv_files.append(portfolios_dir / 'WB Data 25b.csv')
@@ -54,85 +151,958 @@ def compile_data():
     # Use single consolidated IHME file (contains all years: 2018-2023)
     csv_files.append(portfolios_dir / 'IHME_GBD_ALL_YEARS_CONSOLIDATED.csv')
 
-    print(f"Found {len(csv_files)} CSV files to compile...")
+    return csv_files
 
-    for csv_file in csv_files:
-        if not csv_file.exists():
-            continue
+def column_getter(header, name):
+    """Return a function reading column `name` from a list of values (None if absent)"""
+    if name not in header:
+        return lambda values: None
+    index = header.index(name)
+    return lambda values: values[index] if index < len(values) else None
 
-        filename = csv_file.name
-        print(f"Processing {filename}...")
+def build_projection(categories):
+    """Derive, per source file, which series the configured indicators use
 
-        # Parse the CSV
-        rows = parse_csv_file(csv_file)
+    Returns {file name: {'kind': 'wb' | 'ihme' | 'who', 'series': [...] or None}}.
+    World Bank series are matched on Series Code and IHME measures on
+    measure_name; a WHO export holds a single indicator, so the whole file
+    is kept. Files no indicator references are absent.
+    """
+    projection = {}
 
-        # Filter for target countries
-        filtered_rows = []
-        is_ihme = 'IHME' in filename
+    for _, indicator in iter_configured_indicators(categories):
+        file_name = indicator['file']
+        if 'IHME' in file_name:
+            kind = 'ihme'
+        elif file_name.endswith('_ALL_LATEST.csv'):
+            kind = 'who'
+        else:
+            kind = 'wb'
 
-        for row in rows:
+        entry = projection.setdefault(file_name, {'kind': kind, 'series': None if kind == 'who' else []})
+        if entry['series'] is not None and indicator['id'] not in entry['series']:
+            entry['series'].append(indicator['id'])
+
+    return projection
+
+def projected_columns(kind, header):
+    """Columns of `header` the app and index read for a source of the given kind"""
+    if kind == 'wb':
+        return [c for c in header if c in WB_KEY_COLUMNS or WB_YEAR_COLUMN.match(c)]
+    if kind == 'ihme':
+        wanted = set(IHME_VALUE_COLUMNS) | set(ihme_filters.spec_columns())
+        return [c for c in header if c in wanted]
+    return [c for c in header
+            if c in WHO_KEY_COLUMNS or c in WHO_VALUE_COLUMNS
+            or (c.startswith('DIM_') and c not in WHO_METADATA_COLUMNS)]
+
+def iter_filtered_rows(filepath, is_ihme, projection=None, countries=TARGET_COUNTRIES, counts=None):
+    """Stream target-country rows with normalized country names
+
+    Rows are rejected on the raw record and then on the country column
+    before a dict is built, so only surviving rows are materialised. With
+    a projection entry (see build_projection), rows of unreferenced series
+    are rejected the same way and unreferenced columns are never stored.
+    countries=None keeps every country; counts is passed to iter_csv_rows.
+    """
+    target_countries = None if countries is None else set(countries)
+    getters = None
+
+    for header, values in iter_csv_rows(filepath, country_pattern(countries), counts):
+        if getters is None:
             # Get country name based on data type
             if is_ihme:
-                country = row.get('location_name')
+                getters = [column_getter(header, 'location_name')]
             else:
-                country = row.get('Country Name') or row.get('GEO_NAME_SHORT')
-
-            # Normalize country name using mapping
-            normalized_country = COUNTRY_NAME_MAPPING.get(country, country)
-
-            if normalized_country in TARGET_COUNTRIES:
-                # For IHME data, filter for aggregate indicators only
-                if is_ihme:
-                    age_name = row.get('age_name', '')
-                    sex_name = row.get('sex_name', '')
-                    metric_name = row.get('metric_name', '')
-                    cause_name = row.get('cause_name', '')
-                    rei_name = row.get('rei_name', '')
-                    measure_name = row.get('measure_name', '')
-
-                    # For life expectancy and HALE: use "0-6 days" age (at birth), "Years" metric
-                    # These measures don't have cause_name or rei_name populated
-                    if measure_name in ['Life expectancy', 'HALE (Healthy life expectancy)']:
-                        if age_name != '0-6 days' or sex_name != 'Both' or metric_name != 'Years':
-                            continue
-                        # Skip rows with any cause or risk factor
-                        if cause_name or rei_name:
-                            continue
-                    # For all other measures: "All ages", "Both sexes", "All causes", no risk factor, "Rate" metric
-                    else:
-                        # Only include "All causes" and no specific risk factor (empty rei_name = total)
-                        if cause_name != 'All causes':
-                            continue
-                        if rei_name:  # Skip any row with a risk factor (we want total only)
-                            continue
-                        # Must be "All ages", "Both sexes", "Rate" metric
-                        if age_name != 'All ages' or sex_name != 'Both' or metric_name != 'Rate':
-                            continue
-
-                # Update the row with normalized country name
-                if 'Country Name' in row:
-                    row['Country Name'] = normalized_country
-                if 'GEO_NAME_SHORT' in row:
-                    row['GEO_NAME_SHORT'] = normalized_country
-                if 'location_name' in row:
-                    row['location_name'] = normalized_country
-
-                filtered_rows.append(row)
+                getters = [column_getter(header, 'Country Name'),
+                           column_getter(header, 'GEO_NAME_SHORT')]
+
+            series = get_series = keep_indices = None
+            if projection is not None:
+                if projection['series'] is not None:
+                    series = set(projection['series'])
+                    get_series = column_getter(
+                        header, 'measure_name' if projection['kind'] == 'ihme' else 'Series Code')
+                keep = set(projected_columns(projection['kind'], header))
+                keep_indices = [i for i, c in enumerate(header) if c in keep]
+
+        country = None
+        for get_country in getters:
+            country = get_country(values)
+            if country:
+                break
+
+        # Normalize country name using mapping
+        normalized_country = COUNTRY_NAME_MAPPING.get(country, country)
+        if not normalized_country:
+            continue
+        if target_countries is not None and normalized_country not in target_countries:
+            continue
+
+        if series is not None and get_series(values) not in series:
+            continue
+
+        if keep_indices is None:
+            row = make_row(header, values)
+        else:
+            row = {header[i]: values[i] if i < len(values) else None for i in keep_indices}
+
+        # Update the row with normalized country name
+        if 'Country Name' in row:
+            row['Country Name'] = normalized_country
+        if 'GEO_NAME_SHORT' in row:
+            row['GEO_NAME_SHORT'] = normalized_country
+        if 'location_name' in row:
+            row['location_name'] = normalized_country
+
+        yield row
+
+def load_who_dimension_spec():
+    """Load the WHO dimension reduction spec (data/who-dimension-spec.json)"""
+    with open(WHO_DIMENSION_SPEC_FILE, 'r', encoding='utf-8') as f:
+        spec = json.load(f)
+    if spec.get('version') != 1:
+        raise ValueError(f"Unsupported WHO dimension spec version: {spec.get('version')}")
+    return spec
+
+def who_dimension_columns(rows):
+    """DIM_* columns that actually disaggregate a WHO file (more than one value)"""
+    columns = [c for c in rows[0] if c and c.startswith('DIM_') and c not in WHO_METADATA_COLUMNS]
+    return [c for c in columns if len({row.get(c) for row in rows}) > 1]
+
+def who_value_column(rows):
+    """First column of WHO_VALUE_COLUMNS holding a number anywhere in the file"""
+    for column in WHO_VALUE_COLUMNS:
+        if any(parse_value(row.get(column)) is not None for row in rows):
+            return column
+    return None
+
+def reduce_who_rows(file_name, rows, spec):
+    """Reduce a WHO file to one row with a numeric VALUE per country and year
+
+    The dimension and value columns are detected once for the file. For
+    each country-year the row matching the most preferred dimension values
+    wins (the spec's defaults, overridden per file), earlier rows winning
+    ties, so a country-year without a total row still keeps its best
+    breakdown. Rows without a value are dropped.
+    """
+    if not rows:
+        return rows
+
+    dimensions = who_dimension_columns(rows)
+    value_column = who_value_column(rows)
+    if value_column is None:
+        return []
+
+    preferred = dict(spec['preferred'])
+    preferred.update(spec['files'].get(file_name, {}))
+    preferred = [(column, preferred.get(column, spec['fallback'])) for column in dimensions]
+
+    best = {}
+    for row in rows:
+        value = parse_value(row.get(value_column))
+        if value is None:
+            continue
+        score = sum(row.get(column) == wanted for column, wanted in preferred)
+        key = (row.get('GEO_NAME_SHORT'), row.get('DIM_TIME'))
+        if key not in best or score > best[key][0]:
+            best[key] = (score, row, value)
+
+    reduced = []
+    for _, row, value in best.values():
+        slim = {column: row.get(column) for column in WHO_KEY_COLUMNS}
+        slim.update((column, row.get(column)) for column in dimensions)
+        slim['VALUE'] = value
+        reduced.append(slim)
+    return reduced
+
+def process_source(csv_file, projection=None, who_spec=None, countries=TARGET_COUNTRIES,
+                   profiler=build_profile.DISABLED):
+    """Parse and filter a single source file
+
+    projection (see build_projection) limits the series and columns kept;
+    who_spec (see reduce_who_rows) reduces WHO files to one value per
+    country-year; countries (None for all) selects the countries kept.
+    An enabled profiler records the parse and reduction stages.
+    """
+    is_ihme = 'IHME' in csv_file.name
+    counts = {} if profiler.enabled else None
+
+    with profiler.stage('parse-filter') as stage:
+        rows = iter_filtered_rows(csv_file, is_ihme, projection, countries, counts)
+
+        # For IHME data, keep aggregate rows only (see data/ihme-filter-spec.json)
+        if is_ihme:
+            rows = ihme_filters.filter_stream(rows)
+
+        rows = list(rows)
+        if counts is not None:
+            stage['rows_in'] = counts.get('records', 0)
+        stage['rows_out'] = len(rows)
+
+    if who_spec is not None and rows and 'GEO_NAME_SHORT' in rows[0]:
+        with profiler.stage('reduce-who', rows_in=len(rows)) as stage:
+            rows = reduce_who_rows(csv_file.name, rows, who_spec)
+            stage['rows_out'] = len(rows)
+    return rows
+
+def profile_source(csv_file, projection=None, who_spec=None, countries=TARGET_COUNTRIES):
+    """process_source, also returning its stage records (measured where it runs)"""
+    profiler = build_profile.Profiler()
+    rows = process_source(csv_file, projection, who_spec, countries, profiler)
+    return rows, profiler.stages
+
+def file_digest(filepath):
+    """SHA-256 of a file's contents"""
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def filter_signature(projection=None, who_spec=None, countries=TARGET_COUNTRIES):
+    """Fingerprint of the filter configuration used to build cached rows
+
+    Includes this script's source and the IHME filter module and spec, so
+    that any change to the filtering logic invalidates cached sources.
+    """
+    config = {
+        'target_countries': country_portfolios.ALL_COUNTRIES if countries is None else countries,
+        'country_name_mapping': COUNTRY_NAME_MAPPING,
+        'compiler': file_digest(SCRIPT_PATH),
+        'ihme_filters': file_digest(Path(ihme_filters.__file__)),
+        'ihme_filter_spec': file_digest(ihme_filters.SPEC_FILE),
+        'projection': projection,
+        'who_spec': who_spec,
+    }
+    payload = json.dumps(config, sort_keys=True).encode('utf-8')
+    return hashlib.sha256(payload).hexdigest()
+
+def load_manifest(cache_dir):
+    """Load the incremental build manifest (empty if missing or unreadable)"""
+    manifest_file = cache_dir / MANIFEST_NAME
+    if not manifest_file.exists():
+        return {}
+
+    try:
+        with open(manifest_file, 'r', encoding='utf-8') as f:
+            return json.load(f).get('sources', {})
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable build manifest: {e}")
+        return {}
+
+def save_manifest(cache_dir, sources):
+    """Write the incremental build manifest"""
+    with open(cache_dir / MANIFEST_NAME, 'w', encoding='utf-8') as f:
+        json.dump({'sources': sources}, f, indent=2, sort_keys=True)
+
+def load_cached_source(csv_file, entry, signature, cache_dir):
+    """Return (rows, entry) from the cache if csv_file is unchanged, else (None, None)
+
+    Size and mtime are checked first; the content hash is only computed
+    when they differ, so untouched files cost a stat() call.
+    """
+    stat = csv_file.stat()
+    if not entry or entry.get('filter') != signature:
+        return None, None
+
+    cache_file = cache_dir / entry['cache']
+    if not cache_file.exists():
+        return None, None
+
+    if entry['size'] != stat.st_size or entry['mtime'] != stat.st_mtime_ns:
+        if entry['size'] != stat.st_size or entry['sha256'] != file_digest(csv_file):
+            return None, None
+        # Touched but identical content - refresh the recorded mtime
+        entry = dict(entry, mtime=stat.st_mtime_ns)
+
+    with open(cache_file, 'r', encoding='utf-8') as f:
+        return json.load(f), entry
+
+def store_cached_source(csv_file, rows, signature, cache_dir):
+    """Write filtered rows for csv_file to the cache and return its manifest entry"""
+    stat = csv_file.stat()
+    cache_name = hashlib.sha1(csv_file.name.encode('utf-8')).hexdigest() + '.json'
+
+    with open(cache_dir / cache_name, 'w', encoding='utf-8') as f:
+        json.dump(rows, f, separators=(',', ':'))
+
+    return {
+        'size': stat.st_size,
+        'mtime': stat.st_mtime_ns,
+        'sha256': file_digest(csv_file),
+        'filter': signature,
+        'cache': cache_name,
+        'rows': len(rows)
+    }
+
+def parse_value(raw):
+    """Parse a numeric cell, returning None for blanks, '..', 'N/A' and non-numbers"""
+    if isinstance(raw, float):
+        # Already typed (reduced WHO VALUE)
+        return None if raw != raw else raw
+    if not raw or raw in ('..', 'N/A'):
+        return None
+    try:
+        value = float(raw)
+    except ValueError:
+        return None
+    return None if value != value else value
+
+def load_categories():
+    """Load the indicator categories configuration"""
+    with open(CATEGORIES_FILE, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def iter_configured_indicators(categories):
+    """Yield (category, indicator) for every indicator backed by a data file"""
+    for category in categories['categories']:
+        for indicator in category['indicators']:
+            if indicator.get('file') in ('API', 'AGGREGATE'):
+                continue
+            yield category, indicator
+
+def iter_indicator_values(compiled_data, indicator):
+    """Yield (year, country, value) observations for one configured indicator
+
+    Mirrors loadDataFile() in js/app.js: IHME measures are looked up across
+    every IHME file, World Bank rows are matched on Series Code and WHO
+    rows take the first parseable value column.
+    """
+    indicator_id = indicator['id']
+    file_name = indicator['file']
+
+    if 'IHME' in file_name:
+        for data_file, rows in compiled_data.items():
+            if 'IHME' not in data_file:
+                continue
+            measure_rows = [row for row in rows if row.get('measure_name') == indicator_id]
+            for row in ihme_filters.filter_rows(measure_rows):
+                value = parse_value(row.get('val'))
+                if value is not None:
+                    yield int(row['year']), row['location_name'], value
+        return
+
+    rows = compiled_data.get(file_name)
+    if not rows:
+        return
+
+    if 'Country Name' in rows[0]:
+        year_columns = [(int(m.group(1)), column) for column in rows[0]
+                        for m in [WB_YEAR_COLUMN.match(column or '')] if m]
+        for row in rows:
+            if row.get('Series Code') != indicator_id:
+                continue
+            for year, column in year_columns:
+                value = parse_value(row.get(column))
+                if value is not None:
+                    yield year, row['Country Name'], value
+    else:
+        for row in rows:
+            try:
+                year = int(row.get('DIM_TIME'))
+            except (TypeError, ValueError):
+                continue
+            for column in WHO_VALUE_COLUMNS:
+                value = parse_value(row.get(column))
+                if value is not None:
+                    yield year, row['GEO_NAME_SHORT'], value
+                    break
+
+def build_indicator_index(compiled_data, categories):
+    """Build the indicator id -> year -> country -> value lookup index
+
+    When a source has several rows for the same country and year (e.g. WHO
+    sex or urban/rural breakdowns), the first row wins, as in the country
+    profile.
+    """
+    indicators = {}
+
+    for _, indicator in iter_configured_indicators(categories):
+        values = {}
+        for year, country, value in iter_indicator_values(compiled_data, indicator):
+            values.setdefault(year, {}).setdefault(country, value)
+
+        years = sorted(values, reverse=True)
+        indicators[indicator['id']] = {
+            'file': indicator['file'],
+            'years': years,
+            'values': {str(year): values[year] for year in years}
+        }
+
+    return {'indicators': indicators}
+
+def write_indicator_index(compiled_data, categories, index_file=INDEX_FILE):
+    """Write the pre-resolved indicator lookup index used by js/app.js"""
+    index = build_indicator_index(compiled_data, categories)
+
+    with open(index_file, 'w', encoding='utf-8') as f:
+        json.dump(index, f, separators=(',', ':'))
+
+    file_size_kb = index_file.stat().st_size / 1024
+    with_data = sum(1 for entry in index['indicators'].values() if entry['years'])
+    print(f"\nIndicator index written to {index_file}")
+    print(f"   File size: {file_size_kb:.1f} KB")
+    print(f"   Indicators with data: {with_data}/{len(index['indicators'])}")
+
+    return index
+
+def build_country_profiles(index, categories):
+    """Build {ISO3: profile} with each indicator's latest value per category"""
+    profiles = {}
+
+    for country in categories['countries']:
+        if not country.get('code'):
+            # Profiles are keyed by ISO3 code
+            continue
+        indicators_by_category = {}
+        found = 0
+
+        for category in categories['categories']:
+            # Skip the profile/API categories (DREF, GDACS) that have no data files
+            data_indicators = [i for i in category['indicators']
+                               if i.get('file') not in ('API', 'AGGREGATE')]
+            if not data_indicators:
+                continue
+
+            entries = []
+            for indicator in data_indicators:
+                entry = index['indicators'].get(indicator['id'], {'values': {}})
+                for year in PROFILE_YEARS:
+                    value = entry['values'].get(str(year), {}).get(country['name'])
+                    if value is not None:
+                        entries.append({
+                            'id': indicator['id'],
+                            'name': indicator['name'],
+                            'value': value,
+                            'unit': indicator['unit'],
+                            'year': year
+                        })
+                        break
+
+            indicators_by_category[category['name']] = entries
+            found += len(entries)
+
+        profiles[country['code']] = {
+            'country': country['name'],
+            'code': country['code'],
+            'indicatorCount': found,
+            'indicatorsByCategory': indicators_by_category
+        }
+
+    return profiles
+
+def write_country_profiles(index, categories, profiles_dir=PROFILES_DIR):
+    """Write one ready-to-render profile per configured country"""
+    profiles_dir.mkdir(parents=True, exist_ok=True)
+    profiles = build_country_profiles(index, categories)
+
+    for code, profile in profiles.items():
+        with open(profiles_dir / f'{code}.json', 'w', encoding='utf-8') as f:
+            json.dump(profile, f, separators=(',', ':'))
+    # Profiles of countries no longer in the list (e.g. aggregates of older builds)
+    for stale in profiles_dir.glob('*.json'):
+        if stale.stem not in profiles:
+            stale.unlink()
+
+    counts = [profile['indicatorCount'] for profile in profiles.values()]
+    print(f"\nCountry profiles written to {profiles_dir}/")
+    print(f"   Countries: {len(profiles)}")
+    if counts:
+        print(f"   Indicators per country: {min(counts)}-{max(counts)}")
+
+def build_timeseries_cube(entry, countries):
+    """Build a dense country x year matrix (NaN for missing) for one indicator
+
+    The year span runs from the first to the last year with data. The
+    matrix is a flat row-major array('d') pre-filled with NaN; each year
+    is one column, read for every country by a C-level map over the
+    year's dict and written with a single strided slice assignment, so no
+    Python code runs per cell. Countries with no data at all are dropped.
+    """
+    if not entry['years']:
+        return None
+
+    first_year = min(entry['years'])
+    years = list(range(first_year, max(entry['years']) + 1))
+    width = len(years)
+
+    matrix = array('d', [math.nan]) * (len(countries) * width)
+    for year, by_country in entry['values'].items():
+        offset = int(year) - first_year
+        matrix[offset::width] = array('d', map(by_country.get, countries, repeat(math.nan)))
+
+    present = set().union(*entry['values'].values())
+    rows = [row for row, country in enumerate(countries) if country in present]
+    return {'years': years,
+            'countries': [countries[row] for row in rows],
+            'values': [matrix[row * width:(row + 1) * width] for row in rows]}
+
+def write_timeseries_cubes(index, categories, cubes_file=CUBES_FILE):
+    """Write one time-series cube per indicator (NaN is written as null)"""
+    countries = [country['name'] for country in categories['countries']]
+    cubes = {}
+
+    for indicator_id, entry in index['indicators'].items():
+        cube = build_timeseries_cube(entry, countries)
+        if cube is not None:
+            cube['values'] = [[None if math.isnan(cell) else cell for cell in cells]
+                              for cells in cube['values']]
+            cubes[indicator_id] = cube
+
+    with open(cubes_file, 'w', encoding='utf-8') as f:
+        json.dump({'version': 1, 'indicators': cubes}, f, separators=(',', ':'))
+
+    print(f"\nTime-series cubes written to {cubes_file}")
+    print(f"   File size: {cubes_file.stat().st_size / 1024:.1f} KB")
+    print(f"   Indicators: {len(cubes)}")
+
+def write_coverage(compiled_data, index, categories,
+                   coverage_file=indicator_coverage.COVERAGE_FILE,
+                   report_file=indicator_coverage.REPORT_FILE):
+    """Write the indicator x year x country coverage bitsets and a readable report"""
+    countries = [country['name'] for country in categories['countries']]
+    coverage = indicator_coverage.build_coverage(compiled_data, index, countries)
+
+    with open(coverage_file, 'w', encoding='utf-8') as f:
+        json.dump(coverage, f, separators=(',', ':'))
+    with open(report_file, 'w', encoding='utf-8') as f:
+        f.write(indicator_coverage.format_report(coverage))
+
+    series = sum(len(source['series']) for source in coverage['sources'].values())
+    print(f"\nCoverage written to {coverage_file} (report: {report_file})")
+    print(f"   File size: {coverage_file.stat().st_size / 1024:.1f} KB")
+    print(f"   Indicators: {len(coverage['indicators'])}, source series: {series}")
+
+def shard_name(indicator_id, used):
+    """File name for an indicator's shard, e.g. 'HALE (Healthy...)' -> 'hale-healthy-....json'"""
+    slug = re.sub(r'[^a-z0-9]+', '-', indicator_id.lower()).strip('-') or 'indicator'
+    name = slug
+    suffix = 2
+    while name in used:
+        name = f'{slug}-{suffix}'
+        suffix += 1
+    used.add(name)
+    return name + '.json'
+
+def write_indicator_shards(index, shards_dir=SHARDS_DIR):
+    """Write one shard per indicator plus a manifest for lazy loading in js/app.js"""
+    shards_dir.mkdir(parents=True, exist_ok=True)
+    manifest = {}
+    used = set()
+
+    for indicator_id, entry in index['indicators'].items():
+        name = shard_name(indicator_id, used)
+        payload = json.dumps(dict(entry, id=indicator_id), separators=(',', ':')).encode('utf-8')
+        (shards_dir / name).write_bytes(payload)
+
+        manifest[indicator_id] = {
+            'shard': name,
+            'bytes': len(payload),
+            'sha256': hashlib.sha256(payload).hexdigest(),
+            'years': entry['years']
+        }
+
+    # Remove shards left over from indicators that are no longer configured
+    current = {entry['shard'] for entry in manifest.values()}
+    for stale in shards_dir.glob('*.json'):
+        if stale.name != SHARD_MANIFEST_NAME and stale.name not in current:
+            stale.unlink()
+
+    manifest_file = shards_dir / SHARD_MANIFEST_NAME
+    with open(manifest_file, 'w', encoding='utf-8') as f:
+        json.dump({'version': 1, 'indicators': manifest}, f, separators=(',', ':'))
+
+    total_kb = sum(entry['bytes'] for entry in manifest.values()) / 1024
+    print(f"\nIndicator shards written to {shards_dir}/")
+    print(f"   Shards: {len(manifest)} ({total_kb:.1f} KB total)")
+    print(f"   Manifest size: {manifest_file.stat().st_size / 1024:.1f} KB")
+
+def parse_sources(csv_files, jobs=1, projection=None, who_spec=None, countries=TARGET_COUNTRIES,
+                  profile=False):
+    """Yield (csv_file, filtered_rows, stages) in input order, fanning out to a process pool when jobs > 1
+
+    stages holds the file's stage records with profile=True, else None.
+    """
+    file_projections = [projection.get(f.name) if projection else None for f in csv_files]
+    parse = profile_source if profile else process_source
+
+    if jobs > 1 and len(csv_files) > 1:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(csv_files))) as pool:
+            # map() returns results in submission order, so output is deterministic
+            results = zip(csv_files, pool.map(parse, csv_files, file_projections,
+                                              repeat(who_spec), repeat(countries)))
+            for csv_file, result in results:
+                yield (csv_file, *result) if profile else (csv_file, result, None)
+    else:
+        for csv_file, file_projection in zip(csv_files, file_projections):
+            result = parse(csv_file, file_projection, who_spec, countries)
+            yield (csv_file, *result) if profile else (csv_file, result, None)
+
+def compile_data(incremental=False, cache_dir=CACHE_DIR, jobs=1,
+                 output_format='rows', sig_digits=DEFAULT_SIG_DIGITS, shards=False,
+                 project=False, reduce_who=False, store=False,
+                 sqlite=False, portfolios=None, profiler=build_profile.DISABLED):
+    """Compile all CSV files into a single JSON structure
+
+    With portfolios (a list of ids from data/portfolios.json) the sources
+    are parsed once for all of their countries and the rows are fanned
+    out to one output directory per portfolio (see write_portfolios).
+    An enabled profiler records every stage and source file (--profile).
+    """
+    portfolios_dir = Path('Portfolios')
+    compiled_data = {}
+
+    with profiler.stage('load-config'):
+        categories = load_categories()
+        csv_files = [f for f in get_source_files(portfolios_dir) if f.exists()]
+
+    print(f"Found {len(csv_files)} CSV files to compile...")
+
+    projection = None
+    if project:
+        # Only parse sources, series and columns the category config displays
+        projection = build_projection(categories)
+        skipped = [f.name for f in csv_files if f.name not in projection]
+        csv_files = [f for f in csv_files if f.name in projection]
+        print(f"Projection: {len(csv_files)} referenced files, skipping {len(skipped)} unreferenced")
+
+    # One numeric value per country-year for WHO files (see reduce_who_rows)
+    who_spec = load_who_dimension_spec() if reduce_who else None
+
+    countries = TARGET_COUNTRIES
+    parse_who_spec = who_spec
+    if portfolios:
+        countries = country_portfolios.union(portfolios)
+        # Reduction depends on every row of a file, so it runs per portfolio after the fan-out
+        parse_who_spec = None
+        print(f"Portfolios: {', '.join(portfolios)} (one parse pass for "
+              f"{'all' if countries is None else len(countries)} countries)")
+
+    results = {}
+    cached = set()
+
+    if incremental:
+        with profiler.stage('load-cache') as stage:
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            manifest = load_manifest(cache_dir)
+            new_manifest = {}
+            signature = filter_signature(projection, parse_who_spec, countries)
+
+            for csv_file in csv_files:
+                filtered_rows, entry = load_cached_source(
+                    csv_file, manifest.get(csv_file.name), signature, cache_dir)
+                if filtered_rows is not None:
+                    results[csv_file] = filtered_rows
+                    cached.add(csv_file)
+                    new_manifest[csv_file.name] = entry
+            stage['rows_out'] = sum(len(rows) for rows in results.values())
+
+    stale_files = [f for f in csv_files if f not in results]
+    if jobs > 1 and len(stale_files) > 1:
+        print(f"Parsing {len(stale_files)} files with {jobs} worker processes...")
+
+    with profiler.stage('parse') as stage:
+        for csv_file, filtered_rows, source_stages in parse_sources(
+                stale_files, jobs, projection, parse_who_spec, countries, profiler.enabled):
+            results[csv_file] = filtered_rows
+            profiler.add_source(csv_file.name, source_stages)
+            if incremental:
+                new_manifest[csv_file.name] = store_cached_source(
+                    csv_file, filtered_rows, signature, cache_dir)
+        stage['rows_in'] = sum(profiler.sources[f.name]['rows_in'] for f in stale_files
+                               if f.name in profiler.sources) if profiler.enabled else None
+        stage['rows_out'] = sum(len(results[f]) for f in stale_files)
+
+    for csv_file in cached:
+        profiler.add_source(csv_file.name, [], cached=True, rows_out=len(results[csv_file]))
+
+    # Assemble in source order so serial, parallel and incremental builds are identical
+    for csv_file in csv_files:
+        filename = csv_file.name
+        filtered_rows = results[csv_file]
+
+        if csv_file in cached:
+            print(f"Reusing cached {filename}")
+        else:
+            print(f"Processing {filename}...")
 
         if filtered_rows:
             compiled_data[filename] = filtered_rows
             print(f"  -> Added {len(filtered_rows)} rows")
 
-    # Write compiled data
-    output_file = Path('data') / 'compiled-indicators.json'
+    if incremental:
+        # Drop cache entries for sources that no longer exist
+        for filename, entry in manifest.items():
+            if filename not in new_manifest:
+                (cache_dir / entry['cache']).unlink(missing_ok=True)
+        save_manifest(cache_dir, new_manifest)
+        print(f"\nIncremental build: reused {len(cached)}, re-parsed {len(stale_files)}")
+
+    if portfolios:
+        write_portfolios(compiled_data, categories, portfolios, who_spec, output_format, sig_digits,
+                         profiler)
+        return
+
+    total_rows = sum(len(rows) for rows in compiled_data.values())
+    with profiler.stage('write-compiled', rows_in=total_rows):
+        write_compiled_data(compiled_data, Path('data') / 'compiled-indicators.json',
+                            output_format, sig_digits)
+
+    with profiler.stage('index', rows_in=total_rows) as stage:
+        index = write_indicator_index(compiled_data, categories)
+        stage['rows_out'] = len(index['indicators'])
+    with profiler.stage('profiles'):
+        write_country_profiles(index, categories)
+    with profiler.stage('cubes'):
+        write_timeseries_cubes(index, categories)
+    with profiler.stage('coverage', rows_in=total_rows):
+        write_coverage(compiled_data, index, categories)
+
+    if store:
+        with profiler.stage('store', rows_in=total_rows):
+            write_indicator_store(compiled_data)
+
+    if sqlite:
+        with profiler.stage('sqlite', rows_in=total_rows):
+            write_indicator_database(compiled_data, categories)
+
+    if shards:
+        with profiler.stage('shards'):
+            write_indicator_shards(index)
+    elif (SHARDS_DIR / SHARD_MANIFEST_NAME).exists():
+        # A manifest from an earlier --shards build would serve stale data to the app
+        (SHARDS_DIR / SHARD_MANIFEST_NAME).unlink()
+        print(f"\nRemoved stale shard manifest from {SHARDS_DIR}/")
+
+    if ARTIFACT_MANIFEST_FILE.exists():
+        # The packaged (content-hashed) copies now predate this build
+        ARTIFACT_MANIFEST_FILE.unlink()
+        print(f"\nRemoved stale {ARTIFACT_MANIFEST_FILE}; run package-artifacts.py to repackage")
+
+def write_compiled_data(compiled_data, output_file, output_format='rows',
+                        sig_digits=DEFAULT_SIG_DIGITS):
+    """Write the compiled rows as JSON (rows or columnar layout)"""
     with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(compiled_data, f, separators=(',', ':'))
+        if output_format == 'columnar':
+            json.dump(encode_columnar(compiled_data, sig_digits), f, separators=(',', ':'))
+        else:
+            json.dump(compiled_data, f, separators=(',', ':'))
 
     file_size_mb = output_file.stat().st_size / (1024 * 1024)
-    print(f"\nCompiled data written to {output_file}")
+    print(f"\nCompiled data written to {output_file} ({output_format} format)")
     print(f"   File size: {file_size_mb:.2f} MB")
     print(f"   Total files: {len(compiled_data)}")
 
+def row_country(row):
+    """Normalized country of a filtered row (same column order as iter_filtered_rows)"""
+    return row.get('Country Name') or row.get('GEO_NAME_SHORT') or row.get('location_name')
+
+def split_portfolios(compiled_data, portfolio_ids):
+    """Fan rows out to {portfolio id: {file name: [rows]}}, one membership lookup per row"""
+    lookup, everywhere = country_portfolios.membership(portfolio_ids)
+    outputs = {portfolio_id: {} for portfolio_id in portfolio_ids}
+
+    for filename, rows in compiled_data.items():
+        selected = {portfolio_id: [] for portfolio_id in portfolio_ids}
+        for row in rows:
+            for portfolio_id in lookup.get(row_country(row), ()) + everywhere:
+                selected[portfolio_id].append(row)
+        for portfolio_id, portfolio_rows in selected.items():
+            if portfolio_rows:
+                outputs[portfolio_id][filename] = portfolio_rows
+
+    return outputs
+
+def reference_countries(categories, reference_file=COUNTRY_REFERENCE_FILE):
+    """{country name: ISO3} of real countries: the geometry source, then the category config"""
+    names = {}
+    if reference_file.exists():
+        with open(reference_file, 'r', encoding='utf-8') as f:
+            features = json.load(f)['features']
+        for feature in features:
+            properties = feature['properties']
+            code = next((properties[field] for field in REFERENCE_CODE_FIELDS
+                         if ISO3_PATTERN.fullmatch(str(properties.get(field)))), None)
+            if code:
+                for field in REFERENCE_NAME_FIELDS:
+                    if properties.get(field):
+                        names.setdefault(properties[field], code)
+    names.update((country['name'], country['code']) for country in categories['countries'])
+    return names
+
+def country_codes(compiled_data, categories):
+    """{country name: ISO3} of real countries
+
+    Names come from the geometry source and the category config, plus
+    World Bank spellings whose code is one of theirs; aggregates such as
+    "(IFRC 25)" or "SSF" (Sub-Saharan Africa) are left out.
+    """
+    reference = reference_countries(categories)
+    known = {code for code in reference.values() if code and ISO3_PATTERN.fullmatch(code)}
+    codes = {}
+    for rows in compiled_data.values():
+        for row in rows:
+            if row.get('Country Name') and row.get('Country Code') in known:
+                codes.setdefault(row['Country Name'], row['Country Code'])
+    codes.update((name, code) for name, code in reference.items() if code in known)
+    return codes
+
+def write_portfolios(compiled_data, categories, portfolio_ids, who_spec=None,
+                     output_format='rows', sig_digits=DEFAULT_SIG_DIGITS,
+                     profiler=build_profile.DISABLED):
+    """Write compiled data, index, profiles and cubes per portfolio
+
+    Each portfolio gets data/portfolios/<id>/ with the same files a
+    default build writes to data/ (a portfolio's outputs match a default
+    build for the same countries). A "*" portfolio holds the source
+    countries with a real ISO3 code (see country_codes), so regional and
+    income aggregates are not counted or profiled as countries.
+    """
+    codes = country_codes(compiled_data, categories)
+
+    with profiler.stage('split-portfolios',
+                        rows_in=sum(len(rows) for rows in compiled_data.values())):
+        outputs = split_portfolios(compiled_data, portfolio_ids)
+
+    for portfolio_id, portfolio_data in outputs.items():
+        if who_spec is not None:
+            with profiler.stage(f'{portfolio_id}:reduce-who'):
+                reduced = {}
+                for filename, rows in portfolio_data.items():
+                    if 'GEO_NAME_SHORT' in rows[0]:
+                        rows = reduce_who_rows(filename, rows, who_spec)
+                    if rows:
+                        reduced[filename] = rows
+                portfolio_data = reduced
+
+        names = country_portfolios.countries(portfolio_id)
+        if names is None:
+            names = sorted({row_country(row) for rows in portfolio_data.values() for row in rows}
+                           & codes.keys())
+            # Aggregate rows would still be indexed and counted in the coverage report
+            kept = {}
+            for filename, rows in portfolio_data.items():
+                rows = [row for row in rows if row_country(row) in codes]
+                if rows:
+                    kept[filename] = rows
+            portfolio_data = kept
+        portfolio_categories = dict(categories, countries=[
+            {'name': name, 'code': codes.get(name)} for name in names])
+
+        output_dir = PORTFOLIO_OUTPUT_DIR / portfolio_id
+        output_dir.mkdir(parents=True, exist_ok=True)
+        print(f"\n=== Portfolio {portfolio_id}: {len(names)} countries ===")
+
+        total_rows = sum(len(rows) for rows in portfolio_data.values())
+        with profiler.stage(f'{portfolio_id}:write-compiled', rows_in=total_rows):
+            write_compiled_data(portfolio_data, output_dir / 'compiled-indicators.json',
+                                output_format, sig_digits)
+        with profiler.stage(f'{portfolio_id}:index', rows_in=total_rows) as stage:
+            index = write_indicator_index(portfolio_data, portfolio_categories,
+                                          output_dir / INDEX_FILE.name)
+            stage['rows_out'] = len(index['indicators'])
+        with profiler.stage(f'{portfolio_id}:profiles'):
+            write_country_profiles(index, portfolio_categories, output_dir / PROFILES_DIR.name)
+        with profiler.stage(f'{portfolio_id}:cubes'):
+            write_timeseries_cubes(index, portfolio_categories, output_dir / CUBES_FILE.name)
+        with profiler.stage(f'{portfolio_id}:coverage', rows_in=total_rows):
+            write_coverage(portfolio_data, index, portfolio_categories,
+                           output_dir / indicator_coverage.COVERAGE_FILE.name,
+                           output_dir / indicator_coverage.REPORT_FILE.name)
+
+def write_indicator_store(compiled_data):
+    """Write the typed long-format Arrow store for the analysis scripts"""
+    table = indicator_store.write_store(compiled_data, indicator_store.STORE_FILE)
+
+    file_size_mb = indicator_store.STORE_FILE.stat().st_size / (1024 * 1024)
+    print(f"\nIndicator store written to {indicator_store.STORE_FILE}")
+    print(f"   File size: {file_size_mb:.2f} MB")
+    print(f"   Observations: {table.num_rows:,}")
+
+def write_indicator_database(compiled_data, categories):
+    """Write the indexed SQLite database queried by query-indicators.py"""
+    count = indicator_db.build_database(compiled_data, indicator_db.DB_FILE,
+                                        categories.get('countries', []))
+
+    file_size_mb = indicator_db.DB_FILE.stat().st_size / (1024 * 1024)
+    print(f"\nSQLite database written to {indicator_db.DB_FILE}")
+    print(f"   File size: {file_size_mb:.2f} MB")
+    print(f"   Observations: {count:,}")
+
+def job_count(value):
+    """argparse type for --jobs: a positive integer, or 0 for one per CPU"""
+    jobs = int(value)
+    if jobs < 0:
+        raise argparse.ArgumentTypeError('must be >= 0')
+    return jobs or os.cpu_count() or 1
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('--incremental', action='store_true',
+                        help='reuse cached filtered rows for unchanged source files')
+    parser.add_argument('--cache-dir', type=Path,
+                        help=f'incremental build cache directory (default: {CACHE_DIR})')
+    parser.add_argument('-j', '--jobs', type=job_count, default=1,
+                        help='parse source files in N worker processes (0 = one per CPU)')
+    parser.add_argument('--format', dest='output_format', choices=['rows', 'columnar'],
+                        default='rows',
+                        help='compiled JSON layout: one dict per row, or dictionary-encoded columns')
+    parser.add_argument('--sig-digits', type=int, default=DEFAULT_SIG_DIGITS,
+                        help=f'significant digits kept for numbers in columnar format '
+                             f'(default: {DEFAULT_SIG_DIGITS})')
+    parser.add_argument('--project', action='store_true',
+                        help='keep only the files, series and columns referenced by '
+                             'indicator-categories.json')
+    parser.add_argument('--reduce-who', action='store_true',
+                        help='reduce WHO files to the total slice: one numeric VALUE '
+                             'per country and year (see data/who-dimension-spec.json)')
+    parser.add_argument('--shards', action='store_true',
+                        help=f'also write one lazily-loaded shard per indicator to {SHARDS_DIR}/')
+    parser.add_argument('--store', action='store_true',
+                        help=f'also write the typed long-format Arrow store to '
+                             f'{indicator_store.STORE_FILE} (needs pyarrow)')
+    parser.add_argument('--sqlite', action='store_true',
+                        help=f'also write the indexed SQLite database to {indicator_db.DB_FILE} '
+                             f'(query it with query-indicators.py)')
+    parser.add_argument('--portfolio', dest='portfolios', action='append',
+                        choices=country_portfolios.portfolio_ids(),
+                        help=f'build a portfolio from data/portfolios.json into '
+                             f'{PORTFOLIO_OUTPUT_DIR}/<id>/ (repeatable; sources are parsed once)')
+    parser.add_argument('--profile', nargs='?', type=Path, const=True, metavar='REPORT',
+                        help=f'record wall/CPU time, rows and peak RSS per stage and source file '
+                             f'in a JSON run report (default: {build_profile.REPORT_DIR}/'
+                             f'compile-data-<timestamp>.json)')
+    parser.add_argument('--cprofile', type=Path, metavar='FILE',
+                        help='also dump cProfile stats of the main process to FILE '
+                             '(pstats format, for snakeviz/flameprof)')
+    args = parser.parse_args()
+    if args.portfolios and (args.shards or args.store or args.sqlite):
+        parser.error('--shards, --store and --sqlite apply to the default build only')
+    if args.store and indicator_store.pa is None:
+        parser.error('--store needs pyarrow (pip install pyarrow)')
+    return args
+
 if __name__ == '__main__':
+    args = parse_args()
+    # Paths given on the command line are relative to the caller's directory
+    cache_dir = args.cache_dir.resolve() if args.cache_dir else CACHE_DIR
+    if isinstance(args.profile, Path):
+        args.profile = args.profile.resolve()
+    if args.cprofile:
+        args.cprofile = args.cprofile.resolve()
     os.chdir(Path(__file__).parent)
-    compile_data()
+    profiler = build_profile.Profiler(enabled=args.profile is not None)
+    options = dict(incremental=args.incremental, cache_dir=cache_dir, jobs=args.jobs,
+                   output_format=args.output_format, sig_digits=args.sig_digits,
+                   shards=args.shards, project=args.project, reduce_who=args.reduce_who,
+                   store=args.store, sqlite=args.sqlite,
+                   portfolios=list(dict.fromkeys(args.portfolios or [])))
+    if args.cprofile:
+        build_profile.run_with_cprofile(args.cprofile, compile_data, profiler=profiler, **options)
+    else:
+        compile_data(profiler=profiler, **options)
+    if profiler.enabled:
+        report_file = (build_profile.default_report_path(SCRIPT_PATH.name)
+                       if args.profile is True else args.profile)
+        profiler.write(report_file, SCRIPT_PATH.name, options)
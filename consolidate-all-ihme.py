@@ -1,57 +1,41 @@
 #!/usr/bin/env python3
 """Consolidate ALL IHME files into one comprehensive file"""
 
+import argparse
 import csv
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import repeat
 from pathlib import Path
-from collections import defaultdict
-
-# Target countries
-TARGET_COUNTRIES = [
-    'Afghanistan', 'Bangladesh', 'Burkina Faso', 'Cameroon',
-    'Central African Republic', 'Chad', 'Colombia', 'Democratic Republic of the Congo',
-    'Ethiopia', 'Haiti', 'Lebanon', 'Mali', 'Mozambique', 'Myanmar',
-    'Niger', 'Nigeria', 'Pakistan', 'Somalia', 'South Sudan', 'Sudan',
-    'Syrian Arab Republic', 'Uganda', 'Ukraine', 'Venezuela', 'Yemen'
-]
-
-# Alternative country names that might appear in the data
-COUNTRY_ALIASES = {
-    'Congo DR': 'Democratic Republic of the Congo',
-    'DR Congo': 'Democratic Republic of the Congo',
-    'Syria': 'Syrian Arab Republic',
-    'Venezuela (Bolivarian Republic of)': 'Venezuela',
-    'Bolivarian Republic of Venezuela': 'Venezuela'
-}
 
-portfolios_dir = Path('Portfolios')
-output_file = portfolios_dir / 'IHME_GBD_ALL_YEARS_CONSOLIDATED.csv'
-
-print("="*70)
-print("CONSOLIDATING ALL IHME FILES")
-print("="*70)
+import build_profile
+import country_portfolios
+import ihme_filters
 
-# Get all IHME files
-ihme_files = sorted(portfolios_dir.glob('IHME*.csv'))
-print(f"\nFound {len(ihme_files)} IHME files:")
-for f in ihme_files:
-    print(f"  - {f.name}")
+# Target countries of the default portfolio, and the other spellings IHME
+# uses for them (data/portfolios.json)
+TARGET_COUNTRIES = country_portfolios.countries()
+COUNTRY_ALIASES = country_portfolios.aliases()
 
-# Track all unique measures, years, and data
-all_data = []
-measures_by_year = defaultdict(lambda: defaultdict(int))
-files_processed = 0
-total_rows_read = 0
-total_rows_kept = 0
+portfolios_dir = Path('Portfolios')
+output_file = portfolios_dir / 'IHME_GBD_ALL_YEARS_CONSOLIDATED.csv'
 
-# Determine all possible column names
-all_columns = set()
 
-print(f"\n{'='*70}")
-print("PROCESSING FILES")
-print("="*70)
+def process_ihme_file(ihme_file):
+    """Read one IHME file and return (fieldnames, kept_rows, rows_read, error)
 
-for ihme_file in ihme_files:
-    print(f"\nProcessing: {ihme_file.name}")
+    Target-country rows are collected and then reduced to aggregate rows
+    with the shared filter in ihme_filters (data/ihme-filter-spec.json).
+    Rows kept before a read error are still returned, matching the
+    behaviour of the original sequential loop.
+    """
+    fieldnames = []
+    country_rows = []
+    rows_in_file = 0
+    target_countries = set(TARGET_COUNTRIES)
 
     try:
         with open(ihme_file, 'r', encoding='utf-8') as f:
@@ -59,133 +43,307 @@ for ihme_file in ihme_files:
 
             # Collect column names
             fieldnames = reader.fieldnames
-            all_columns.update(fieldnames)
-
-            rows_in_file = 0
-            rows_kept = 0
 
             for row in reader:
                 rows_in_file += 1
-                total_rows_read += 1
 
-                # Normalize country name
-                location_name = row.get('location_name', '')
-                if location_name in COUNTRY_ALIASES:
-                    location_name = COUNTRY_ALIASES[location_name]
+                # Normalize country name and keep target countries
+                if is_target_row(row, target_countries):
+                    country_rows.append(row)
 
-                # Check if target country
-                if location_name not in TARGET_COUNTRIES:
-                    continue
+    except Exception as e:
+        return fieldnames, ihme_filters.filter_rows(country_rows), rows_in_file, e
 
-                # Get key fields
-                measure_name = row.get('measure_name', '')
-                year = row.get('year', '')
-                age_name = row.get('age_name', '')
-                sex_name = row.get('sex_name', '')
-                metric_name = row.get('metric_name', '')
-                cause_name = row.get('cause_name', '')
-                rei_name = row.get('rei_name', '')
-
-                # Apply filtering logic (same as compile-data.py)
-                # For life expectancy and HALE: use "0-6 days" age (at birth), "Years" metric
-                if measure_name in ['Life expectancy', 'HALE (Healthy life expectancy)']:
-                    if age_name != '0-6 days' or sex_name != 'Both' or metric_name != 'Years':
-                        continue
-                    # Skip rows with any cause or risk factor
-                    if cause_name or rei_name:
-                        continue
-                # For all other measures: "All ages", "Both sexes", "All causes", no risk factor, "Rate" metric
-                else:
-                    # Only include "All causes" and no specific risk factor
-                    if cause_name and cause_name != 'All causes':
-                        continue
-                    if rei_name:  # Skip any row with a risk factor
-                        continue
-                    # Must be "All ages", "Both sexes"
-                    if age_name != 'All ages' or sex_name != 'Both':
-                        continue
-                    # Must use "Rate" metric
-                    if metric_name != 'Rate':
-                        continue
+    return fieldnames, ihme_filters.filter_rows(country_rows), rows_in_file, None
 
-                # Update normalized location name in row
-                row['location_name'] = location_name
 
-                # Keep this row
-                all_data.append(row)
-                rows_kept += 1
-                total_rows_kept += 1
+def is_target_row(row, target_countries):
+    """Normalize a row's location name in place; True if it is a target country"""
+    location_name = row.get('location_name', '')
+    if location_name in COUNTRY_ALIASES:
+        location_name = COUNTRY_ALIASES[location_name]
+    if location_name not in target_countries:
+        return False
+    row['location_name'] = location_name
+    return True
 
-                # Track measure-year combination
-                measures_by_year[measure_name][year] += 1
 
-            print(f"  Rows read: {rows_in_file:,}")
-            print(f"  Rows kept: {rows_kept:,}")
-            files_processed += 1
+def add_row_stats(stats, rows):
+    """Count rows and collect countries per (measure, year) into stats"""
+    for row in rows:
+        entry = stats.setdefault((row.get('measure_name', ''), row.get('year', '')), [0, set()])
+        entry[0] += 1
+        entry[1].add(row.get('location_name', ''))
 
-    except Exception as e:
-        print(f"  ERROR: {e}")
-        continue
-
-print(f"\n{'='*70}")
-print("SUMMARY")
-print("="*70)
-print(f"Files processed: {files_processed}")
-print(f"Total rows read: {total_rows_read:,}")
-print(f"Total rows kept: {total_rows_kept:,}")
-print(f"Unique columns: {len(all_columns)}")
-
-# Determine standard column order (all possible columns)
-standard_columns = sorted(all_columns)
-
-print(f"\n{'='*70}")
-print("DATA AVAILABILITY BY MEASURE AND YEAR")
-print("="*70)
-
-for measure in sorted(measures_by_year.keys()):
-    print(f"\n{measure}:")
-    years_data = measures_by_year[measure]
-    for year in sorted(years_data.keys()):
-        print(f"  {year}: {years_data[year]} rows")
-
-# Write consolidated file
-print(f"\n{'='*70}")
-print("WRITING CONSOLIDATED FILE")
-print("="*70)
-
-with open(output_file, 'w', newline='', encoding='utf-8') as f:
-    writer = csv.DictWriter(f, fieldnames=standard_columns, extrasaction='ignore')
-    writer.writeheader()
-
-    for row in all_data:
-        writer.writerow(row)
-
-file_size_mb = output_file.stat().st_size / (1024 * 1024)
-print(f"\n✓ Consolidated file written: {output_file.name}")
-print(f"  Size: {file_size_mb:.2f} MB")
-print(f"  Rows: {total_rows_kept:,}")
-print(f"  Columns: {len(standard_columns)}")
-
-print(f"\n{'='*70}")
-print("VERIFICATION: Data for each indicator")
-print("="*70)
-
-# Count unique countries per measure-year
-countries_per_measure_year = defaultdict(lambda: defaultdict(set))
-for row in all_data:
-    measure = row.get('measure_name', '')
-    year = row.get('year', '')
-    country = row.get('location_name', '')
-    countries_per_measure_year[measure][year].add(country)
-
-print("\nCountries with data per measure-year:")
-for measure in sorted(countries_per_measure_year.keys()):
-    print(f"\n{measure}:")
-    years_data = countries_per_measure_year[measure]
-    for year in sorted(years_data.keys()):
-        num_countries = len(years_data[year])
-        print(f"  {year}: {num_countries}/25 countries")
-
-print("\n" + "="*70)
-print("✓ CONSOLIDATION COMPLETE")
-print("="*70)
+
+def read_header(ihme_file):
+    """Column names of an IHME file (empty if it cannot be read)"""
+    try:
+        with open(ihme_file, 'r', encoding='utf-8') as f:
+            return next(csv.reader(f), [])
+    except Exception:
+        return []
+
+
+def stream_ihme_file(ihme_file, columns, part_file, chunk_rows=ihme_filters.DEFAULT_CHUNK_ROWS):
+    """Filter one IHME file into part_file (no header) a chunk at a time
+
+    Only target-country rows are buffered, at most chunk_rows of them, so
+    memory does not grow with the file. Returns (rows_read, rows_kept,
+    stats, error) where stats is {(measure, year): [rows, countries]}; as
+    in process_ihme_file, rows kept before a read error are still written.
+    """
+    target_countries = set(TARGET_COUNTRIES)
+    rows_in_file = 0
+    rows_kept = 0
+    stats = {}
+    chunk = []
+
+    with open(part_file, 'w', newline='', encoding='utf-8') as out:
+        writer = csv.DictWriter(out, fieldnames=columns, extrasaction='ignore')
+
+        def flush():
+            kept = ihme_filters.filter_rows(chunk)
+            writer.writerows(kept)
+            add_row_stats(stats, kept)
+            chunk.clear()
+            return len(kept)
+
+        try:
+            with open(ihme_file, 'r', encoding='utf-8') as f:
+                for row in csv.DictReader(f):
+                    rows_in_file += 1
+                    if not is_target_row(row, target_countries):
+                        continue
+                    chunk.append(row)
+                    if len(chunk) >= chunk_rows:
+                        rows_kept += flush()
+        except Exception as e:
+            rows_kept += flush()
+            return rows_in_file, rows_kept, stats, e
+
+        rows_kept += flush()
+
+    return rows_in_file, rows_kept, stats, None
+
+
+def run_file(func, stage_name, profile, *args):
+    """func(*args) as (result, stages); the stage record is kept with profile=True, else None"""
+    if profile:
+        return build_profile.profile_call(func, stage_name, *args)
+    return func(*args), None
+
+
+def stream_ihme_files(ihme_files, columns, part_files, jobs=1, chunk_rows=ihme_filters.DEFAULT_CHUNK_ROWS,
+                      profile=False):
+    """Yield (ihme_file, result, stages) in file order, streaming each file to its part file"""
+    worker = partial(run_file, stream_ihme_file, 'stream-filter', profile)
+    if jobs > 1 and len(ihme_files) > 1:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(ihme_files))) as pool:
+            results = pool.map(worker, ihme_files, repeat(columns), part_files, repeat(chunk_rows))
+            for ihme_file, (result, stages) in zip(ihme_files, results):
+                yield ihme_file, result, stages
+    else:
+        for ihme_file, part_file in zip(ihme_files, part_files):
+            yield ihme_file, *worker(ihme_file, columns, part_file, chunk_rows)
+
+
+def read_ihme_files(ihme_files, jobs=1, profile=False):
+    """Yield (ihme_file, result, stages) in file order, using a process pool when jobs > 1"""
+    worker = partial(run_file, process_ihme_file, 'read-filter', profile)
+    if jobs > 1 and len(ihme_files) > 1:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(ihme_files))) as pool:
+            # map() preserves submission order, so the merged output matches the serial run
+            for ihme_file, (result, stages) in zip(ihme_files, pool.map(worker, ihme_files)):
+                yield ihme_file, result, stages
+    else:
+        for ihme_file in ihme_files:
+            yield ihme_file, *worker(ihme_file)
+
+
+def consolidate(jobs=1, stream=False, chunk_rows=ihme_filters.DEFAULT_CHUNK_ROWS,
+                profiler=build_profile.DISABLED):
+    """Consolidate the IHME files into output_file
+
+    By default every kept row is held in memory until the output is
+    written. With stream=True the columns come from a header pre-pass and
+    each file is filtered chunk by chunk straight to a part file, so peak
+    memory does not depend on the input size; the output is identical.
+    An enabled profiler records every stage and file (--profile).
+    """
+    print("="*70)
+    print("CONSOLIDATING ALL IHME FILES")
+    print("="*70)
+
+    # Get all IHME files
+    ihme_files = sorted(portfolios_dir.glob('IHME*.csv'))
+    print(f"\nFound {len(ihme_files)} IHME files:")
+    for f in ihme_files:
+        print(f"  - {f.name}")
+
+    # Per (measure, year): [rows, countries]; both modes accumulate it file by file
+    stats = {}
+    all_data = []
+    files_processed = 0
+    total_rows_read = 0
+    total_rows_kept = 0
+
+    # Determine all possible column names
+    all_columns = set()
+    if stream:
+        # Header pre-pass: the output columns must be known before the first row is written
+        with profiler.stage('read-headers'):
+            for ihme_file in ihme_files:
+                all_columns.update(read_header(ihme_file))
+    standard_columns = sorted(all_columns)
+
+    print(f"\n{'='*70}")
+    print("PROCESSING FILES")
+    if stream:
+        print(f"(streaming in chunks of {chunk_rows:,} rows)")
+    if jobs > 1:
+        print(f"(parsing with {jobs} worker processes)")
+    print("="*70)
+
+    with tempfile.TemporaryDirectory(dir=output_file.parent, prefix='.consolidate-') as parts_dir:
+        part_files = []
+        if stream:
+            part_files = [Path(parts_dir) / f'{i:05d}.csv' for i in range(len(ihme_files))]
+            results = stream_ihme_files(ihme_files, standard_columns, part_files, jobs, chunk_rows,
+                                        profiler.enabled)
+        else:
+            results = read_ihme_files(ihme_files, jobs, profiler.enabled)
+
+        with profiler.stage('process-files') as stage:
+            for ihme_file, result, file_stages in results:
+                if stream:
+                    rows_in_file, rows_kept, file_stats, error = result
+                    for key, (rows, countries) in file_stats.items():
+                        entry = stats.setdefault(key, [0, set()])
+                        entry[0] += rows
+                        entry[1] |= countries
+                else:
+                    fieldnames, kept_rows, rows_in_file, error = result
+                    all_columns.update(fieldnames or [])
+                    all_data.extend(kept_rows)
+                    rows_kept = len(kept_rows)
+                    add_row_stats(stats, kept_rows)
+
+                print(f"\nProcessing: {ihme_file.name}")
+                profiler.add_source(ihme_file.name, file_stages,
+                                    rows_in=rows_in_file, rows_out=rows_kept)
+                total_rows_read += rows_in_file
+                total_rows_kept += rows_kept
+
+                if error is not None:
+                    print(f"  ERROR: {error}")
+                    continue
+
+                print(f"  Rows read: {rows_in_file:,}")
+                print(f"  Rows kept: {rows_kept:,}")
+                files_processed += 1
+            stage['rows_in'] = total_rows_read
+            stage['rows_out'] = total_rows_kept
+
+        print(f"\n{'='*70}")
+        print("SUMMARY")
+        print("="*70)
+        print(f"Files processed: {files_processed}")
+        print(f"Total rows read: {total_rows_read:,}")
+        print(f"Total rows kept: {total_rows_kept:,}")
+        print(f"Unique columns: {len(all_columns)}")
+
+        # Determine standard column order (all possible columns)
+        standard_columns = sorted(all_columns)
+
+        print(f"\n{'='*70}")
+        print("DATA AVAILABILITY BY MEASURE AND YEAR")
+        print("="*70)
+
+        for measure in sorted({measure for measure, _ in stats}):
+            print(f"\n{measure}:")
+            for year in sorted(year for m, year in stats if m == measure):
+                print(f"  {year}: {stats[measure, year][0]} rows")
+
+        # Write consolidated file
+        print(f"\n{'='*70}")
+        print("WRITING CONSOLIDATED FILE")
+        print("="*70)
+
+        # Written beside the output and renamed, since the output is also one of the inputs
+        temp_file = Path(parts_dir) / output_file.name
+        with profiler.stage('write', rows_in=total_rows_kept):
+            with open(temp_file, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.DictWriter(f, fieldnames=standard_columns, extrasaction='ignore')
+                writer.writeheader()
+
+                for row in all_data:
+                    writer.writerow(row)
+
+                # Streamed rows were written per file already; append them in file order
+                for part_file in part_files:
+                    with open(part_file, 'r', newline='', encoding='utf-8') as part:
+                        shutil.copyfileobj(part, f)
+
+            os.replace(temp_file, output_file)
+
+    file_size_mb = output_file.stat().st_size / (1024 * 1024)
+    print(f"\n✓ Consolidated file written: {output_file.name}")
+    print(f"  Size: {file_size_mb:.2f} MB")
+    print(f"  Rows: {total_rows_kept:,}")
+    print(f"  Columns: {len(standard_columns)}")
+
+    print(f"\n{'='*70}")
+    print("VERIFICATION: Data for each indicator")
+    print("="*70)
+
+    print("\nCountries with data per measure-year:")
+    for measure in sorted({measure for measure, _ in stats}):
+        print(f"\n{measure}:")
+        for year in sorted(year for m, year in stats if m == measure):
+            num_countries = len(stats[measure, year][1])
+            print(f"  {year}: {num_countries}/{len(TARGET_COUNTRIES)} countries")
+
+    print("\n" + "="*70)
+    print("✓ CONSOLIDATION COMPLETE")
+    print("="*70)
+
+
+def job_count(value):
+    """argparse type for --jobs: a positive integer, or 0 for one per CPU"""
+    jobs = int(value)
+    if jobs < 0:
+        raise argparse.ArgumentTypeError('must be >= 0')
+    return jobs or os.cpu_count() or 1
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-j', '--jobs', type=job_count, default=1,
+                        help='read IHME files in N worker processes (0 = one per CPU)')
+    parser.add_argument('--stream', action='store_true',
+                        help='out-of-core mode: stream rows to the output in chunks '
+                             '(memory independent of input size)')
+    parser.add_argument('--chunk-rows', type=int, default=ihme_filters.DEFAULT_CHUNK_ROWS,
+                        help=f'rows buffered per file in --stream mode '
+                             f'(default: {ihme_filters.DEFAULT_CHUNK_ROWS:,})')
+    parser.add_argument('--profile', nargs='?', type=Path, const=True, metavar='REPORT',
+                        help=f'record wall/CPU time, rows and peak RSS per stage and file in a '
+                             f'JSON run report (default: {build_profile.REPORT_DIR}/'
+                             f'consolidate-all-ihme-<timestamp>.json)')
+    parser.add_argument('--cprofile', type=Path, metavar='FILE',
+                        help='also dump cProfile stats of the main process to FILE '
+                             '(pstats format, for snakeviz/flameprof)')
+    args = parser.parse_args()
+
+    profiler = build_profile.Profiler(enabled=args.profile is not None)
+    options = dict(jobs=args.jobs, stream=args.stream, chunk_rows=args.chunk_rows)
+    if args.cprofile:
+        build_profile.run_with_cprofile(args.cprofile, consolidate, profiler=profiler, **options)
+    else:
+        consolidate(profiler=profiler, **options)
+    if profiler.enabled:
+        script = Path(__file__).name
+        report_file = (build_profile.default_report_path(script)
+                       if args.profile is True else args.profile)
+        profiler.write(report_file, script, options)
@@ -8,21 +8,12 @@ import glob
 import os
 from pathlib import Path
 
-# Target countries
-TARGET_COUNTRIES = [
-    'Afghanistan', 'Bangladesh', 'Burkina Faso', 'Cameroon',
-    'Central African Republic', 'Chad', 'Colombia', 'Democratic Republic of the Congo',
-    'Ethiopia', 'Haiti', 'Lebanon', 'Mali', 'Mozambique', 'Myanmar',
-    'Niger', 'Nigeria', 'Pakistan', 'Somalia', 'South Sudan', 'Sudan',
-    'Syrian Arab Republic', 'Uganda', 'Ukraine', 'Venezuela (Bolivarian Republic of)', 'Yemen'
-]
-
-# Normalize country names for consistency with app
-COUNTRY_NAME_MAPPING = {
-    'Democratic Republic of the Congo': 'Congo DR',
-    'Syrian Arab Republic': 'Syria',
-    'Venezuela (Bolivarian Republic of)': 'Venezuela'
-}
+import country_portfolios
+
+# Target countries of the default portfolio, and the other spellings IHME
+# uses for them (data/portfolios.json); rows are written with the app's names
+TARGET_COUNTRIES = country_portfolios.countries()
+COUNTRY_NAME_MAPPING = country_portfolios.aliases()
 
 def consolidate_ihme_data():
     """Consolidate all IHME files into a single CSV"""
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Named country portfolios shared by the build scripts, driven by data/portfolios.json
+
+A portfolio is a named set of countries (the HREF 25, a regional set, or
+"*" for every country in the sources). Names use the app's spellings;
+the config's "aliases" map the other spellings found in the WHO, World
+Bank and IHME exports onto them. The default portfolio is the one
+compile-data.py and the IHME consolidation scripts build for the app.
+
+membership() turns several portfolios into one dict lookup per row, so a
+single parse pass can fan rows out to every portfolio
+(compile-data.py --portfolio).
+"""
+
+import json
+from pathlib import Path
+
+PORTFOLIOS_FILE = Path(__file__).resolve().parent / 'data' / 'portfolios.json'
+
+# "countries" value of a portfolio holding every country in the sources
+ALL_COUNTRIES = '*'
+
+_config_cache = {}
+
+
+def load_config(path=PORTFOLIOS_FILE):
+    """Load (and cache) a portfolio config"""
+    path = Path(path)
+    if path not in _config_cache:
+        with open(path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        if config.get('version') != 1:
+            raise ValueError(f"Unsupported portfolio config version: {config.get('version')}")
+        if config['default'] not in config['portfolios']:
+            raise ValueError(f"Default portfolio {config['default']!r} is not defined")
+        _config_cache[path] = config
+    return _config_cache[path]
+
+
+def portfolio_ids(config=None):
+    """Portfolio ids in config order"""
+    return list((config or load_config())['portfolios'])
+
+
+def aliases(config=None):
+    """{source spelling: app spelling}"""
+    return dict((config or load_config())['aliases'])
+
+
+def normalize(name, config=None):
+    """A country name in the app's spelling"""
+    return (config or load_config())['aliases'].get(name, name)
+
+
+def countries(portfolio_id=None, config=None):
+    """Country names of a portfolio (default: the default portfolio); None means every country"""
+    config = config or load_config()
+    portfolio_id = portfolio_id or config['default']
+    if portfolio_id not in config['portfolios']:
+        raise KeyError(f"Unknown portfolio {portfolio_id!r} (defined: {', '.join(config['portfolios'])})")
+    names = config['portfolios'][portfolio_id]['countries']
+    return None if names == ALL_COUNTRIES else list(names)
+
+
+def union(portfolio_ids, config=None):
+    """Countries in any of the portfolios, first-seen order; None if one holds every country"""
+    names = {}
+    for portfolio_id in portfolio_ids:
+        members = countries(portfolio_id, config)
+        if members is None:
+            return None
+        names.update(dict.fromkeys(members))
+    return list(names)
+
+
+def spellings(names, config=None):
+    """The names plus every alias that normalizes to one of them"""
+    wanted = set(names)
+    return list(names) + [alias for alias, name in aliases(config).items() if name in wanted]
+
+
+def membership(portfolio_ids, config=None):
+    """({country: (portfolio ids)}, (ids of portfolios holding every country))
+
+    A row of country c belongs to lookup.get(c, ()) + everywhere, so
+    fanning out costs one dict lookup per row however many portfolios
+    are built.
+    """
+    lookup = {}
+    everywhere = []
+    for portfolio_id in portfolio_ids:
+        members = countries(portfolio_id, config)
+        if members is None:
+            everywhere.append(portfolio_id)
+            continue
+        for name in members:
+            lookup[name] = lookup.get(name, ()) + (portfolio_id,)
+    return lookup, tuple(everywhere)
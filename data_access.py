@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Shared, cached data access for the check/verify/analyze scripts
+
+Each source (a CSV in Portfolios/ or data/compiled-indicators.json) is
+parsed at most once per content change: the parsed columns, plus indexes
+on the columns the scripts group by (INDEXED_COLUMNS), are pickled under
+.build-cache/data-access/ and reused while the file's SHA-256 is
+unchanged (size and mtime are checked first, so an untouched file is not
+even re-hashed). Within one process every source is also memoised.
+
+    import data_access
+    table = data_access.load_csv('Portfolios/IHME_GBD_ALL_YEARS_CONSOLIDATED.csv')
+    table.values('year')                                   # distinct years
+    table.where(measure_name='Life expectancy', year='2023')  # row dicts
+    table.group_by('measure_name', 'year')                 # {(m, y): [rows]}
+
+    compiled = data_access.load_compiled()                 # {file name: Table}
+"""
+
+import csv
+import hashlib
+import json
+import os
+import pickle
+from pathlib import Path
+
+from indicator_codec import decode_columnar, is_columnar
+
+CACHE_DIR = Path(__file__).resolve().parent / '.build-cache' / 'data-access'
+CACHE_VERSION = 1
+
+PORTFOLIOS_DIR = Path('Portfolios')
+COMPILED_FILE = Path('data') / 'compiled-indicators.json'
+
+# Columns indexed when a source is parsed (and stored with the cache)
+INDEXED_COLUMNS = ('measure_name', 'year', 'location_name', 'DIM_TIME',
+                   'GEO_NAME_SHORT', 'Series Code', 'Country Name')
+
+_memo = {}
+
+
+class Table:
+    """Column-stored rows with memoised equality indexes"""
+
+    def __init__(self, fieldnames, columns, indexes=None):
+        self.fieldnames = list(fieldnames)
+        self.columns = columns
+        self.indexes = dict(indexes or {})
+        self._rows = None
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Build a table from row dicts (columns in first-seen order, None where absent)"""
+        fieldnames = []
+        for row in rows:
+            for name in row:
+                if name not in fieldnames:
+                    fieldnames.append(name)
+        return cls(fieldnames, {name: [row.get(name) for row in rows] for name in fieldnames})
+
+    def __len__(self):
+        return len(self.columns[self.fieldnames[0]]) if self.fieldnames else 0
+
+    @property
+    def rows(self):
+        """All rows as dicts (built once, on first use)"""
+        if self._rows is None:
+            self._rows = [dict(zip(self.fieldnames, values))
+                          for values in zip(*(self.columns[name] for name in self.fieldnames))]
+        return self._rows
+
+    def column(self, name):
+        """A column's values (all None if the table has no such column)"""
+        return self.columns.get(name) or [None] * len(self)
+
+    def index(self, name):
+        """{value: [row positions]} for one column"""
+        if name not in self.indexes:
+            index = {}
+            for position, value in enumerate(self.column(name)):
+                index.setdefault(value, []).append(position)
+            self.indexes[name] = index
+        return self.indexes[name]
+
+    def values(self, name):
+        """Distinct values of a column (None and '' excluded)"""
+        return {value for value in self.index(name) if value not in (None, '')}
+
+    def positions(self, **equals):
+        """Positions of rows where every column equals the given value"""
+        selected = None
+        for name, value in equals.items():
+            matches = self.index(name).get(value, [])
+            if selected is None:
+                selected = matches
+            else:
+                wanted = set(matches)
+                selected = [p for p in selected if p in wanted]
+        return list(range(len(self))) if selected is None else sorted(selected)
+
+    def where(self, **equals):
+        """Row dicts where every column equals the given value, in file order"""
+        rows = self.rows
+        return [rows[p] for p in self.positions(**equals)]
+
+    def group_by(self, *names, **equals):
+        """{value (or tuple of values): [row dicts]} for the rows matching equals"""
+        rows = self.rows
+        groups = {}
+        columns = [self.column(name) for name in names]
+        for p in self.positions(**equals):
+            key = columns[0][p] if len(columns) == 1 else tuple(c[p] for c in columns)
+            groups.setdefault(key, []).append(rows[p])
+        return groups
+
+
+def file_digest(path):
+    """SHA-256 of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_file(path, kind):
+    """Cache file for a source path and kind ('csv' or 'compiled')"""
+    key = hashlib.sha1(f"{kind}:{Path(path).resolve()}".encode('utf-8')).hexdigest()
+    return CACHE_DIR / f"{key}.pickle"
+
+
+def load_cached(path, kind):
+    """Return the cached payload for path if its content is unchanged, else None"""
+    cached_file = cache_file(path, kind)
+    if not cached_file.exists():
+        return None
+
+    try:
+        with open(cached_file, 'rb') as f:
+            entry = pickle.load(f)
+    except Exception:
+        return None
+    if entry.get('version') != CACHE_VERSION:
+        return None
+
+    stat = os.stat(path)
+    if (entry['size'], entry['mtime_ns']) == (stat.st_size, stat.st_mtime_ns):
+        return entry['payload']
+    if entry['size'] == stat.st_size and entry['sha256'] == file_digest(path):
+        # Touched but not changed: refresh the stat fast path
+        store_cached(path, kind, entry['payload'], entry['sha256'])
+        return entry['payload']
+    return None
+
+
+def store_cached(path, kind, payload, sha256=None):
+    """Write the cache entry for path, recording its size, mtime and content hash"""
+    stat = os.stat(path)
+    entry = {
+        'version': CACHE_VERSION,
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'sha256': sha256 or file_digest(path),
+        'payload': payload
+    }
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    temp_file = cache_file(path, kind).with_suffix('.tmp')
+    with open(temp_file, 'wb') as f:
+        pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temp_file, cache_file(path, kind))
+
+
+def build_indexes(table):
+    """Build the standard indexes, so they are stored with the cache"""
+    for name in INDEXED_COLUMNS:
+        if name in table.columns:
+            table.index(name)
+    return table
+
+
+def parse_csv(path):
+    """Parse a CSV into a Table (fields beyond the header are dropped, missing ones are None)"""
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        reader = csv.reader(f)
+        fieldnames = next(reader, [])
+        columns = [[] for _ in fieldnames]
+        width = len(fieldnames)
+        for values in reader:
+            if not values:
+                continue
+            if len(values) < width:
+                values = values + [None] * (width - len(values))
+            for column, value in zip(columns, values):
+                column.append(value)
+    return build_indexes(Table(fieldnames, dict(zip(fieldnames, columns))))
+
+
+def load_csv(path):
+    """Load a CSV as a Table, parsing it only if its content changed since last time"""
+    path = Path(path)
+    memo_key = ('csv', path.resolve())
+    if memo_key in _memo:
+        return _memo[memo_key]
+
+    payload = load_cached(path, 'csv')
+    if payload is None:
+        table = parse_csv(path)
+        store_cached(path, 'csv', (table.fieldnames, table.columns, table.indexes))
+    else:
+        table = Table(*payload)
+
+    _memo[memo_key] = table
+    return table
+
+
+def load_compiled(path=COMPILED_FILE):
+    """Load compiled-indicators.json (rows or columnar) as {file name: Table}"""
+    path = Path(path)
+    memo_key = ('compiled', path.resolve())
+    if memo_key in _memo:
+        return _memo[memo_key]
+
+    payload = load_cached(path, 'compiled')
+    if payload is None:
+        with open(path, 'r', encoding='utf-8') as f:
+            document = json.load(f)
+        if is_columnar(document):
+            document = decode_columnar(document)
+        tables = {name: build_indexes(Table.from_rows(rows)) for name, rows in document.items()}
+        store_cached(path, 'compiled', {name: (t.fieldnames, t.columns, t.indexes)
+                                        for name, t in tables.items()})
+    else:
+        tables = {name: Table(*parts) for name, parts in payload.items()}
+
+    _memo[memo_key] = tables
+    return tables
+
+
+def ihme_files(pattern='IHME*.csv'):
+    """IHME source files in Portfolios/, sorted by name"""
+    return sorted(PORTFOLIOS_DIR.glob(pattern))
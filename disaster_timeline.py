@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Merged per-country disaster timelines, written by prefetch-feeds.py
+
+The country timeline shows GDACS events, EM-DAT records and DREF
+operations. GDACS and EM-DAT often report the same flood or cyclone, so
+their records are merged into one event: build_timeline() sweeps the
+records of each hazard in start order and joins a record to an open
+event whose date range overlaps its own (within MERGE_GAP_DAYS) and
+that has no record of the same feed yet. DREFs are operations rather
+than hazard events: after de-duplication by appeal code, each DREF is
+linked to the event of its hazard whose date range (widened by
+MERGE_GAP_DAYS) overlaps the operation's, the one starting closest to
+it when several do, and listed in that event's "drefs". A DREF that
+overlaps no event stays a standalone entry.
+
+data/feeds/timelines/<ISO3>.json:
+
+  {
+    "version": 1,
+    "iso3": "AFG",
+    "country": "Afghanistan",
+    "expires": "2026-10-18T10:30:00+00:00",      earliest expiry of the feeds it was built from
+    "events": [                                  sorted by start date
+      {"kind": "disaster", "start": "2022-05-01", "end": "2022-05-09", "hazard": "flood",
+       "type": "Flood", "sources": ["gdacs", "emdat"], "name", "alertlevel", "severity",
+       "deaths", "affected",
+       "drefs": [{"start", "end", "type", "name", "code", "status", "amount_requested",
+                  "amount_funded"}, ...]},                    linked operations, by start date
+      {"kind": "dref", "start": "2022-05-04", "end", "hazard": "flood", "type": "Flood",
+       "name", "code", "status", "amount_requested", "amount_funded"},
+      ...
+    ]
+  }
+
+Fields without a value are left out. Feed dates are normalised by
+parse_date(); records whose start date cannot be read are skipped (and
+counted in build_timeline's warning) rather than failing the timeline.
+"""
+
+import re
+from datetime import date, timedelta
+
+# Records of the same hazard this many days apart still count as overlapping
+# (GDACS and EM-DAT start dates of one event often differ by a few days)
+MERGE_GAP_DAYS = 7
+
+GDACS_HAZARDS = {'EQ': 'earthquake', 'TC': 'storm', 'FL': 'flood', 'DR': 'drought',
+                 'VO': 'volcano', 'WF': 'wildfire', 'TS': 'tsunami'}
+GDACS_LABELS = {'EQ': 'Earthquake', 'TC': 'Tropical Cyclone', 'FL': 'Flood', 'DR': 'Drought',
+                'VO': 'Volcano', 'WF': 'Wildfire', 'TS': 'Tsunami'}
+
+# Keywords of EM-DAT and DREF type names -> hazard keys of GDACS_HAZARDS
+HAZARD_KEYWORDS = [('flood', 'flood'), ('cyclone', 'storm'), ('storm', 'storm'), ('hurricane', 'storm'),
+                   ('earthquake', 'earthquake'), ('drought', 'drought'), ('volcan', 'volcano'),
+                   ('fire', 'wildfire'), ('tsunami', 'tsunami')]
+
+
+# Start date fields of EM-DAT events, then year-only fields (the API's field names vary)
+EMDAT_DATE_KEYS = ('fromDate', 'start_date', 'eventdate', 'fromdate')
+EMDAT_YEAR_KEYS = ('startyear', 'year', 'start_year')
+
+ISO_DATE = re.compile(r'(\d{4})-(\d{1,2})-(\d{1,2})(?:[T ].*)?')
+US_DATE = re.compile(r'(\d{1,2})/(\d{1,2})/(\d{4})(?:[T ].*)?')
+YEAR = re.compile(r'(\d{4})(?:\.0*)?')
+
+
+def parse_date(value):
+    """date of a feed value, or None when it is not a valid date
+
+    Accepts ISO dates and datetimes without zero padding ('2022-5-3T00:00:00Z'),
+    month/day/year as the browser's Date reads it ('05/03/2022') and years
+    (2022, 2022.0 or '2022.0', read as 1 January).
+    """
+    if isinstance(value, bool) or value in (None, ''):
+        return None
+    if isinstance(value, (int, float)):
+        value = int(value) if float(value).is_integer() else value
+    text = str(value).strip()
+    try:
+        match = ISO_DATE.fullmatch(text)
+        if match:
+            return date(*map(int, match.groups()))
+        match = US_DATE.fullmatch(text)
+        if match:
+            month, day_of_month, year = map(int, match.groups())
+            return date(year, month, day_of_month)
+        match = YEAR.fullmatch(text)
+        if match:
+            return date(int(match.group(1)), 1, 1)
+    except ValueError:
+        pass
+    return None
+
+
+def emdat_date(event):
+    """ISO start date of an EM-DAT event: its first readable date field, else its year"""
+    for key in EMDAT_DATE_KEYS + EMDAT_YEAR_KEYS:
+        start = day(event.get(key))
+        if start:
+            return start
+    return None
+
+
+def first(record, *keys):
+    for key in keys:
+        if record.get(key) not in (None, ''):
+            return record[key]
+    return None
+
+
+def hazard_key(type_name):
+    """Hazard key of a free-text type ('Flash flood' -> 'flood'); unknown types are lower-cased"""
+    lowered = (type_name or 'unknown').lower()
+    for keyword, key in HAZARD_KEYWORDS:
+        if keyword in lowered:
+            return key
+    return lowered
+
+
+def day(value):
+    """'2022-05-01T00:00:00' -> '2022-05-01' (None when value is not a date, see parse_date)"""
+    parsed = parse_date(value)
+    return parsed.isoformat() if parsed else None
+
+
+def end_day(start, end):
+    """End date, never before the start"""
+    return max(start, end) if end else start
+
+
+def gdacs_record(feature):
+    properties = feature['properties']
+    start = day(properties.get('fromdate'))
+    severity = properties.get('severity')
+    if severity is None and isinstance(properties.get('severitydata'), dict):
+        severity = properties['severitydata'].get('severitytext')
+    event_type = properties.get('eventtype')
+    return {'source': 'gdacs', 'start': start, 'end': end_day(start, day(properties.get('todate'))),
+            'hazard': GDACS_HAZARDS.get(event_type) or hazard_key(event_type),
+            'type': GDACS_LABELS.get(event_type, event_type), 'name': properties.get('name'),
+            'alertlevel': properties.get('alertlevel'), 'severity': severity}
+
+
+def emdat_record(event):
+    start = emdat_date(event)
+    event_type = first(event, 'disastertype', 'disaster_type', 'eventtype')
+    return {'source': 'emdat', 'start': start,
+            'end': end_day(start, day(first(event, 'toDate', 'end_date', 'todate'))),
+            'hazard': hazard_key(event_type), 'type': event_type,
+            'subtype': first(event, 'disastersubtype', 'disaster_subtype'),
+            'deaths': first(event, 'totaldeaths', 'total_deaths', 'deaths'),
+            'affected': first(event, 'totalaffected', 'total_affected', 'affected')}
+
+
+def dref_event(dref):
+    start = day(dref.get('start_date'))
+    event_type = (dref.get('dtype') or {}).get('name')
+    return compact({'kind': 'dref', 'start': start, 'end': end_day(start, day(dref.get('end_date'))),
+                    'hazard': hazard_key(event_type), 'type': event_type, 'name': dref.get('name'),
+                    'code': dref.get('code'), 'status': dref.get('status_display'),
+                    'amount_requested': dref.get('amount_requested'),
+                    'amount_funded': dref.get('amount_funded')})
+
+
+def compact(record):
+    return {key: value for key, value in record.items() if value not in (None, '', [])}
+
+
+def merge_records(records, gap_days=MERGE_GAP_DAYS):
+    """Merge GDACS / EM-DAT records of the same event with an interval-overlap sweep
+
+    Events stay open while the sweep position (the next record's start)
+    is within gap_days of their end; a record joins the first open event
+    of its hazard without a record of its feed, or opens a new event.
+    """
+    gap = timedelta(days=gap_days)
+    events = []
+    open_events = {}  # hazard -> [(event, open until)]
+    for record in sorted(records, key=lambda record: (record['start'], record['end'], record['source'])):
+        start = parse_date(record['start'])
+        until = parse_date(record['end']) + gap
+        candidates = [entry for entry in open_events.get(record['hazard'], []) if entry[1] >= start]
+
+        for i, (event, event_until) in enumerate(candidates):
+            if record['source'] not in event['sources']:
+                event['sources'].append(record['source'])
+                event['end'] = max(event['end'], record['end'])
+                for key, value in record.items():
+                    if event.get(key) is None:
+                        event[key] = value
+                candidates[i] = (event, max(event_until, until))
+                break
+        else:
+            event = dict(record, kind='disaster', sources=[record['source']])
+            events.append(event)
+            candidates.append((event, until))
+        open_events[record['hazard']] = candidates
+
+    for event in events:
+        del event['source']
+    return events
+
+
+def link_drefs(events, drefs, gap_days=MERGE_GAP_DAYS):
+    """Attach DREF entries to the overlapping event of the same hazard; returns the unlinked ones
+
+    A DREF overlaps an event when its [start, end] meets the event's range
+    widened by gap_days on both sides; of several such events the one
+    whose start is closest to the DREF's wins (the earlier on a tie).
+    """
+    gap = timedelta(days=gap_days)
+    by_hazard = {}
+    for event in events:
+        by_hazard.setdefault(event['hazard'], []).append(
+            (parse_date(event['start']) - gap, parse_date(event['end']) + gap, event))
+
+    standalone = []
+    for dref in sorted(drefs, key=lambda dref: (dref['start'], dref['end'])):
+        start, end = parse_date(dref['start']), parse_date(dref['end'])
+        overlapping = [(abs((event_start + gap - start).days), event_start, event)
+                       for event_start, event_end, event in by_hazard.get(dref['hazard'], [])
+                       if event_start <= end and start <= event_end]
+        if overlapping:
+            event = min(overlapping, key=lambda entry: entry[:2])[2]
+            event.setdefault('drefs', []).append(
+                {key: value for key, value in dref.items() if key not in ('kind', 'hazard')})
+        else:
+            standalone.append(dref)
+    return standalone
+
+
+def raw_start(kind, record):
+    """The start date a feed record carries, as sent (for warnings)"""
+    if kind == 'gdacs':
+        return (record.get('properties') or {}).get('fromdate')
+    if kind == 'emdat':
+        return first(record, *EMDAT_DATE_KEYS, *EMDAT_YEAR_KEYS)
+    return record.get('start_date')
+
+
+def build_timeline(snapshot, expires):
+    """Timeline document of one country snapshot (see prefetch-feeds.py)
+
+    Records without a readable start date are left out with a warning.
+    """
+    skipped = []
+    records = []
+    for kind, build in (('gdacs', gdacs_record), ('emdat', emdat_record)):
+        for record in snapshot.get(kind) or []:
+            event = build(record)
+            if event['start']:
+                records.append(event)
+            else:
+                skipped.append(raw_start(kind, record))
+    events = merge_records(records)
+
+    drefs = {}
+    for dref in snapshot.get('drefs') or []:
+        event = dref_event(dref)
+        if event.get('start'):
+            drefs.setdefault(dref.get('code') or id(dref), event)
+        else:
+            skipped.append(raw_start('drefs', dref))
+
+    if skipped:
+        print(f"   Warning: {snapshot['iso3']} timeline: skipped {len(skipped)} records "
+              f"without a valid start date (e.g. {skipped[0]!r})")
+
+    standalone = link_drefs(events, drefs.values())
+
+    kinds = {'disaster': 0, 'dref': 1}
+    ordered = sorted([compact(event) for event in events] + standalone,
+                     key=lambda event: (event['start'], kinds[event['kind']], event['end']))
+    return {
+        'version': 1,
+        'iso3': snapshot['iso3'],
+        'country': snapshot['country'],
+        'expires': expires,
+        'events': ordered
+    }
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Per-country DREF aggregates for the app's past-DREF layer, written by prefetch-feeds.py
+
+The past-DREF snapshots hold every appeal since 2018 of every target
+country; the map only shows a badge per country and a popup of totals.
+data/feeds/dref-summary.json holds those totals precomputed:
+
+  {
+    "version": 1,
+    "fetched": "2026-10-18T09:30:00+00:00",        the snapshot it was built from
+    "totals": {...},                               every country together
+    "countries": {
+      "<ISO3>": {
+        "country": "Afghanistan",
+        "totals": {"count", "active", "closed", "amountRequested", "amountFunded", "beneficiaries"},
+        "years": {"2024": {<totals>, "hazards": {"Flood": 3, ...}}, ...},      newest first
+        "hazards": {"Flood": {<totals>}, ...},                                 most operations first
+        "recent": [{"code", "name", "hazard", "status", "start_date", "end_date",
+                    "amount_requested"}, ...]                                   newest first
+      }
+    }
+  }
+
+"active" counts appeals with status 0 (Active); every other status
+(closed, frozen, archived) counts as closed. Start dates are read with
+disaster_timeline.day(), so non-ISO dates still land in the right year
+and order; appeals without a readable date go under "unknown" and last.
+"""
+
+import disaster_timeline
+
+# Operations listed per country in the popup
+RECENT_OPERATIONS = 5
+
+ACTIVE_STATUS = 0
+UNKNOWN_HAZARD = 'Unknown'
+UNKNOWN_YEAR = 'unknown'
+
+
+def empty_totals():
+    return {'count': 0, 'active': 0, 'closed': 0,
+            'amountRequested': 0.0, 'amountFunded': 0.0, 'beneficiaries': 0}
+
+
+def number(value):
+    try:
+        return float(value) if value is not None else 0.0
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def add_dref(totals, dref):
+    totals['count'] += 1
+    totals['active' if dref.get('status') == ACTIVE_STATUS else 'closed'] += 1
+    totals['amountRequested'] += number(dref.get('amount_requested'))
+    totals['amountFunded'] += number(dref.get('amount_funded'))
+    totals['beneficiaries'] += int(number(dref.get('num_beneficiaries')))
+
+
+def rounded(totals):
+    """Totals with the amounts rounded to whole CHF"""
+    return dict(totals, amountRequested=round(totals['amountRequested']),
+                amountFunded=round(totals['amountFunded']))
+
+
+def hazard(dref):
+    dtype = dref.get('dtype')
+    return (dtype.get('name') if isinstance(dtype, dict) else None) or UNKNOWN_HAZARD
+
+
+def recent_operation(dref):
+    return {
+        'code': dref.get('code'),
+        'name': dref.get('name'),
+        'hazard': hazard(dref),
+        'status': dref.get('status_display'),
+        'start_date': dref.get('start_date'),
+        'end_date': dref.get('end_date'),
+        'amount_requested': dref.get('amount_requested')
+    }
+
+
+def summarize_country(name, drefs):
+    """Totals, per-year, per-hazard and recent operations of one country's DREFs"""
+    totals, years, hazards = empty_totals(), {}, {}
+    starts = {id(dref): disaster_timeline.day(dref.get('start_date')) or '' for dref in drefs}
+    for dref in drefs:
+        add_dref(totals, dref)
+        year = starts[id(dref)][:4] or UNKNOWN_YEAR
+        year_entry = years.setdefault(year, dict(empty_totals(), hazards={}))
+        add_dref(year_entry, dref)
+        year_entry['hazards'][hazard(dref)] = year_entry['hazards'].get(hazard(dref), 0) + 1
+        add_dref(hazards.setdefault(hazard(dref), empty_totals()), dref)
+
+    newest = sorted(drefs, key=lambda dref: starts[id(dref)], reverse=True)
+    return {
+        'country': name,
+        'totals': rounded(totals),
+        'years': {year: rounded(years[year])
+                  for year in sorted(years, key=lambda year: (year != UNKNOWN_YEAR, year), reverse=True)},
+        'hazards': {hazard_name: rounded(entry) for hazard_name, entry in
+                    sorted(hazards.items(), key=lambda item: (-item[1]['count'], item[0]))},
+        'recent': [recent_operation(dref) for dref in newest[:RECENT_OPERATIONS]]
+    }
+
+
+def build_summary(snapshots, fetched=None, feed='drefs'):
+    """Summary document from {ISO3: country snapshot}; countries without DREFs are left out"""
+    countries = {}
+    totals = empty_totals()
+    for iso3, snapshot in snapshots.items():
+        drefs = snapshot.get(feed) or []
+        if not drefs:
+            continue
+        countries[iso3] = summarize_country(snapshot.get('country'), drefs)
+        for dref in drefs:
+            add_dref(totals, dref)
+    return {
+        'version': 1,
+        'fetched': fetched,
+        'totals': rounded(totals),
+        'countries': countries
+    }
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Shared IHME aggregate-row filter, driven by data/ihme-filter-spec.json
+
+The spec is a list of rules tried in order. A rule applies to the rows
+whose columns match its "when" clause (a list of accepted values per
+column; an empty clause matches everything) and keeps those rows only if
+every "require" column equals the given value. Each row is decided by
+the first rule that applies; rows no rule applies to are dropped.
+
+Rules are evaluated a column at a time over whole batches of rows
+(map() with the comparison's C implementation), so there is no per-row
+Python branching. js/app.js reads the same spec file.
+"""
+
+import json
+from itertools import islice, repeat
+from operator import and_, contains, gt, or_
+from pathlib import Path
+
+SPEC_FILE = Path(__file__).resolve().parent / 'data' / 'ihme-filter-spec.json'
+
+# Rows per batch when filtering a stream
+DEFAULT_CHUNK_ROWS = 10000
+
+_spec_cache = {}
+
+
+def load_spec(path=SPEC_FILE):
+    """Load (and cache) a filter spec"""
+    path = Path(path)
+    if path not in _spec_cache:
+        with open(path, 'r', encoding='utf-8') as f:
+            spec = json.load(f)
+        if spec.get('version') != 1:
+            raise ValueError(f"Unsupported IHME filter spec version: {spec.get('version')}")
+        _spec_cache[path] = spec
+    return _spec_cache[path]
+
+
+def spec_columns(spec=None):
+    """All columns the spec reads"""
+    spec = spec or load_spec()
+    columns = []
+    for rule in spec['rules']:
+        for column in list(rule['when']) + list(rule['require']):
+            if column not in columns:
+                columns.append(column)
+    return columns
+
+
+def rows_to_columns(rows, names):
+    """Transpose row dicts into {column: [values]} (missing/None read as '')"""
+    return {name: [row.get(name) or '' for row in rows] for name in names}
+
+
+def aggregate_mask(columns, row_count, spec=None):
+    """Evaluate the spec over whole columns and return one bool per row"""
+    spec = spec or load_spec()
+    keep = [False] * row_count
+    undecided = [True] * row_count
+
+    for rule in spec['rules']:
+        applies = undecided
+        for column, accepted in rule['when'].items():
+            applies = list(map(and_, applies,
+                               map(contains, repeat(frozenset(accepted)), columns[column])))
+
+        passes = applies
+        for column, expected in rule['require'].items():
+            passes = list(map(and_, passes, map(expected.__eq__, columns[column])))
+
+        keep = list(map(or_, keep, passes))
+        # undecided and not applies (True > False is the only True case)
+        undecided = list(map(gt, undecided, applies))
+
+    return keep
+
+
+def filter_rows(rows, spec=None):
+    """Return the aggregate rows from a list of IHME row dicts"""
+    spec = spec or load_spec()
+    columns = rows_to_columns(rows, spec_columns(spec))
+    mask = aggregate_mask(columns, len(rows), spec)
+    return [row for row, keep in zip(rows, mask) if keep]
+
+
+def filter_stream(rows, spec=None, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Yield the aggregate rows from an iterable of row dicts, one batch at a time"""
+    spec = spec or load_spec()
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, chunk_rows))
+        if not chunk:
+            return
+        yield from filter_rows(chunk, spec)
+
+
+def is_aggregate(row, spec=None):
+    """Check a single row (convenience for ad-hoc scripts)"""
+    return bool(filter_rows([row], spec))
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Columnar, dictionary-encoded format for compiled-indicators.json
+
+The row format stores every compiled row as a dict with all column names
+repeated and every number as a string. The columnar format stores, per
+source file, one entry per column:
+
+  {"type": "dict", "values": [...distinct strings...], "codes": [...]}
+  {"type": "int", "values": [...], "missing": ""}
+  {"type": "float", "values": [...], "missing": ".."}
+  {"type": "number", "values": [...]}
+
+Numeric columns hold JSON numbers (floats quantised to a fixed number of
+significant digits); "missing" is the single placeholder string the
+column used for absent values, restored as-is on decode. "number"
+columns were already typed in the rows (e.g. the reduced WHO VALUE
+column) and decode to numbers rather than strings. Columns that
+neither the app nor the analysis scripts read are dropped.
+
+js/app.js has a matching decoder (decodeCompiledData).
+"""
+
+import json
+import re
+
+FORMAT_NAME = 'columnar'
+FORMAT_VERSION = 1
+
+# Default significant digits kept for float columns
+DEFAULT_SIG_DIGITS = 6
+
+# Identifier/bookkeeping columns nothing downstream reads
+DROPPED_COLUMNS = {
+    None,
+    'IND_ID', 'IND_UUID', 'IND_PER_CODE', 'DIM_TIME_TYPE',
+    'DIM_GEO_CODE_TYPE', 'DIM_PUBLISH_STATE_CODE',
+    'age_id', 'cause_id', 'location_id', 'measure_id',
+    'metric_id', 'rei_id', 'sex_id'
+}
+
+# Integers that survive a str(int(...)) round trip unchanged
+INT_PATTERN = re.compile(r'^(0|-?[1-9][0-9]{0,15})$')
+
+
+def quantise(value, sig_digits):
+    """Round a float to sig_digits significant digits"""
+    return float(f'{value:.{sig_digits}g}')
+
+
+def format_number(value):
+    """Render a decoded number as the string the row format would hold"""
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e16:
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def parse_finite(value):
+    """Parse a finite float, or return None"""
+    try:
+        number = float(value)
+    except ValueError:
+        return None
+    if number != number or number in (float('inf'), float('-inf')):
+        return None
+    return number
+
+
+def classify_numeric(values):
+    """Return (type, numbers, missing) for a numeric column, or None
+
+    A column is numeric when every value parses as a number except for at
+    most one placeholder string (e.g. '' or '..') used for missing data.
+    """
+    numbers = []
+    missing = set()
+    all_int = True
+
+    for value in values:
+        if not isinstance(value, str):
+            return None
+        if INT_PATTERN.match(value):
+            numbers.append(int(value))
+            continue
+        number = parse_finite(value)
+        if number is None:
+            missing.add(value)
+            if len(missing) > 1:
+                return None
+        else:
+            all_int = False
+        numbers.append(number)
+
+    if all(number is None for number in numbers):
+        return None
+    return ('int' if all_int else 'float'), numbers, (missing.pop() if missing else None)
+
+
+def is_typed_number(value):
+    """Check for a JSON number (bools excluded)"""
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def encode_column(values, sig_digits):
+    """Encode one column's values (strings, numbers or None)"""
+    if any(is_typed_number(v) for v in values) and all(v is None or is_typed_number(v) for v in values):
+        return {'type': 'number',
+                'values': [v if v is None or isinstance(v, int) else quantise(v, sig_digits)
+                           for v in values]}
+
+    numeric = classify_numeric(values)
+
+    if numeric is None:
+        # Dictionary-encode everything else
+        table = {}
+        codes = [table.setdefault(value, len(table)) for value in values]
+        return {'type': 'dict', 'values': list(table), 'codes': codes}
+
+    column_type, numbers, missing = numeric
+    if column_type == 'float':
+        numbers = [None if n is None else quantise(float(n), sig_digits) for n in numbers]
+
+    column = {'type': column_type, 'values': numbers}
+    if missing is not None:
+        column['missing'] = missing
+    return column
+
+
+def encode_columnar(compiled_data, sig_digits=DEFAULT_SIG_DIGITS):
+    """Encode {file name: [row dicts]} into the columnar document"""
+    files = {}
+
+    for file_name, rows in compiled_data.items():
+        columns = []
+        for row in rows:
+            for column in row:
+                if column not in DROPPED_COLUMNS and column not in columns:
+                    columns.append(column)
+
+        files[file_name] = {
+            'rows': len(rows),
+            'columns': {
+                column: encode_column([row.get(column) for row in rows], sig_digits)
+                for column in columns
+            }
+        }
+
+    return {
+        'format': FORMAT_NAME,
+        'version': FORMAT_VERSION,
+        'sig_digits': sig_digits,
+        'files': files
+    }
+
+
+def decode_column(column):
+    """Decode one column back to a list of strings (None where absent)"""
+    if column['type'] == 'dict':
+        table = column['values']
+        return [table[code] for code in column['codes']]
+    if column['type'] == 'number':
+        return list(column['values'])
+
+    missing = column.get('missing')
+    return [missing if value is None else format_number(value)
+            for value in column['values']]
+
+
+def decode_columnar(document):
+    """Decode a columnar document back into {file name: [row dicts]}"""
+    if document.get('version') != FORMAT_VERSION:
+        raise ValueError(f"Unsupported columnar format version: {document.get('version')}")
+
+    compiled_data = {}
+    for file_name, encoded in document['files'].items():
+        names = list(encoded['columns'])
+        decoded = [decode_column(encoded['columns'][name]) for name in names]
+        compiled_data[file_name] = [dict(zip(names, values)) for values in zip(*decoded)]
+
+    return compiled_data
+
+
+def is_columnar(document):
+    """Check whether a loaded compiled-indicators document is columnar"""
+    return document.get('format') == FORMAT_NAME
+
+
+def load_compiled_data(path='data/compiled-indicators.json'):
+    """Load compiled-indicators.json in either format as {file name: [row dicts]}"""
+    with open(path, 'r', encoding='utf-8') as f:
+        document = json.load(f)
+
+    if is_columnar(document):
+        return decode_columnar(document)
+    return document
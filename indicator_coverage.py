@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Indicator x year x country coverage bitsets, written by compile-data.py
+
+data/coverage.json holds one bitset per (indicator, year) over a fixed
+country list, for the configured indicators and for every series of
+every compiled source:
+
+  {
+    "version": 1,
+    "countries": ["Afghanistan", ...],               bit i = countries[i]
+    "indicators": {"<indicator id>": {"2023": "1ffffff", ...}},
+    "sources": {"<file>": {"provider": "ihme", "rows": 1579,
+                           "series": {"<measure/series/IND_CODE>": {"2023": "1ffffff"}}}}
+  }
+
+Bitsets are hex strings, so any number of countries fits (js/app.js
+counts bits per hex digit). Coverage answers "which years have data",
+"how many countries in 2023" and "latest year with at least N countries"
+without rescanning rows; data/coverage-report.txt is the same content
+as a readable report.
+
+    import indicator_coverage
+    coverage = indicator_coverage.load()
+    coverage.latest_year('HALE (Healthy life expectancy)', min_countries=20)
+    coverage.countries_with_data('NY.GNP.PCAP.CD', 2023, source='WB Data 25b.csv')
+"""
+
+import json
+from pathlib import Path
+
+from long_format import iter_long_rows
+
+COVERAGE_FILE = Path('data') / 'coverage.json'
+REPORT_FILE = Path('data') / 'coverage-report.txt'
+
+
+def encode_bits(positions):
+    """Hex bitset with the given bit positions set"""
+    value = 0
+    for position in positions:
+        value |= 1 << position
+    return format(value, 'x')
+
+
+def count_bits(bits):
+    """Number of bits set in a hex bitset"""
+    return bin(int(bits, 16)).count('1')
+
+
+def bit_positions(bits):
+    """Positions of the bits set in a hex bitset, ascending"""
+    value = int(bits, 16)
+    return [position for position in range(value.bit_length()) if value >> position & 1]
+
+
+def build_coverage(compiled_data, index, countries):
+    """Build the coverage document from the compiled rows and the indicator index
+
+    countries is the preferred country order (the config's list); any
+    other country found in the data is appended in name order.
+    """
+    sources = {}
+    for name, rows in compiled_data.items():
+        sources[name] = {'provider': None, 'rows': len(rows), 'series': {}}
+    observed = {}
+    for row in iter_long_rows(compiled_data):
+        source = sources[row['source']]
+        source['provider'] = row['provider']
+        series = source['series'].setdefault(row['indicator'], {})
+        series.setdefault(row['year'], set()).add(row['country'])
+        observed[row['country']] = None
+
+    indicators = {}
+    for indicator_id, entry in index['indicators'].items():
+        indicators[indicator_id] = {int(year): set(by_country) for year, by_country in entry['values'].items()}
+        observed.update(dict.fromkeys(country for by_country in entry['values'].values()
+                                      for country in by_country))
+
+    preferred = set(countries)
+    extra = sorted(country for country in observed if country not in preferred)
+    country_list = list(countries) + extra
+    position = {country: i for i, country in enumerate(country_list)}
+
+    def encode_years(years):
+        return {str(year): encode_bits(position[c] for c in years[year])
+                for year in sorted(years, reverse=True)}
+
+    return {
+        'version': 1,
+        'countries': country_list,
+        'indicators': {indicator_id: encode_years(years) for indicator_id, years in indicators.items()},
+        'sources': {
+            name: {
+                'provider': source['provider'],
+                'rows': source['rows'],
+                'series': {series: encode_years(years)
+                           for series, years in sorted(source['series'].items())}
+            }
+            for name, source in sources.items()
+        }
+    }
+
+
+class Coverage:
+    """Read access to a coverage document"""
+
+    def __init__(self, document):
+        if document.get('version') != 1:
+            raise ValueError(f"Unsupported coverage version: {document.get('version')}")
+        self.document = document
+        self.countries = document['countries']
+
+    @property
+    def sources(self):
+        """Compiled source file names"""
+        return list(self.document['sources'])
+
+    def series(self, source):
+        """Series (IHME measures, World Bank series codes, WHO IND_CODEs) of a source"""
+        return list(self.document['sources'][source]['series'])
+
+    def source_rows(self, source):
+        """Compiled rows of a source"""
+        return self.document['sources'][source]['rows']
+
+    def _years(self, indicator, source=None):
+        if source is None:
+            return self.document['indicators'].get(indicator, {})
+        return self.document['sources'][source]['series'].get(indicator, {})
+
+    def count(self, indicator, year, source=None):
+        """Countries with data for an indicator (or a source's series) in a year"""
+        bits = self._years(indicator, source).get(str(year))
+        return count_bits(bits) if bits else 0
+
+    def countries_with_data(self, indicator, year, source=None):
+        """Names of the countries with data, in country-list order"""
+        bits = self._years(indicator, source).get(str(year))
+        return [self.countries[i] for i in bit_positions(bits)] if bits else []
+
+    def years(self, indicator, min_countries=1, source=None):
+        """Years with data for at least min_countries countries, newest first"""
+        return sorted((int(year) for year, bits in self._years(indicator, source).items()
+                       if count_bits(bits) >= min_countries), reverse=True)
+
+    def latest_year(self, indicator, min_countries=1, source=None):
+        """Latest year with data for at least min_countries countries (None if none)"""
+        years = self.years(indicator, min_countries, source)
+        return years[0] if years else None
+
+
+def load(path=COVERAGE_FILE):
+    """Load data/coverage.json"""
+    path = Path(path)
+    if not path.exists():
+        raise FileNotFoundError(f"{path} not found; run: python compile-data.py")
+    with open(path, 'r', encoding='utf-8') as f:
+        return Coverage(json.load(f))
+
+
+def format_years(years, total):
+    """'2023: 25/25, 2022: 24/25, ...'"""
+    return ', '.join(f"{year}: {count_bits(bits)}/{total}" for year, bits in years.items())
+
+
+def format_report(document):
+    """Readable coverage report"""
+    coverage = Coverage(document)
+    total = len(coverage.countries)
+    lines = [
+        '=' * 70,
+        f"COVERAGE REPORT ({total} countries)",
+        '=' * 70,
+        '',
+        'Configured indicators (countries with data per year):',
+    ]
+    for indicator_id, years in document['indicators'].items():
+        detail = format_years(years, total) if years else 'no data'
+        lines.append(f"  {indicator_id}: {detail}")
+
+    for source in coverage.sources:
+        entry = document['sources'][source]
+        lines += ['', f"{source} ({entry['provider']}, {entry['rows']:,} rows, "
+                      f"{len(entry['series'])} series):"]
+        for series, years in entry['series'].items():
+            lines.append(f"  {series}: {format_years(years, total)}")
+
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Indexed SQLite database of the compiled indicator data
+
+compile-data.py --sqlite writes data/indicators.sqlite with normalised
+tables built from the same long-format observations as the Arrow store
+(long_format.iter_long_rows):
+
+  sources(id, name, provider)
+  indicators(id, provider, code, name)
+  countries(id, name, code)
+  observations(source_id, indicator_id, country_id, year, value, lower, upper,
+               sex, age, metric, cause, rei, breakdown)
+
+Composite indexes on observations (indicator_id, year, country_id) and
+(country_id, indicator_id) make point lookups and coverage summaries index
+scans; the observation_view view joins the names back in for ad-hoc SQL.
+query-indicators.py is the command-line front end.
+"""
+
+import os
+import sqlite3
+from pathlib import Path
+
+from long_format import DIMENSION_COLUMNS, iter_long_rows
+
+DB_FILE = Path('data') / 'indicators.sqlite'
+
+SCHEMA = """
+CREATE TABLE sources (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    provider TEXT NOT NULL
+);
+CREATE TABLE indicators (
+    id INTEGER PRIMARY KEY,
+    provider TEXT NOT NULL,
+    code TEXT NOT NULL,
+    name TEXT,
+    UNIQUE (provider, code)
+);
+CREATE TABLE countries (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    code TEXT
+);
+CREATE TABLE observations (
+    source_id INTEGER NOT NULL REFERENCES sources(id),
+    indicator_id INTEGER NOT NULL REFERENCES indicators(id),
+    country_id INTEGER NOT NULL REFERENCES countries(id),
+    year INTEGER NOT NULL,
+    value REAL NOT NULL,
+    lower REAL,
+    upper REAL,
+    sex TEXT,
+    age TEXT,
+    metric TEXT,
+    cause TEXT,
+    rei TEXT,
+    breakdown TEXT
+);
+CREATE VIEW observation_view AS
+SELECT s.name AS source, i.provider, i.code AS indicator, i.name AS indicator_name,
+       c.name AS country, c.code AS country_code, o.year, o.value, o.lower, o.upper,
+       o.sex, o.age, o.metric, o.cause, o.rei, o.breakdown
+FROM observations o
+JOIN sources s ON s.id = o.source_id
+JOIN indicators i ON i.id = o.indicator_id
+JOIN countries c ON c.id = o.country_id;
+"""
+
+# Created after the bulk insert, which is faster than maintaining them row by row
+INDEXES = """
+CREATE INDEX idx_observations_indicator_year_country
+    ON observations (indicator_id, year, country_id);
+CREATE INDEX idx_observations_country_indicator
+    ON observations (country_id, indicator_id);
+"""
+
+
+def build_database(compiled_data, path=DB_FILE, countries=()):
+    """Write the database from {file name: [row dicts]}; returns the observation count
+
+    countries is the config's country list ({'name', 'code'}) used to fill
+    in ISO3 codes. The database is built beside the target and renamed
+    into place, so readers never see a half-written file.
+    """
+    path = Path(path)
+    temp_path = path.with_name(path.name + '.tmp')
+    if temp_path.exists():
+        temp_path.unlink()
+
+    country_codes = {country['name']: country.get('code') for country in countries}
+    ids = {'sources': {}, 'indicators': {}, 'countries': {}}
+    connection = sqlite3.connect(temp_path)
+
+    def lookup(table, key, insert, params):
+        # Assign ids in first-seen order, inserting each dimension row once
+        if key not in ids[table]:
+            ids[table][key] = len(ids[table]) + 1
+            connection.execute(insert, (ids[table][key],) + params)
+        return ids[table][key]
+
+    try:
+        connection.executescript(SCHEMA)
+        observations = []
+        for row in iter_long_rows(compiled_data):
+            source_id = lookup('sources', row['source'],
+                               'INSERT INTO sources VALUES (?, ?, ?)',
+                               (row['source'], row['provider']))
+            indicator_id = lookup('indicators', (row['provider'], row['indicator']),
+                                  'INSERT INTO indicators VALUES (?, ?, ?, ?)',
+                                  (row['provider'], row['indicator'], row['indicator_name']))
+            country_id = lookup('countries', row['country'],
+                                'INSERT INTO countries VALUES (?, ?, ?)',
+                                (row['country'], country_codes.get(row['country'])))
+            observations.append((source_id, indicator_id, country_id, row['year'],
+                                 row['value'], row['lower'], row['upper'])
+                                + tuple(row[column] for column in DIMENSION_COLUMNS))
+
+        connection.executemany(
+            'INSERT INTO observations VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            observations)
+        connection.executescript(INDEXES)
+        connection.execute('ANALYZE')
+        connection.commit()
+    finally:
+        connection.close()
+
+    os.replace(temp_path, path)
+    return len(observations)
+
+
+def connect(path=DB_FILE):
+    """Open the database read-only with rows addressable by column name"""
+    path = Path(path)
+    if not path.exists():
+        raise FileNotFoundError(f"{path} not found; run: python compile-data.py --sqlite")
+    connection = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+    connection.row_factory = sqlite3.Row
+    return connection
+
+
+def find_indicators(connection, term):
+    """Indicator ids whose code or name equals term (case-insensitive)"""
+    rows = connection.execute(
+        'SELECT id FROM indicators WHERE code = ?1 COLLATE NOCASE OR name = ?1 COLLATE NOCASE',
+        (term,))
+    return [row['id'] for row in rows]
+
+
+def lookup_values(connection, indicator, country=None, years=None):
+    """Observations of one indicator, optionally for one country and/or some years"""
+    indicator_ids = find_indicators(connection, indicator)
+    clauses = [f"o.indicator_id IN ({', '.join('?' * len(indicator_ids))})"]
+    params = list(indicator_ids)
+
+    if country is not None:
+        clauses.append('o.country_id IN (SELECT id FROM countries '
+                       'WHERE name = ? COLLATE NOCASE OR code = ? COLLATE NOCASE)')
+        params += [country, country]
+    if years:
+        clauses.append(f"o.year IN ({', '.join('?' * len(years))})")
+        params += list(years)
+
+    return connection.execute(f"""
+        SELECT i.code AS indicator, c.name AS country, o.year, o.value, o.lower, o.upper,
+               o.sex, o.age, o.metric, o.breakdown, s.name AS source
+        FROM observations o
+        JOIN indicators i ON i.id = o.indicator_id
+        JOIN countries c ON c.id = o.country_id
+        JOIN sources s ON s.id = o.source_id
+        WHERE {' AND '.join(clauses)}
+        ORDER BY c.name, o.year DESC
+    """, params).fetchall()
+
+
+def coverage(connection, years=None, indicator=None):
+    """Countries with data per indicator and year"""
+    clauses = []
+    params = []
+    if years:
+        clauses.append(f"o.year IN ({', '.join('?' * len(years))})")
+        params += list(years)
+    if indicator is not None:
+        indicator_ids = find_indicators(connection, indicator)
+        clauses.append(f"o.indicator_id IN ({', '.join('?' * len(indicator_ids))})")
+        params += indicator_ids
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+
+    return connection.execute(f"""
+        SELECT i.provider, i.code AS indicator, o.year,
+               COUNT(DISTINCT o.country_id) AS countries, COUNT(*) AS observations
+        FROM observations o
+        JOIN indicators i ON i.id = o.indicator_id
+        {where}
+        GROUP BY o.indicator_id, o.year
+        ORDER BY i.provider, i.code, o.year
+    """, params).fetchall()
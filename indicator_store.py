@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Typed long-format store of the compiled indicator data (Arrow IPC)
+
+compile-data.py --store flattens data/compiled-indicators.json into one
+row per observation (long_format.iter_long_rows):
+
+  source, provider, indicator, indicator_name, country, year, value,
+  lower, upper, sex, age, metric, cause, rei, breakdown
+
+and writes it as an uncompressed Arrow IPC file, which open_store()
+memory-maps so columns are read zero-copy. select() filters on column
+predicates without materialising Python rows:
+
+    import indicator_store
+    table = indicator_store.open_store()
+    hale = indicator_store.select(table, indicator='HALE (Healthy life expectancy)',
+                                  year=range(2019, 2024))
+    print(hale.num_rows, hale.to_pylist()[:3])
+
+pyarrow is only needed for writing and opening the store.
+"""
+
+from pathlib import Path
+
+from long_format import COLUMNS, NUMBER_COLUMNS, iter_long_rows
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:  # optional: only the Arrow store needs it
+    pa = pc = None
+
+STORE_FILE = Path('data') / 'indicator-store.arrow'
+
+
+def require_pyarrow():
+    """Fail clearly when the optional pyarrow dependency is missing"""
+    if pa is None:
+        raise RuntimeError('The indicator store needs pyarrow (pip install pyarrow)')
+
+
+def build_table(compiled_data):
+    """Build the typed Arrow table (strings dictionary-encoded)"""
+    require_pyarrow()
+    rows = list(iter_long_rows(compiled_data))
+    arrays = {}
+    for column in COLUMNS:
+        values = [row[column] for row in rows]
+        if column == 'year':
+            arrays[column] = pa.array(values, pa.int16())
+        elif column in NUMBER_COLUMNS:
+            arrays[column] = pa.array(values, pa.float64())
+        else:
+            arrays[column] = pa.array(values, pa.string()).dictionary_encode()
+    return pa.table(arrays)
+
+
+def write_store(compiled_data, path=STORE_FILE):
+    """Write the store as an uncompressed (memory-mappable) Arrow IPC file"""
+    table = build_table(compiled_data)
+    with pa.OSFile(str(path), 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    return table
+
+
+def open_store(path=STORE_FILE):
+    """Memory-map the store and return it as an Arrow table (zero-copy)"""
+    require_pyarrow()
+    return pa.ipc.open_file(pa.memory_map(str(path), 'r')).read_all()
+
+
+def select(table, columns=None, **predicates):
+    """Filter the table on column predicates
+
+    Each keyword is a column name; the value is either a single value to
+    match or a list/tuple/set/range of accepted values. columns optionally
+    restricts the columns returned.
+    """
+    require_pyarrow()
+    mask = None
+    for column, wanted in predicates.items():
+        data = table[column]
+        if isinstance(wanted, (list, tuple, set, frozenset, range)):
+            condition = pc.is_in(data, value_set=pa.array(list(wanted), data.type.value_type
+                                 if pa.types.is_dictionary(data.type) else data.type))
+        else:
+            condition = pc.equal(data, wanted)
+        mask = condition if mask is None else pc.and_(mask, condition)
+
+    if mask is not None:
+        table = table.filter(mask)
+    if columns is not None:
+        table = table.select(columns)
+    return table
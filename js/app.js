@@ -2,7 +2,20 @@
 let map;
 let categoriesData = null;
 let countriesGeoJSON = null;
+let countryGeometry = null; // Clipped, simplified, quantised target-country geometry (build-country-geometry.py)
+const countryGeometryLevels = {}; // level name -> decoded arcs ([lng, lat] lists)
+const countryFeatureCache = {}; // 'ISO3:level' -> GeoJSON FeatureCollection
 let compiledData = null; // Compiled indicators data
+let compiledDataRequest = null; // Pending or finished load of the compiled data
+let indicatorIndex = null; // Pre-resolved indicator -> year -> country -> value lookup
+let shardManifest = null; // Per-indicator shard manifest (lazy loading, see compile-data.py --shards)
+const indicatorShardRequests = {}; // indicatorId -> pending/completed shard fetch
+let timeSeriesCubesRequest = null; // Pending/completed fetch of precomputed time-series cubes
+let coverageRequest = null; // Pending/completed fetch of indicator x year x country coverage bitsets
+let ihmeFilterSpec = null; // Shared IHME aggregate-row rules (data/ihme-filter-spec.json)
+let ihmeFilterSpecRequest = null;
+let artifactManifestRequest = null; // Content-hashed artifact manifest (see package-artifacts.py)
+let queryServerRequest = null; // Status of the query server (serve-indicators.py), null when served statically
 let currentMarkers = [];
 let currentOverlays = [];
 let timeSeriesChart = null; // Chart.js instance
@@ -18,6 +31,14 @@ let cachedPastDrefData = null;
 let cacheTimestamp = null;
 const CACHE_DURATION = 5 * 60 * 1000; // 5 minutes
 
+// Per-country feed snapshots written by prefetch-feeds.py, used until their manifest says they expired
+const FEED_SNAPSHOT_DIR = 'data/feeds';
+let feedManifestRequest = null;
+const feedSnapshotRequests = {}; // { countryISO3: Promise of the snapshot }
+
+// Year preselected in the dropdown: latest year with data for at least this many countries
+const MIN_COUNTRIES_FOR_DEFAULT_YEAR = 15;
+
 // Cache for disaster events on time series chart
 let chartDisasterEvents = {}; // { countryISO3: [events] }
 
@@ -38,7 +59,7 @@ document.addEventListener('DOMContentLoaded', function() {
     initMap();
     loadCategories();
     loadCountriesGeoJSON();
-    loadCompiledData();
+    loadIndicatorSources();
     setupEventListeners();
 });
 
@@ -70,13 +91,40 @@ function initMap() {
         metric: true
     }).addTo(map);
 
+    // Swap drawn country outlines to the simplification level of the new zoom
+    map.on('zoomend', refreshCountryGeometry);
+
     console.log('Map initialized successfully');
 }
 
+// Fetch the content-hashed artifact manifest once (null if not packaged)
+function loadArtifactManifest() {
+    if (!artifactManifestRequest) {
+        artifactManifestRequest = fetch('data/artifacts-manifest.json', { cache: 'no-store' })
+            .then(response => response.ok ? response.json() : null)
+            .catch(() => null);
+    }
+    return artifactManifestRequest;
+}
+
+// Fetch a data artifact by its logical path: the immutable content-hashed copy
+// when it has been packaged, otherwise the path itself (or fallbackUrl).
+// The caller's options apply to both, except a cache mode: hashed copies never
+// change, so they always use the browser cache
+async function fetchArtifact(path, options = {}, fallbackUrl = path) {
+    const manifest = await loadArtifactManifest();
+    const entry = manifest && manifest.artifacts[path];
+    if (entry) {
+        const { cache, ...hashedOptions } = options;
+        return fetch(entry.file, hashedOptions);
+    }
+    return fetch(fallbackUrl, options);
+}
+
 // Load indicator categories from JSON
 async function loadCategories() {
     try {
-        const response = await fetch('data/indicator-categories.json');
+        const response = await fetchArtifact('data/indicator-categories.json');
         categoriesData = await response.json();
 
         populateCategorySelect();
@@ -89,8 +137,20 @@ async function loadCategories() {
 
 // Load countries GeoJSON for polygon display
 async function loadCountriesGeoJSON() {
+    // Prefer the compact target-country geometry built by build-country-geometry.py
     try {
-        const response = await fetch('data/countries-10m.geojson');
+        const response = await fetchArtifact('data/country-geometry.json');
+        if (response.ok) {
+            countryGeometry = await response.json();
+            console.log(`Loaded geometry for ${Object.keys(countryGeometry.countries).length} countries`);
+            return;
+        }
+    } catch (error) {
+        console.warn('Country geometry not available, falling back to full GeoJSON:', error);
+    }
+
+    try {
+        const response = await fetchArtifact('data/countries.geojson');
         const data = await response.json();
 
         // Filter for target countries
@@ -119,11 +179,11 @@ async function loadCountriesGeoJSON() {
 // Load compiled indicator data
 async function loadCompiledData() {
     try {
-        // Add cache-busting parameter to ensure latest data is loaded
-        const response = await fetch('data/compiled-indicators.json?v=20251113', {
+        // Unpackaged builds bypass the HTTP cache to ensure latest data is loaded
+        const response = await fetchArtifact('data/compiled-indicators.json', {
             cache: 'no-store'
         });
-        compiledData = await response.json();
+        compiledData = decodeCompiledData(await response.json());
         console.log('Compiled data loaded successfully');
         console.log('IHME files in compiled data:', Object.keys(compiledData).filter(k => k.includes('IHME')));
     } catch (error) {
@@ -131,6 +191,171 @@ async function loadCompiledData() {
     }
 }
 
+// Load the compiled data once; with a query server it is only needed for
+// indicators the server does not index
+function ensureCompiledData() {
+    if (!compiledDataRequest) {
+        compiledDataRequest = loadCompiledData();
+    }
+    return compiledDataRequest;
+}
+
+// Decode compiled data written with `compile-data.py --format columnar`
+// (see indicator_codec.py); row-format data is returned unchanged
+function decodeCompiledData(doc) {
+    if (doc.format !== 'columnar') {
+        return doc;
+    }
+    if (doc.version !== 1) {
+        throw new Error(`Unsupported columnar format version: ${doc.version}`);
+    }
+
+    const decoded = {};
+    for (const [fileName, encoded] of Object.entries(doc.files)) {
+        const names = Object.keys(encoded.columns);
+        const columns = names.map(name => decodeColumn(encoded.columns[name]));
+        const rows = new Array(encoded.rows);
+
+        for (let i = 0; i < encoded.rows; i++) {
+            const row = {};
+            for (let j = 0; j < names.length; j++) {
+                row[names[j]] = columns[j][i];
+            }
+            rows[i] = row;
+        }
+        decoded[fileName] = rows;
+    }
+    return decoded;
+}
+
+// Decode one columnar column back to strings, as stored in the row format
+function decodeColumn(column) {
+    if (column.type === 'dict') {
+        return column.codes.map(code => column.values[code]);
+    }
+    if (column.type === 'number') {
+        return column.values;
+    }
+    const missing = column.missing !== undefined ? column.missing : null;
+    return column.values.map(value => value === null ? missing : String(value));
+}
+
+// Probe for the query server once (null when the app is served as static files)
+function loadQueryServer() {
+    if (!queryServerRequest) {
+        queryServerRequest = fetch('status', { cache: 'no-store' })
+            .then(response => response.ok ? response.json() : null)
+            .then(status => status && status.version === 1 ? status : null)
+            .catch(() => null);
+    }
+    return queryServerRequest;
+}
+
+// Fetch a query endpoint of the server (null without a server or on error);
+// responses carry ETags, so repeated queries are revalidated with a 304
+async function fetchQuery(path) {
+    if (!await loadQueryServer()) {
+        return null;
+    }
+    try {
+        const response = await fetch(path);
+        return response.ok ? await response.json() : null;
+    } catch (error) {
+        console.warn(`Query ${path} failed:`, error);
+        return null;
+    }
+}
+
+// Load indicator data sources: nothing up front when a query server answers,
+// the shard manifest if one was built, otherwise the full compiled data and index
+async function loadIndicatorSources() {
+    const server = await loadQueryServer();
+    if (server) {
+        console.log(`Query server available: ${server.indicators} indicators, querying on demand`);
+        return;
+    }
+    if (await loadShardManifest()) {
+        return;
+    }
+    ensureCompiledData();
+    loadIndicatorIndex();
+}
+
+// Load the per-indicator shard manifest; shards themselves are fetched on demand
+async function loadShardManifest() {
+    try {
+        const response = await fetchArtifact('data/shards/manifest.json', {
+            cache: 'no-store'
+        });
+        if (!response.ok) {
+            return false;
+        }
+        shardManifest = await response.json();
+        indicatorIndex = { indicators: {} };
+        console.log(`Shard manifest loaded: ${Object.keys(shardManifest.indicators).length} indicators`);
+        return true;
+    } catch (error) {
+        console.warn('Shard manifest not available, loading full compiled data:', error);
+        return false;
+    }
+}
+
+// Fetch an indicator's shard into the index (no-op when not running from shards)
+async function ensureIndicatorShard(indicatorId) {
+    if (!shardManifest || !shardManifest.indicators[indicatorId]) {
+        return;
+    }
+
+    if (!indicatorShardRequests[indicatorId]) {
+        const entry = shardManifest.indicators[indicatorId];
+        // The content hash doubles as a cache-busting version when not packaged
+        const path = `data/shards/${entry.shard}`;
+        indicatorShardRequests[indicatorId] = fetchArtifact(path, {}, `${path}?v=${entry.sha256.slice(0, 12)}`)
+            .then(response => {
+                if (!response.ok) {
+                    throw new Error(`HTTP ${response.status} for ${entry.shard}`);
+                }
+                return response.json();
+            })
+            .then(shard => {
+                indicatorIndex.indicators[indicatorId] = shard;
+            })
+            .catch(error => {
+                delete indicatorShardRequests[indicatorId];
+                throw error;
+            });
+    }
+
+    await indicatorShardRequests[indicatorId];
+}
+
+// Load pre-resolved indicator index (built by compile-data.py)
+async function loadIndicatorIndex() {
+    try {
+        const response = await fetchArtifact('data/indicator-index.json', {
+            cache: 'no-store'
+        });
+        if (!response.ok) {
+            throw new Error(`HTTP ${response.status}`);
+        }
+        indicatorIndex = await response.json();
+        console.log(`Indicator index loaded: ${Object.keys(indicatorIndex.indicators).length} indicators`);
+    } catch (error) {
+        console.warn('Indicator index not available, falling back to scanning compiled data:', error);
+    }
+}
+
+// Look up an indicator/year in the pre-resolved index
+// Returns null if the indicator is not indexed (caller falls back to scanning rows)
+function lookupIndicatorIndex(indicatorId, year) {
+    if (!indicatorIndex || !indicatorIndex.indicators[indicatorId]) {
+        return null;
+    }
+
+    const values = indicatorIndex.indicators[indicatorId].values[year] || {};
+    return Object.entries(values).map(([country, value]) => ({ country, value }));
+}
+
 // Populate category dropdown
 function populateCategorySelect() {
     const categorySelect = document.getElementById('category-select');
@@ -351,6 +576,10 @@ async function onIndicatorChange(event) {
                 option.textContent = year;
                 yearSelect.appendChild(option);
             });
+            const defaultYear = await getLatestCoveredYear(indicatorId, MIN_COUNTRIES_FOR_DEFAULT_YEAR);
+            if (defaultYear !== null && availableYears.includes(defaultYear)) {
+                yearSelect.value = defaultYear;
+            }
             yearSelect.disabled = false;
             loadDataBtn.disabled = false;
             showTrendBtn.disabled = false;
@@ -376,6 +605,25 @@ async function getAvailableYears(dataFile, indicatorId) {
 
     console.log(`Getting available years for ${indicatorId} from ${dataFile}`);
 
+    // Use the pre-computed year list from the coverage bitsets, shard manifest or index
+    const coverage = await loadCoverage();
+    if (coverage && coverage.indicators[indicatorId]) {
+        const coveredYears = coverage.indicators[indicatorId];
+        return allYears.filter(year => coveredYears[year]);
+    }
+    const served = await fetchQuery(`indicator/${encodeURIComponent(indicatorId)}`);
+    if (served) {
+        return allYears.filter(year => served.years.includes(year));
+    }
+    if (shardManifest && shardManifest.indicators[indicatorId]) {
+        const shardYears = shardManifest.indicators[indicatorId].years;
+        return allYears.filter(year => shardYears.includes(year));
+    }
+    if (indicatorIndex && indicatorIndex.indicators[indicatorId]) {
+        const indexedYears = indicatorIndex.indicators[indicatorId].years;
+        return allYears.filter(year => indexedYears.includes(year));
+    }
+
     // Try to load data from compiled JSON or CSV for each year
     for (const year of allYears) {
         try {
@@ -442,6 +690,13 @@ async function loadIndicatorData() {
                 alert('No active DREF operations found.');
             }
         } else if (indicatorId === 'PAST_DREFS') {
+            // Pre-aggregated totals when a fresh snapshot exists: no appeal list to reduce
+            const drefSummary = await loadDrefSummary();
+            if (drefSummary) {
+                hideLoading();
+                displayDrefSummaryOnMap(drefSummary);
+                return;
+            }
             const pastDrefData = await loadPastDREFData();
             hideLoading();
             if (pastDrefData && pastDrefData.length > 0) {
@@ -514,6 +769,30 @@ function parseCSVLine(line) {
 // Load data from compiled JSON or fallback to CSV file
 async function loadDataFile(fileName, indicatorId, year) {
     try {
+        // Query server: only this indicator-year's values are transferred
+        const served = await fetchQuery(`indicator/${encodeURIComponent(indicatorId)}?year=${year}`);
+        if (served) {
+            return served.values;
+        }
+        if (await loadQueryServer()) {
+            // The server knows the indicator but has no values for this year
+            if (await fetchQuery(`indicator/${encodeURIComponent(indicatorId)}`)) {
+                return [];
+            }
+            // Not in the server's index: the compiled data comes before the raw CSV
+            await ensureCompiledData();
+        }
+
+        // Pre-resolved index: a dictionary lookup instead of scanning rows
+        await ensureIndicatorShard(indicatorId);
+        const indexedData = lookupIndicatorIndex(indicatorId, year);
+        if (indexedData) {
+            return indexedData;
+        }
+
+        // Row scans below may need the shared IHME filter rules
+        await loadIHMEFilterSpec();
+
         // For IHME data, check all IHME files in compiled data (not just the specified one)
         // This allows us to get data from multiple IHME files (e.g., 2021 and 2023 data)
         if (compiledData && fileName.includes('IHME')) {
@@ -536,39 +815,15 @@ async function loadDataFile(fileName, indicatorId, year) {
                 // Process this IHME file
                 for (let rowData of rows) {
                     const countryName = rowData['location_name'];
-                    const measureName = rowData['measure_name'];
-                    const ageName = rowData['age_name'];
-                    const sexName = rowData['sex_name'];
-                    const metricName = rowData['metric_name'];
-                    const causeName = rowData['cause_name'];
-                    const reiName = rowData['rei_name'];
 
                     // Check if this row matches the requested measure
-                    if (measureName !== indicatorId) {
+                    if (rowData['measure_name'] !== indicatorId) {
                         continue;
                     }
 
-                    // Apply filtering rules
-                    if (measureName === 'Life expectancy' || measureName === 'HALE (Healthy life expectancy)') {
-                        if (ageName !== '0-6 days' || sexName !== 'Both' || metricName !== 'Years') {
-                            continue;
-                        }
-                        if (causeName || reiName) {
-                            continue;
-                        }
-                    } else {
-                        if (causeName !== 'All causes') {
-                            continue;
-                        }
-                        if (reiName) {
-                            continue;
-                        }
-                        if (ageName !== 'All ages' || sexName !== 'Both') {
-                            continue;
-                        }
-                        if (metricName !== 'Rate') {
-                            continue;
-                        }
+                    // Apply the shared aggregate filter
+                    if (!isIHMEAggregateRow(rowData)) {
+                        continue;
                     }
 
                     // Check year and extract value
@@ -624,46 +879,14 @@ async function loadDataFile(fileName, indicatorId, year) {
 
                 // For IHME data, check if this row matches the requested measure
                 if (isIHME) {
-                    const measureName = rowData['measure_name'];
-                    const ageName = rowData['age_name'];
-                    const sexName = rowData['sex_name'];
-                    const metricName = rowData['metric_name'];
-                    const causeName = rowData['cause_name'];
-                    const reiName = rowData['rei_name'];
-
                     // indicatorId contains the measure name (e.g., 'Deaths', 'DALYs (Disability-Adjusted Life Years)')
-                    if (measureName !== indicatorId) {
+                    if (rowData['measure_name'] !== indicatorId) {
                         continue; // Skip rows that don't match the requested measure
                     }
 
-                    // For life expectancy and HALE: use "0-6 days" age (at birth), "Years" metric
-                    // These measures don't have cause_name or rei_name populated
-                    if (measureName === 'Life expectancy' || measureName === 'HALE (Healthy life expectancy)') {
-                        if (ageName !== '0-6 days' || sexName !== 'Both' || metricName !== 'Years') {
-                            continue;
-                        }
-                        // Skip rows with any cause or risk factor
-                        if (causeName || reiName) {
-                            continue;
-                        }
-                    }
-                    // For all other measures: "All ages", "Both sexes", "All causes", no risk factor, "Rate" metric
-                    else {
-                        // Only include "All causes" and no specific risk factor (empty reiName = total)
-                        if (causeName !== 'All causes') {
-                            continue;
-                        }
-                        if (reiName) {  // Skip any row with a risk factor (we want total only)
-                            continue;
-                        }
-                        // Only include aggregate data: All ages, Both sexes
-                        if (ageName !== 'All ages' || sexName !== 'Both') {
-                            continue;
-                        }
-                        // Must use "Rate" metric
-                        if (metricName !== 'Rate') {
-                            continue;
-                        }
+                    // Keep only the aggregate row (shared rules in data/ihme-filter-spec.json)
+                    if (!isIHMEAggregateRow(rowData)) {
+                        continue;
                     }
                 }
 
@@ -673,7 +896,10 @@ async function loadDataFile(fileName, indicatorId, year) {
                 if (isWHO) {
                     // WHO format: check if row matches the year in DIM_TIME
                     const rowYear = rowData['DIM_TIME'];
-                    if (rowYear == year) {
+                    if (rowYear == year && typeof rowData['VALUE'] === 'number') {
+                        // Reduced at build time (--reduce-who): one typed value per country-year
+                        value = rowData['VALUE'];
+                    } else if (rowYear == year) {
                         // Try different value columns
                         value = extractValueFromRow(rowData, [
                             'PERCENT_POP_N', 'Value', 'Numeric', 'VALUE',
@@ -799,6 +1025,42 @@ async function loadDataFile(fileName, indicatorId, year) {
     }
 }
 
+// Fetch the shared IHME aggregate-row rules once
+async function loadIHMEFilterSpec() {
+    if (!ihmeFilterSpecRequest) {
+        ihmeFilterSpecRequest = fetchArtifact('data/ihme-filter-spec.json')
+            .then(response => {
+                if (!response.ok) {
+                    throw new Error(`HTTP ${response.status}`);
+                }
+                return response.json();
+            })
+            .then(spec => {
+                ihmeFilterSpec = spec;
+            })
+            .catch(error => {
+                ihmeFilterSpecRequest = null;
+                throw error;
+            });
+    }
+    return ihmeFilterSpecRequest;
+}
+
+// Check an IHME row against the shared aggregate filter: the first rule whose
+// 'when' clause matches decides (same semantics as ihme_filters.py)
+function isIHMEAggregateRow(rowData) {
+    for (const rule of ihmeFilterSpec.rules) {
+        const applies = Object.entries(rule.when)
+            .every(([column, accepted]) => accepted.includes(rowData[column] || ''));
+        if (!applies) {
+            continue;
+        }
+        return Object.entries(rule.require)
+            .every(([column, expected]) => (rowData[column] || '') === expected);
+    }
+    return false;
+}
+
 // Extract value from row trying multiple column names
 function extractValueFromRow(rowData, possibleColumns) {
     for (let col of possibleColumns) {
@@ -831,7 +1093,7 @@ function clearAllMapData() {
 
 // Display data on map using polygons
 function displayDataOnMap(data, indicatorName, unit) {
-    if (!countriesGeoJSON) {
+    if (!countriesGeoJSON && !countryGeometry) {
         console.error('Countries GeoJSON not loaded yet');
         return;
     }
@@ -875,7 +1137,7 @@ function displayDataOnMap(data, indicatorName, unit) {
                 ${indicatorName}: <strong>${formatNumber(item.value)} ${unit}</strong>
             `);
 
-            currentOverlays.push(polygon);
+            currentOverlays.push(trackCountryGeometry(polygon, item.country));
             displayedCount++;
         } else if (!feature) {
             notFoundCount++;
@@ -907,35 +1169,112 @@ function showLegend(indicatorName, unit, data) {
     // legend.classList.add('hidden');
 }
 
-// Country coordinates (approximate center points)
+// Marker positions: the centroid of each country's largest polygon from
+// build-country-geometry.py, or these approximate centres without it
+const FALLBACK_COUNTRY_COORDINATES = {
+    'Afghanistan': [33.9391, 67.7100],
+    'Bangladesh': [23.6850, 90.3563],
+    'Burkina Faso': [12.2383, -1.5616],
+    'Cameroon': [7.3697, 12.3547],
+    'Central African Republic': [6.6111, 20.9394],
+    'Chad': [15.4542, 18.7322],
+    'Colombia': [4.5709, -74.2973],
+    'Congo DR': [-4.0383, 21.7587],
+    'Ethiopia': [9.1450, 40.4897],
+    'Haiti': [18.9712, -72.2852],
+    'Lebanon': [33.8547, 35.8623],
+    'Mali': [17.5707, -3.9962],
+    'Mozambique': [-18.6657, 35.5296],
+    'Myanmar': [21.9162, 95.9560],
+    'Niger': [17.6078, 8.0817],
+    'Nigeria': [9.0820, 8.6753],
+    'Pakistan': [30.3753, 69.3451],
+    'Somalia': [5.1521, 46.1996],
+    'South Sudan': [6.8770, 31.3070],
+    'Sudan': [12.8628, 30.2176],
+    'Syria': [34.8021, 38.9968],
+    'Uganda': [1.3733, 32.2903],
+    'Ukraine': [48.3794, 31.1656],
+    'Venezuela': [6.4238, -66.5897],
+    'Yemen': [15.5527, 48.5164]
+};
+
 function getCountryCoordinates() {
-    return {
-        'Afghanistan': [33.9391, 67.7100],
-        'Bangladesh': [23.6850, 90.3563],
-        'Burkina Faso': [12.2383, -1.5616],
-        'Cameroon': [7.3697, 12.3547],
-        'Central African Republic': [6.6111, 20.9394],
-        'Chad': [15.4542, 18.7322],
-        'Colombia': [4.5709, -74.2973],
-        'Congo DR': [-4.0383, 21.7587],
-        'Ethiopia': [9.1450, 40.4897],
-        'Haiti': [18.9712, -72.2852],
-        'Lebanon': [33.8547, 35.8623],
-        'Mali': [17.5707, -3.9962],
-        'Mozambique': [-18.6657, 35.5296],
-        'Myanmar': [21.9162, 95.9560],
-        'Niger': [17.6078, 8.0817],
-        'Nigeria': [9.0820, 8.6753],
-        'Pakistan': [30.3753, 69.3451],
-        'Somalia': [5.1521, 46.1996],
-        'South Sudan': [6.8770, 31.3070],
-        'Sudan': [12.8628, 30.2176],
-        'Syria': [34.8021, 38.9968],
-        'Uganda': [1.3733, 32.2903],
-        'Ukraine': [48.3794, 31.1656],
-        'Venezuela': [6.4238, -66.5897],
-        'Yemen': [15.5527, 48.5164]
-    };
+    const coordinates = { ...FALLBACK_COUNTRY_COORDINATES };
+    if (countryGeometry) {
+        Object.values(countryGeometry.countries).forEach(country => {
+            if (country.centroid) {
+                coordinates[country.name] = country.centroid;
+            }
+        });
+    }
+    return coordinates;
+}
+
+// Load the feed snapshot manifest (null when prefetch-feeds.py has not been run)
+function loadFeedManifest() {
+    if (!feedManifestRequest) {
+        feedManifestRequest = fetch(`${FEED_SNAPSHOT_DIR}/manifest.json`, { cache: 'no-cache' })
+            .then(response => response.ok ? response.json() : null)
+            .then(manifest => manifest && manifest.version === 1 ? manifest : null)
+            .catch(() => null);
+    }
+    return feedManifestRequest;
+}
+
+function loadCountrySnapshot(iso3) {
+    if (!feedSnapshotRequests[iso3]) {
+        feedSnapshotRequests[iso3] = fetch(`${FEED_SNAPSHOT_DIR}/${iso3}.json`, { cache: 'no-cache' })
+            .then(response => response.ok ? response.json() : null)
+            .catch(() => null);
+    }
+    return feedSnapshotRequests[iso3];
+}
+
+// Manifest entry of a feed whose snapshot has not expired (null otherwise)
+async function getFreshFeed(feed) {
+    const manifest = await loadFeedManifest();
+    const entry = manifest && manifest.feeds[feed];
+    if (!entry || !entry.expires || Date.parse(entry.expires) <= Date.now()) {
+        return null;
+    }
+    return entry;
+}
+
+// Records of a feed from the snapshots of the given countries (default: all),
+// or null when the feed has no snapshot or it expired; callers then use the live API
+async function loadFeedSnapshot(feed, iso3Codes = null) {
+    const entry = await getFreshFeed(feed);
+    if (!entry) {
+        return null;
+    }
+    const manifest = await loadFeedManifest();
+    const codes = iso3Codes || Object.keys(manifest.countries);
+    const snapshots = await Promise.all(codes.map(loadCountrySnapshot));
+    if (snapshots.some(snapshot => !snapshot || !snapshot[feed])) {
+        return null;
+    }
+    const records = snapshots.flatMap(snapshot => snapshot[feed]);
+    console.log(`Using ${feed} snapshot of ${entry.fetched}: ${records.length} records`);
+    return records;
+}
+
+// Per-country DREF totals built from the past-DREF snapshot (dref_summary.py),
+// or null when the snapshot is missing or expired
+async function loadDrefSummary() {
+    const entry = await getFreshFeed('drefs');
+    if (!entry) {
+        return null;
+    }
+    try {
+        const response = await fetch(`${FEED_SNAPSHOT_DIR}/dref-summary.json`, { cache: 'no-cache' });
+        const summary = response.ok ? await response.json() : null;
+        // Only a summary of the snapshot the manifest describes
+        return summary && summary.version === 1 && summary.fetched === entry.fetched ? summary : null;
+    } catch (error) {
+        console.warn('Could not load the DREF summary:', error);
+        return null;
+    }
 }
 
 // Load DREF data from IFRC API
@@ -948,6 +1287,13 @@ async function loadDREFData() {
             return cachedDrefData;
         }
 
+        const snapshot = await loadFeedSnapshot('activeDrefs');
+        if (snapshot) {
+            cachedDrefData = snapshot;
+            cacheTimestamp = now;
+            return snapshot;
+        }
+
         console.log('Fetching fresh DREF data from API...');
         const response = await fetch(DREF_API_URL, {
             headers: {
@@ -1070,6 +1416,13 @@ async function loadPastDREFData() {
             return cachedPastDrefData;
         }
 
+        const snapshot = await loadFeedSnapshot('drefs');
+        if (snapshot) {
+            cachedPastDrefData = snapshot;
+            cacheTimestamp = now;
+            return snapshot;
+        }
+
         console.log('Fetching fresh past DREF data from API...');
 
         // First request to get total count and determine number of pages
@@ -1257,6 +1610,91 @@ function displayPastDREFOnMap(drefs) {
     console.log(`Displayed ${currentMarkers.length} country markers for past DREFs`);
 }
 
+// Display pre-aggregated past DREF totals: one badge per country with a popup of
+// totals, the split by year and hazard, and the most recent operations
+function displayDrefSummaryOnMap(summary) {
+    const countryCoordinates = getCountryCoordinates();
+    const currency = new Intl.NumberFormat('en-US', { style: 'currency', currency: 'CHF', maximumFractionDigits: 0 });
+
+    Object.values(summary.countries).forEach(entry => {
+        const coords = countryCoordinates[entry.country];
+        if (!coords) {
+            console.warn(`No coordinates found for country: ${entry.country}`);
+            return;
+        }
+        const totals = entry.totals;
+        const badgeIcon = L.divIcon({
+            html: `<div style="
+                background-color: #dc2626;
+                color: white;
+                width: 32px;
+                height: 32px;
+                border-radius: 50%;
+                display: flex;
+                align-items: center;
+                justify-content: center;
+                font-size: 14px;
+                font-weight: bold;
+                border: 3px solid white;
+                box-shadow: 0 2px 6px rgba(0,0,0,0.4);
+            ">${totals.count}</div>`,
+            className: 'past-dref-marker',
+            iconSize: [32, 32],
+            iconAnchor: [16, 16]
+        });
+
+        const years = Object.entries(entry.years)
+            .map(([year, yearTotals]) => `${year}: ${yearTotals.count}`)
+            .join(', ');
+        const hazards = Object.entries(entry.hazards)
+            .map(([hazard, hazardTotals]) => `${hazard}: ${hazardTotals.count}`)
+            .join(', ');
+        const recent = entry.recent.map(dref => {
+            const startDate = dref.start_date ? new Date(dref.start_date).toLocaleDateString() : 'N/A';
+            const endDate = dref.end_date ? new Date(dref.end_date).toLocaleDateString() : 'Ongoing';
+            const amount = dref.amount_requested ? currency.format(dref.amount_requested) : 'N/A';
+            return `
+                <div style="border-left: 3px solid #dc2626; padding-left: 8px; margin-bottom: 12px;">
+                    <strong>${dref.name || 'DREF Operation'}</strong><br>
+                    <span style="font-size: 12px;">
+                    <strong>Type:</strong> ${dref.hazard}<br>
+                    <strong>Status:</strong> ${dref.status || 'N/A'}<br>
+                    <strong>Amount:</strong> ${amount}<br>
+                    <strong>Period:</strong> ${startDate} - ${endDate}<br>
+                    ${dref.code ? `<strong>Code:</strong> ${dref.code}<br>` : ''}
+                    </span>
+                </div>
+            `;
+        }).join('');
+
+        const popupContent = `
+            <div style="min-width: 250px; max-height: 400px; overflow-y: auto;">
+                <strong style="color: #dc2626; font-size: 15px;">${entry.country}</strong><br>
+                <strong>Past DREFs (since 2018): ${totals.count}</strong>
+                (${totals.active} active, ${totals.closed} closed)<br>
+                <strong>Requested:</strong> ${currency.format(totals.amountRequested)}<br>
+                <strong>Funded:</strong> ${currency.format(totals.amountFunded)}<br>
+                <strong>Beneficiaries:</strong> ${formatNumber(totals.beneficiaries, 0)}<br>
+                <strong>By year:</strong> ${years}<br>
+                <strong>By hazard:</strong> ${hazards}<br><br>
+                <strong>Most recent operations:</strong><br>
+                ${recent}
+            </div>
+        `;
+
+        const marker = L.marker(coords, { icon: badgeIcon })
+            .bindPopup(popupContent, {
+                maxWidth: 300,
+                maxHeight: 400
+            })
+            .addTo(map);
+
+        currentMarkers.push(marker);
+    });
+
+    console.log(`Displayed ${currentMarkers.length} country markers from the DREF summary of ${summary.fetched}`);
+}
+
 // Show past DREF legend
 function showPastDREFLegend(drefs) {
     // Legend disabled per user request
@@ -1275,7 +1713,10 @@ async function loadCountryProfile(countryName, countryCode) {
     // Highlight country on map with polygon
     // fillOpacity: 0.5 = 50% transparent fill
     // White border for clear separation
-    const feature = getCountryPolygon(countryName);
+    // Draw at the detail level of the zoom we are about to fit to
+    const bounds = getCountryBounds(countryName);
+    const drawZoom = bounds ? map.getBoundsZoom(bounds) : map.getZoom();
+    const feature = getCountryPolygon(countryName, drawZoom);
     if (feature) {
         const polygon = L.geoJSON(feature, {
             style: function(feature) {
@@ -1291,8 +1732,15 @@ async function loadCountryProfile(countryName, countryCode) {
         }).addTo(map);
 
         // Zoom to country bounds
-        map.fitBounds(polygon.getBounds());
-        currentOverlays.push(polygon);
+        map.fitBounds(bounds || polygon.getBounds());
+        currentOverlays.push(trackCountryGeometry(polygon, countryName, drawZoom));
+    }
+
+    // Precomputed profile (compile-data.py): one small fetch, no scanning
+    const profile = await loadPrecomputedProfile(countryCode);
+    if (profile) {
+        displayCountryProfile(countryName, profile.indicatorsByCategory);
+        return;
     }
 
     try {
@@ -1344,6 +1792,31 @@ async function loadCountryProfile(countryName, countryCode) {
     }
 }
 
+// Fetch the precomputed profile for a country (null if not built)
+async function loadPrecomputedProfile(countryCode) {
+    if (!countryCode) {
+        return null;
+    }
+
+    const served = await fetchQuery(`country/${encodeURIComponent(countryCode)}/profile`);
+    if (served) {
+        return served;
+    }
+
+    try {
+        const response = await fetchArtifact(`data/profiles/${countryCode}.json`, {
+            cache: 'no-store'
+        });
+        if (!response.ok) {
+            return null;
+        }
+        return await response.json();
+    } catch (error) {
+        console.warn(`Precomputed profile for ${countryCode} not available:`, error);
+        return null;
+    }
+}
+
 // Display country profile in panel
 function displayCountryProfile(countryName, indicatorsByCategory) {
     const profileContent = document.getElementById('country-profile-content');
@@ -1393,9 +1866,119 @@ function closeCountryProfile() {
     profilePanel.classList.add('hidden');
 }
 
+// Resolve a country name to the ISO3 key used by the country geometry
+function getCountryGeometryCode(countryName) {
+    const aliases = {
+        'Democratic Republic of the Congo': 'Congo DR',
+        'Central Africa Republic': 'Central African Republic',
+        'Syrian Arab Republic': 'Syria'
+    };
+    const name = aliases[countryName] || countryName;
+    return Object.keys(countryGeometry.countries)
+        .find(code => countryGeometry.countries[code].name === name) || null;
+}
+
+// Decode a simplification level's delta-encoded, quantised arcs (once per level)
+function decodeGeometryLevel(level) {
+    if (!countryGeometryLevels[level.name]) {
+        const [scaleX, scaleY] = countryGeometry.transform.scale;
+        const [translateX, translateY] = countryGeometry.transform.translate;
+        countryGeometryLevels[level.name] = level.arcs.map(arc => {
+            let x = 0;
+            let y = 0;
+            return arc.map(([dx, dy]) => {
+                x += dx;
+                y += dy;
+                return [x * scaleX + translateX, y * scaleY + translateY];
+            });
+        });
+    }
+    return countryGeometryLevels[level.name];
+}
+
+// Simplification level drawn at a zoom (the finest whose minZoom it reaches)
+function getGeometryLevel(zoom) {
+    const levels = countryGeometry.levels;
+    return levels.filter(l => l.minZoom <= zoom).pop() || levels[0];
+}
+
+// Remember which country and level a drawn outline layer shows, so
+// refreshCountryGeometry() can redraw it when the zoom crosses a level
+function trackCountryGeometry(layer, countryName, zoom = map.getZoom()) {
+    if (countryGeometry) {
+        layer.countryName = countryName;
+        layer.geometryLevel = getGeometryLevel(zoom).name;
+    }
+    return layer;
+}
+
+// Redraw the tracked country outlines whose level differs from the current zoom's
+function refreshCountryGeometry() {
+    if (!countryGeometry) {
+        return;
+    }
+    const zoom = map.getZoom();
+    const level = getGeometryLevel(zoom).name;
+    currentOverlays.forEach(layer => {
+        if (!layer.countryName || layer.geometryLevel === level) {
+            return;
+        }
+        const code = getCountryGeometryCode(layer.countryName);
+        if (code) {
+            // clearLayers/addData keep the layer's style and bound popup
+            layer.clearLayers();
+            layer.addData(getCountryGeometryFeature(code, zoom));
+            layer.geometryLevel = level;
+        }
+    });
+}
+
+// Build a country's feature from the arcs of the level matching the zoom
+function getCountryGeometryFeature(code, zoom) {
+    const level = getGeometryLevel(zoom);
+    const cacheKey = `${code}:${level.name}`;
+
+    if (!countryFeatureCache[cacheKey]) {
+        const arcs = decodeGeometryLevel(level);
+        // ~index (negative) means the shared arc is traversed backwards
+        const ring = refs => refs.reduce((points, ref) => {
+            const arc = ref >= 0 ? arcs[ref] : arcs[~ref].slice().reverse();
+            return points.concat(points.length ? arc.slice(1) : arc);
+        }, []);
+
+        countryFeatureCache[cacheKey] = {
+            type: 'FeatureCollection',
+            features: [{
+                type: 'Feature',
+                properties: { ISO3: code, NAME: countryGeometry.countries[code].name },
+                geometry: {
+                    type: 'MultiPolygon',
+                    coordinates: countryGeometry.geometries[code].map(polygon => polygon.map(ring))
+                }
+            }]
+        };
+    }
+    return countryFeatureCache[cacheKey];
+}
+
+// Precomputed [[south, west], [north, east]] bounds of a country (null if unknown)
+function getCountryBounds(countryName) {
+    const code = countryGeometry && getCountryGeometryCode(countryName);
+    if (!code) {
+        return null;
+    }
+    const [west, south, east, north] = countryGeometry.countries[code].bbox;
+    return [[south, west], [north, east]];
+}
+
 // Get country polygon from GeoJSON
 // Returns a FeatureCollection containing all matching features (e.g., Somalia + Somaliland)
-function getCountryPolygon(countryName) {
+function getCountryPolygon(countryName, zoom = map.getZoom()) {
+    if (countryGeometry) {
+        const code = getCountryGeometryCode(countryName);
+        return code ? getCountryGeometryFeature(code, zoom) : null;
+    }
+
     if (!countriesGeoJSON) return null;
 
     // Name mappings for matching
@@ -1434,6 +2017,24 @@ async function loadTimeSeriesData() {
     }
 
     const { indicatorId, dataFile, unit } = currentIndicatorData;
+
+    // Precomputed country x year cube (compile-data.py): render without rescanning
+    const cube = await getTimeSeriesCube(indicatorId);
+    if (cube) {
+        const cubeData = {};
+        cube.countries.forEach((country, row) => {
+            cube.values[row].forEach((value, column) => {
+                if (value !== null) {
+                    if (!cubeData[country]) {
+                        cubeData[country] = {};
+                    }
+                    cubeData[country][cube.years[column]] = value;
+                }
+            });
+        });
+        return { years: cube.years, timeSeriesData: cubeData, unit };
+    }
+
     const years = [2018, 2019, 2020, 2021, 2022, 2023, 2024];
     const timeSeriesData = {};
 
@@ -1460,6 +2061,67 @@ async function loadTimeSeriesData() {
     return { years, timeSeriesData, unit };
 }
 
+// An indicator's country x year cube: from the query server, else the cubes file (null if neither)
+async function getTimeSeriesCube(indicatorId) {
+    const served = await fetchQuery(`timeseries/${encodeURIComponent(indicatorId)}`);
+    if (served) {
+        return served;
+    }
+    const cubes = await loadTimeSeriesCubes();
+    return cubes && cubes.indicators[indicatorId] ? cubes.indicators[indicatorId] : null;
+}
+
+// Fetch precomputed time-series cubes once (null if not built)
+async function loadTimeSeriesCubes() {
+    if (!timeSeriesCubesRequest) {
+        timeSeriesCubesRequest = fetchArtifact('data/timeseries-cubes.json', { cache: 'no-store' })
+            .then(response => response.ok ? response.json() : null)
+            .catch(error => {
+                console.warn('Time-series cubes not available, falling back to per-year loading:', error);
+                return null;
+            });
+    }
+    return timeSeriesCubesRequest;
+}
+
+// Fetch the coverage bitsets once (null if not built, see indicator_coverage.py)
+async function loadCoverage() {
+    if (!coverageRequest) {
+        coverageRequest = fetchArtifact('data/coverage.json', { cache: 'no-store' })
+            .then(response => response.ok ? response.json() : null)
+            .catch(error => {
+                console.warn('Coverage bitsets not available:', error);
+                return null;
+            });
+    }
+    return coverageRequest;
+}
+
+// Number of countries in a hex coverage bitset
+function countCoverageBits(bits) {
+    let count = 0;
+    for (const digit of bits) {
+        let value = parseInt(digit, 16);
+        while (value) {
+            count += value & 1;
+            value >>= 1;
+        }
+    }
+    return count;
+}
+
+// Latest year with data for at least minCountries countries (null if unknown)
+async function getLatestCoveredYear(indicatorId, minCountries) {
+    const coverage = await loadCoverage();
+    if (!coverage || !coverage.indicators[indicatorId]) {
+        return null;
+    }
+    const years = Object.entries(coverage.indicators[indicatorId])
+        .filter(([, bits]) => countCoverageBits(bits) >= minCountries)
+        .map(([year]) => parseInt(year));
+    return years.length > 0 ? Math.max(...years) : null;
+}
+
 // Show time series chart
 async function showTimeSeriesChart() {
     const chartPanel = document.getElementById('chart-panel');
@@ -2092,6 +2754,11 @@ function getEventTypeLabel(eventType) {
 async function loadEmdatData(iso3) {
     console.log(`Fetching EM-DAT data for country ISO3: ${iso3}`);
     try {
+        const snapshot = await loadFeedSnapshot('emdat', [iso3]);
+        if (snapshot) {
+            return snapshot;
+        }
+
         const url = `https://www.gdacs.org/gdacsapi/api/Emdat/getemdatbyiso3?iso3=${iso3}`;
         console.log(`EM-DAT API URL: ${url}`);
 
@@ -2152,6 +2819,11 @@ async function loadEmdatData(iso3) {
 // No pagination is available, and date parameters are not supported
 async function loadGDACSDisasterData() {
     try {
+        const snapshot = await loadFeedSnapshot('gdacs');
+        if (snapshot) {
+            return snapshot;
+        }
+
         const response = await fetch(GDACS_API_URL);
 
         if (!response.ok) {
@@ -2405,6 +3077,20 @@ function closeTimeline(event) {
     console.log('Timeline closed - container should be hidden');
 }
 
+// Merged timeline of a country (disaster_timeline.py), or null when it is missing or expired
+async function loadCountryTimeline(iso3) {
+    try {
+        const response = await fetch(`${FEED_SNAPSHOT_DIR}/timelines/${iso3}.json`, { cache: 'no-cache' });
+        const timeline = response.ok ? await response.json() : null;
+        if (timeline && timeline.version === 1 && Date.parse(timeline.expires) > Date.now()) {
+            return timeline;
+        }
+    } catch (error) {
+        console.warn(`Could not load the timeline of ${iso3}:`, error);
+    }
+    return null;
+}
+
 // Show timeline for a country
 async function showCountryTimeline(countryName, countryISO3) {
     const timelineContainer = document.getElementById('timeline-container');
@@ -2419,6 +3105,15 @@ async function showCountryTimeline(countryName, countryISO3) {
     // Show loading popup
     showLoading('Loading timeline data...');
 
+    // A merged timeline built by prefetch-feeds.py: one small fetch, nothing to merge
+    const timeline = await loadCountryTimeline(countryISO3);
+    if (timeline) {
+        console.log(`Timeline for ${countryName}: ${timeline.events.length} merged events`);
+        drawMergedTimeline(timeline.events);
+        hideLoading();
+        return;
+    }
+
     // Fetch disaster events, DREFs, and EM-DAT events for this country
     try {
         const [disasters, drefs, emdatEvents] = await Promise.all([
@@ -2452,8 +3147,9 @@ async function showCountryTimeline(countryName, countryISO3) {
     }
 }
 
-// Draw timeline with events
-function drawTimeline(disasters, drefs, emdatEvents = []) {
+// Clear the timeline and draw its axis with year markers; returns what the
+// marker code needs to place events
+function drawTimelineAxis() {
     const svg = document.getElementById('timeline-svg');
     const container = document.getElementById('timeline-content');
     const width = container.clientWidth;
@@ -2507,6 +3203,13 @@ function drawTimeline(disasters, drefs, emdatEvents = []) {
         svg.appendChild(label);
     }
 
+    return { svg, width, startDate, endDate, timeRange };
+}
+
+// Draw timeline with events
+function drawTimeline(disasters, drefs, emdatEvents = []) {
+    const { svg, width, startDate, endDate, timeRange } = drawTimelineAxis();
+
     // Y positions for different marker types (DREFs higher, disasters lower)
     const drefY = 20;
     const disasterY = 40;
@@ -2643,6 +3346,82 @@ function drawTimeline(disasters, drefs, emdatEvents = []) {
     });
 }
 
+// Draw a merged timeline (disaster_timeline.py): GDACS and EM-DAT records of
+// the same event are already one disaster marker, DREFs are circles
+function drawMergedTimeline(events) {
+    const { svg, width, startDate, endDate, timeRange } = drawTimelineAxis();
+    const drefY = 20;
+    const disasterY = 40;
+    const sourceLabels = { gdacs: 'GDACS', emdat: 'EM-DAT' };
+    const drefDetails = dref => {
+        const amount = dref.amount_funded ? `CHF ${dref.amount_funded.toLocaleString()}` : 'N/A';
+        return `<div><b>Name:</b> ${dref.name || dref.type || 'DREF Operation'}</div>
+                <div><b>Type:</b> ${dref.type || 'N/A'}</div>
+                <div><b>Start Date:</b> ${new Date(dref.start).toLocaleDateString()}</div>
+                <div><b>Amount:</b> ${amount}</div>`;
+    };
+
+    // DREFs linked to a disaster keep their own marker on the DREF row
+    const entries = [];
+    events.forEach(event => {
+        entries.push(event);
+        (event.drefs || []).forEach(dref => entries.push({ ...dref, kind: 'dref', disaster: event }));
+    });
+
+    entries.forEach(event => {
+        const eventDate = new Date(event.start);
+        if (eventDate < startDate || eventDate > endDate) {
+            return;
+        }
+        const x = 40 + ((eventDate - startDate) / timeRange) * (width - 80);
+        const period = event.end && event.end !== event.start
+            ? `${eventDate.toLocaleDateString()} - ${new Date(event.end).toLocaleDateString()}`
+            : eventDate.toLocaleDateString();
+        let marker;
+        let tooltipContent;
+
+        if (event.kind === 'dref') {
+            marker = document.createElementNS('http://www.w3.org/2000/svg', 'circle');
+            marker.setAttribute('cx', x);
+            marker.setAttribute('cy', drefY);
+            marker.setAttribute('r', '8');
+            marker.setAttribute('fill', '#dc2626');
+            const disaster = event.disaster
+                ? `<div><b>Responds to:</b> ${event.disaster.name || event.disaster.type || event.disaster.hazard} (${new Date(event.disaster.start).toLocaleDateString()})</div>`
+                : '';
+            tooltipContent = `<strong>DREF OPERATION</strong>
+                ${drefDetails(event)}
+                ${disaster}`;
+        } else {
+            const size = 9;
+            marker = document.createElementNS('http://www.w3.org/2000/svg', 'polygon');
+            marker.setAttribute('points', `${x},${disasterY - size} ${x - size},${disasterY + size} ${x + size},${disasterY + size}`);
+            marker.setAttribute('fill', '#f97316');
+            const sources = event.sources.map(source => sourceLabels[source] || source).join(' + ');
+            const details = [
+                event.name ? `<div><b>Name:</b> ${event.name}</div>` : '',
+                event.alertlevel ? `<div><b>Alert Level:</b> ${event.alertlevel}</div>` : '',
+                event.severity !== undefined ? `<div><b>Severity:</b> ${event.severity}</div>` : '',
+                event.deaths !== undefined ? `<div><b>Deaths:</b> ${formatNumber(Number(event.deaths), 0)}</div>` : '',
+                event.affected !== undefined ? `<div><b>Affected:</b> ${formatNumber(Number(event.affected), 0)}</div>` : ''
+            ].join('');
+            const drefs = (event.drefs || []).map(dref => `<div style="margin-top: 4px;"><b>DREF ${dref.code || ''}</b>${drefDetails(dref)}</div>`).join('');
+            tooltipContent = `<strong>${sources} DISASTER EVENT</strong>
+                <div><b>Type:</b> ${event.type || event.hazard}</div>
+                <div><b>Date:</b> ${period}</div>
+                ${details}
+                ${drefs}`;
+        }
+
+        // A red outline marks disasters with a linked DREF operation
+        marker.setAttribute('stroke', event.drefs ? '#dc2626' : 'white');
+        marker.setAttribute('stroke-width', '2');
+        marker.style.cursor = 'pointer';
+        marker.addEventListener('click', (e) => showTimelineTooltip(e, tooltipContent, x));
+        svg.appendChild(marker);
+    });
+}
+
 // Show timeline tooltip above marker
 function showTimelineTooltip(event, content, markerX) {
     const tooltip = document.getElementById('timeline-tooltip');
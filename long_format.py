@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Long-format observations of the compiled indicator data (standard library only)
+
+iter_long_rows() flattens {file name: [row dicts]} from compile-data.py
+into one dict per observation:
+
+  source, provider, indicator, indicator_name, country, year, value,
+  lower, upper, sex, age, metric, cause, rei, breakdown
+
+The coverage bitsets, the SQLite database and the Arrow store
+(indicator_store.py) are all built from these rows. The source-format
+constants compile-data.py parses with (WHO value columns, World Bank
+year columns) live here too, so the core build does not import the
+optional Arrow module for them.
+"""
+
+import re
+
+# WHO exports name their value column differently; first parseable one wins
+# (same order as extractValueFromRow() in js/app.js)
+WHO_VALUE_COLUMNS = [
+    'PERCENT_POP_N', 'Value', 'Numeric', 'VALUE',
+    'Rate', 'RATE', 'Prevalence', 'Incidence',
+    'RATE_PER_100000_N', 'RATE_PER_10000_N', 'RATE_PER_1000_N',
+    'RATE_PER_100_N', 'RATE_PER_CAPITA_N', 'RATE_N',
+    'INDEX_N', 'COUNT_N', 'AMOUNT_N'
+]
+
+# World Bank year columns look like "2024 [YR2024]"
+WB_YEAR_COLUMN = re.compile(r'^(\d{4}) \[YR\1\]$')
+
+# WHO DIM_* columns that describe the record rather than disaggregate the value
+WHO_METADATA_COLUMNS = {'DIM_TIME', 'DIM_TIME_TYPE', 'DIM_GEO_CODE_M49',
+                        'DIM_GEO_CODE_TYPE', 'DIM_PUBLISH_STATE_CODE'}
+
+# Observation columns, in order; everything but year and the numbers is a string
+STRING_COLUMNS = ['source', 'provider', 'indicator', 'indicator_name', 'country']
+NUMBER_COLUMNS = ['value', 'lower', 'upper']
+DIMENSION_COLUMNS = ['sex', 'age', 'metric', 'cause', 'rei', 'breakdown']
+COLUMNS = STRING_COLUMNS + ['year'] + NUMBER_COLUMNS + DIMENSION_COLUMNS
+
+# WHO dimensions given their own column; others go into 'breakdown'
+WHO_DIMENSIONS = {'DIM_SEX': 'sex', 'DIM_AGE': 'age'}
+
+
+def parse_number(raw):
+    """Parse a cell (string or already-typed number) as a finite float, or None"""
+    if raw is None or raw in ('', '..', 'N/A'):
+        return None
+    try:
+        number = float(raw)
+    except (TypeError, ValueError):
+        return None
+    if number != number or number in (float('inf'), float('-inf')):
+        return None
+    return number
+
+
+def parse_year(raw):
+    """Parse a year cell, or None"""
+    try:
+        return int(raw)
+    except (TypeError, ValueError):
+        return None
+
+
+def observation(source, provider, indicator, indicator_name, country, year, value, **dimensions):
+    """One long-format row with every store column present"""
+    row = dict.fromkeys(COLUMNS)
+    row.update(source=source, provider=provider, indicator=indicator,
+               indicator_name=indicator_name, country=country, year=year, value=value)
+    row.update(dimensions)
+    return row
+
+
+def iter_ihme_rows(source, rows):
+    """IHME rows: one observation per row (val with lower/upper bounds)"""
+    for row in rows:
+        year = parse_year(row.get('year'))
+        value = parse_number(row.get('val'))
+        if year is None or value is None:
+            continue
+        yield observation(
+            source, 'IHME', row.get('measure_name'), row.get('measure_name'),
+            row.get('location_name'), year, value,
+            lower=parse_number(row.get('lower')), upper=parse_number(row.get('upper')),
+            sex=row.get('sex_name') or None, age=row.get('age_name') or None,
+            metric=row.get('metric_name') or None, cause=row.get('cause_name') or None,
+            rei=row.get('rei_name') or None)
+
+
+def iter_world_bank_rows(source, rows):
+    """World Bank rows: one observation per non-missing year column"""
+    year_columns = [(int(m.group(1)), column) for column in rows[0]
+                    for m in [WB_YEAR_COLUMN.match(column or '')] if m]
+    for row in rows:
+        for year, column in year_columns:
+            value = parse_number(row.get(column))
+            if value is None:
+                continue
+            yield observation(
+                source, 'WB', row.get('Series Code'), row.get('Series Name'),
+                row.get('Country Name'), year, value)
+
+
+def iter_who_rows(source, rows):
+    """WHO rows: first parseable value column, DIM_* columns as dimensions"""
+    dimensions = [c for c in rows[0]
+                  if c and c.startswith('DIM_') and c not in WHO_METADATA_COLUMNS]
+    for row in rows:
+        year = parse_year(row.get('DIM_TIME'))
+        if year is None:
+            continue
+        value = next((number for number in map(parse_number, map(row.get, WHO_VALUE_COLUMNS))
+                      if number is not None), None)
+        if value is None:
+            continue
+
+        named = {WHO_DIMENSIONS[c]: row.get(c) or None for c in dimensions if c in WHO_DIMENSIONS}
+        breakdown = ';'.join(f"{c}={row[c]}" for c in dimensions
+                             if c not in WHO_DIMENSIONS and row.get(c))
+        yield observation(
+            source, 'WHO', row.get('IND_CODE'), row.get('IND_NAME'),
+            row.get('GEO_NAME_SHORT'), year, value, breakdown=breakdown or None, **named)
+
+
+def iter_long_rows(compiled_data):
+    """Flatten {file name: [row dicts]} into long-format observation dicts
+
+    Observations without a year or a numeric value are skipped.
+    """
+    for source, rows in compiled_data.items():
+        if not rows:
+            continue
+        if 'measure_name' in rows[0]:
+            yield from iter_ihme_rows(source, rows)
+        elif 'Country Name' in rows[0]:
+            yield from iter_world_bank_rows(source, rows)
+        else:
+            yield from iter_who_rows(source, rows)
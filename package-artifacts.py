@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Package the data artifacts for long-lived caching (run after compile-data.py)
+
+Every build output the app fetches (compiled data, index, cubes, coverage,
+country geometry, profiles and shards) is copied to data/packed/ under a
+content-hashed name, e.g.
+
+  data/indicator-index.json -> data/packed/indicator-index.3f9c0d2a61b7.json
+
+next to pre-compressed .gz and (when the brotli module is installed) .br
+variants for servers that serve precompressed files (nginx gzip_static /
+brotli_static, etc.). data/artifacts-manifest.json maps each logical path
+to its hashed file; js/app.js fetches through the manifest, so hashed
+files can be served with "Cache-Control: public, max-age=31536000,
+immutable" and only changed artifacts are downloaded again.
+
+Every script that rewrites a packaged artifact (compile-data.py,
+build-country-geometry.py) deletes the manifest, so the app falls back
+to the unpackaged files until this script is run again. Hand-edited
+inputs (indicator-categories.json, ihme-filter-spec.json,
+countries.geojson, ...) are not packaged: nothing would invalidate their
+hashed copies, so the app always fetches them directly.
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError:  # optional: gzip variants are always written
+    brotli = None
+
+DATA_DIR = Path('data')
+PACKED_DIR = DATA_DIR / 'packed'
+MANIFEST_FILE = DATA_DIR / 'artifacts-manifest.json'
+
+# Build outputs the app fetches (relative to DATA_DIR); written only by
+# compile-data.py and build-country-geometry.py, which delete the manifest
+ARTIFACT_PATTERNS = ['compiled-indicators.json', 'indicator-index.json', 'timeseries-cubes.json',
+                     'coverage.json', 'country-geometry.json', 'profiles/*.json', 'shards/*.json']
+
+# Characters of the SHA-256 kept in hashed file names
+HASH_LENGTH = 12
+
+
+def find_artifacts():
+    """Artifact paths to package, sorted"""
+    artifacts = set()
+    for pattern in ARTIFACT_PATTERNS:
+        artifacts.update(path for path in DATA_DIR.glob(pattern) if path != MANIFEST_FILE)
+    return sorted(artifacts)
+
+
+def hashed_path(path, digest):
+    """data/x/name.ext -> data/packed/x/name.<hash>.ext"""
+    relative = path.relative_to(DATA_DIR)
+    return PACKED_DIR / relative.parent / f"{path.stem}.{digest[:HASH_LENGTH]}{path.suffix}"
+
+
+def write_if_missing(path, produce):
+    """Write produce() to path unless it already exists (hashed names never change content)"""
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_name(path.name + '.tmp')
+        temp_path.write_bytes(produce())
+        os.replace(temp_path, path)
+    return path.stat().st_size
+
+
+def package_artifact(path):
+    """Write the hashed copy and compressed variants of one artifact; return its manifest entry"""
+    data = path.read_bytes()
+    digest = hashlib.sha256(data).hexdigest()
+    target = hashed_path(path, digest)
+
+    entry = {
+        'file': target.as_posix(),
+        'bytes': write_if_missing(target, lambda: data),
+        'sha256': digest,
+        'encodings': {}
+    }
+
+    # mtime=0 keeps the gzip output byte-identical across runs
+    gzip_file = target.with_name(target.name + '.gz')
+    entry['encodings']['gzip'] = {
+        'file': gzip_file.as_posix(),
+        'bytes': write_if_missing(gzip_file, lambda: gzip.compress(data, compresslevel=9, mtime=0))
+    }
+
+    if brotli is not None:
+        brotli_file = target.with_name(target.name + '.br')
+        entry['encodings']['br'] = {
+            'file': brotli_file.as_posix(),
+            'bytes': write_if_missing(brotli_file, lambda: brotli.compress(data, quality=11))
+        }
+
+    return entry
+
+
+def remove_stale_files(manifest):
+    """Delete packed files no manifest entry refers to"""
+    keep = set()
+    for entry in manifest['artifacts'].values():
+        keep.add(entry['file'])
+        keep.update(variant['file'] for variant in entry['encodings'].values())
+
+    removed = 0
+    for path in PACKED_DIR.rglob('*'):
+        if path.is_file() and path.as_posix() not in keep:
+            path.unlink()
+            removed += 1
+    return removed
+
+
+def package(jobs=1):
+    artifacts = find_artifacts()
+    print(f"Packaging {len(artifacts)} artifacts into {PACKED_DIR}/...")
+    if brotli is None:
+        print("   brotli module not installed: writing gzip variants only (pip install brotli)")
+
+    if jobs > 1 and len(artifacts) > 1:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(artifacts))) as pool:
+            entries = list(pool.map(package_artifact, artifacts, chunksize=8))
+    else:
+        entries = [package_artifact(path) for path in artifacts]
+
+    manifest = {
+        'version': 1,
+        'artifacts': {path.as_posix(): entry for path, entry in zip(artifacts, entries)}
+    }
+
+    temp_file = MANIFEST_FILE.with_name(MANIFEST_FILE.name + '.tmp')
+    with open(temp_file, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(temp_file, MANIFEST_FILE)
+
+    removed = remove_stale_files(manifest)
+
+    totals = {'raw': sum(entry['bytes'] for entry in entries)}
+    for encoding in ('gzip', 'br'):
+        sizes = [entry['encodings'][encoding]['bytes'] for entry in entries
+                 if encoding in entry['encodings']]
+        if sizes:
+            totals[encoding] = sum(sizes)
+
+    print(f"\nArtifact manifest written to {MANIFEST_FILE}")
+    for encoding, size in totals.items():
+        print(f"   {encoding}: {size / (1024 * 1024):.2f} MB")
+    if removed:
+        print(f"   Removed {removed} stale packed files")
+
+
+def job_count(value):
+    """argparse type for --jobs: a positive integer, or 0 for one per CPU"""
+    jobs = int(value)
+    if jobs < 0:
+        raise argparse.ArgumentTypeError('must be >= 0')
+    return jobs or os.cpu_count() or 1
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('-j', '--jobs', type=job_count, default=0,
+                        help='compress in N worker processes (default 0 = one per CPU)')
+    args = parser.parse_args()
+    os.chdir(Path(__file__).parent)
+    package(jobs=args.jobs)
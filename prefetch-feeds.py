@@ -0,0 +1,511 @@
+#!/usr/bin/env python3
+"""
+Prefetch the IFRC DREF, GDACS and EM-DAT feeds into per-country snapshot files
+
+The app used to query the live APIs on every page open: the IFRC appeal
+API (active DREFs, then up to 10 pages of past DREFs), the GDACS event
+list and the EM-DAT endpoint once per country. This script fetches the
+same feeds concurrently (asyncio, --concurrency requests in flight,
+retries with backoff on errors and 429/5xx), filters them to the target
+countries and dates the app shows, and writes compact snapshots:
+
+  data/feeds/<ISO3>.json     {"version": 1, "iso3", "country", "generated",
+                              "activeDrefs": [...], "drefs": [...],
+                              "gdacs": [...], "emdat": [...]}
+  data/feeds/manifest.json   {"version": 1, "generated",
+                              "feeds": {"<feed>": {"fetched", "expires", "ttl",
+                                                   "records", "responses"}},
+                              "countries": {"<ISO3>": {"country", "file", "<feed>": count}}}
+  data/feeds/dref-summary.json   per-country DREF totals for the map (see dref_summary.py)
+  data/feeds/timelines/<ISO3>.json   merged GDACS / EM-DAT / DREF timeline (see disaster_timeline.py)
+
+js/app.js loads a feed from the snapshots while the manifest says it has
+not expired, and falls back to the live API otherwise (or when a feed
+failed, which leaves its "expires" null).
+
+Raw responses are kept in .build-cache/feeds/http-cache.json with their
+ETag / Last-Modified. A response younger than its feed's TTL is reused
+without a request; an older one is revalidated with If-None-Match /
+If-Modified-Since, so an unchanged feed costs a 304. When a request
+fails after its retries, the cached response is used and the feed keeps
+its old expiry.
+
+Examples:
+  python prefetch-feeds.py                                   # e.g. from cron, hourly
+  python prefetch-feeds.py --force                           # revalidate every feed now
+  python prefetch-feeds.py --api-base http://127.0.0.1:9000  # against a local stub server
+"""
+
+import argparse
+import asyncio
+import gzip
+import http.client
+import json
+import math
+import os
+import time
+import urllib.error
+import urllib.request
+from datetime import date, datetime, timezone
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+
+import country_portfolios
+import disaster_timeline
+import dref_summary
+
+DATA_DIR = Path('data')
+FEEDS_DIR = DATA_DIR / 'feeds'
+MANIFEST_NAME = 'manifest.json'
+DREF_SUMMARY_NAME = 'dref-summary.json'
+TIMELINES_NAME = 'timelines'
+CACHE_FILE = Path('.build-cache') / 'feeds' / 'http-cache.json'
+CATEGORIES_FILE = DATA_DIR / 'indicator-categories.json'
+
+IFRC_BASE = 'https://goadmin.ifrc.org'
+GDACS_BASE = 'https://www.gdacs.org'
+ACTIVE_DREF_PATH = '/api/v2/appeal/?atype=0&status=0&limit=500'
+PAST_DREF_PATH = '/api/v2/appeal/?atype=0&limit=500'
+GDACS_PATH = '/gdacsapi/api/events/geteventlist/SEARCH'
+EMDAT_PATH = '/gdacsapi/api/Emdat/getemdatbyiso3?iso3={iso3}'
+
+# The public token js/app.js sends; IFRC_API_TOKEN overrides it
+DEFAULT_IFRC_TOKEN = '3f891db59f4e9fd16ba4f8be803d368a469a1276'
+
+# Past DREFs are paged; the app never read more than 10 pages
+PAGE_SIZE = 500
+MAX_PAGES = 10
+
+# Date windows of the app (past DREFs and EM-DAT since 2018, GDACS the last 5 years)
+SINCE = '2018-01-01'
+GDACS_YEARS = 5
+
+# Seconds a feed's snapshot stays fresh
+FEED_TTL = {
+    'activeDrefs': 60 * 60,
+    'drefs': 6 * 60 * 60,
+    'gdacs': 60 * 60,
+    'emdat': 7 * 24 * 60 * 60,
+}
+
+# Feeds a country timeline is built from
+TIMELINE_FEEDS = ['drefs', 'gdacs', 'emdat']
+
+# Fields kept per record (the ones js/app.js reads, plus ids)
+DREF_FIELDS = ['id', 'code', 'name', 'status', 'status_display', 'dtype', 'start_date', 'end_date',
+               'amount_requested', 'amount_funded', 'num_beneficiaries']
+GDACS_FIELDS = ['eventid', 'episodeid', 'eventtype', 'name', 'alertlevel', 'severity', 'severitydata',
+                'fromdate', 'todate', 'iso3', 'country']
+
+# Statuses worth retrying (others are reported at once)
+RETRY_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+USER_AGENT = 'href-indicators-prefetch/1'
+
+
+def http_get(url, headers, timeout):
+    """Blocking GET; returns (status, headers, body) with a 304 returned rather than raised"""
+    request = urllib.request.Request(url, headers=headers)
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            body = response.read()
+            if response.headers.get('Content-Encoding') == 'gzip':
+                body = gzip.decompress(body)
+            return response.status, response.headers, body
+    except urllib.error.HTTPError as error:
+        if error.code == 304:
+            return 304, error.headers, b''
+        raise
+
+
+def retry_delay(error, attempt, backoff):
+    """Seconds to wait before the next attempt: Retry-After if given, else exponential backoff"""
+    retry_after = getattr(error, 'headers', None) and error.headers.get('Retry-After')
+    if retry_after:
+        try:
+            return min(float(retry_after), 60.0)
+        except ValueError:
+            try:
+                return max(0.0, min(parsedate_to_datetime(retry_after).timestamp() - time.time(), 60.0))
+            except (TypeError, ValueError):
+                pass
+    return backoff * 2 ** attempt
+
+
+def is_retryable(error):
+    if isinstance(error, urllib.error.HTTPError):
+        return error.code in RETRY_STATUSES
+    return True
+
+
+class FeedClient:
+    """Bounded-concurrency JSON fetcher over the HTTP cache
+
+    get_json() returns (cache entry, response kind), the kind being
+    'cached' (fresh, no request), 'not-modified' (304), 'fetched' or
+    'stale' (the request failed; the old entry is returned).
+    """
+
+    def __init__(self, cache, concurrency=4, retries=3, timeout=30, backoff=1.0,
+                 token=None, api_base=None, force=False):
+        self.cache = cache
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.retries = retries
+        self.timeout = timeout
+        self.backoff = backoff
+        self.token = token
+        self.api_base = api_base.rstrip('/') if api_base else None
+        self.force = force
+        self.used = set()
+        self.stats = {'requests': 0, 'retries': 0}
+
+    def url(self, base, path):
+        """The feed URL (on --api-base when given)"""
+        return (self.api_base or base) + path
+
+    async def request(self, url, headers):
+        for attempt in range(self.retries + 1):
+            try:
+                async with self.semaphore:
+                    self.stats['requests'] += 1
+                    return await asyncio.to_thread(http_get, url, headers, self.timeout)
+            except (urllib.error.URLError, http.client.HTTPException, OSError) as error:
+                if attempt == self.retries or not is_retryable(error):
+                    raise
+                self.stats['retries'] += 1
+                await asyncio.sleep(retry_delay(error, attempt, self.backoff))
+
+    async def get_json(self, url, ttl, auth=False):
+        """The cached response of url, reused while younger than ttl and revalidated after"""
+        self.used.add(url)
+        entry = self.cache.get(url)
+        now = time.time()
+        if entry and not self.force and now - entry['fetched'] < ttl:
+            return entry, 'cached'
+
+        headers = {'Accept': 'application/json', 'Accept-Encoding': 'gzip', 'User-Agent': USER_AGENT}
+        if auth and self.token:
+            headers['Authorization'] = f"Token {self.token}"
+        if entry and entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry and entry.get('lastModified'):
+            headers['If-Modified-Since'] = entry['lastModified']
+
+        try:
+            status, response_headers, body = await self.request(url, headers)
+        except (urllib.error.URLError, http.client.HTTPException, OSError) as error:
+            if entry is None:
+                raise
+            print(f"   Warning: {url} failed ({error}); using the response of "
+                  f"{format_time(entry['fetched'])}")
+            return entry, 'stale'
+
+        if status == 304 and entry is not None:
+            entry['fetched'] = now
+            return entry, 'not-modified'
+        entry = {
+            'fetched': now,
+            'etag': response_headers.get('ETag'),
+            'lastModified': response_headers.get('Last-Modified'),
+            'data': json.loads(body)
+        }
+        self.cache[url] = entry
+        return entry, 'fetched'
+
+
+class Targets:
+    """The app's countries: {ISO3: name} with every spelling mapped to its ISO3"""
+
+    def __init__(self, categories):
+        self.names = {country['code']: country['name'] for country in categories['countries']}
+        by_name = {name: code for code, name in self.names.items()}
+        self.codes = dict(by_name)
+        for alias, name in country_portfolios.aliases().items():
+            if name in by_name:
+                self.codes[alias] = by_name[name]
+
+    def code(self, iso3=None, name=None):
+        """ISO3 of a target country (by code, else name), or None"""
+        if iso3 in self.names:
+            return iso3
+        return self.codes.get(name)
+
+
+def format_time(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat(timespec='seconds')
+
+
+def years_ago(years, today=None):
+    """ISO date `years` years before today (Feb 29 -> Feb 28)"""
+    today = today or date.today()
+    try:
+        return today.replace(year=today.year - years).isoformat()
+    except ValueError:
+        return today.replace(year=today.year - years, day=28).isoformat()
+
+
+def dref_country(dref):
+    country = dref.get('country') or dref.get('country_details') or {}
+    return country if isinstance(country, dict) else {}
+
+
+def compact_dref(dref, iso3, name):
+    record = {key: dref[key] for key in DREF_FIELDS if dref.get(key) is not None}
+    if isinstance(record.get('dtype'), dict):
+        record['dtype'] = {key: record['dtype'][key] for key in ('id', 'name') if key in record['dtype']}
+    record['country'] = {'iso3': iso3, 'name': name}
+    return record
+
+
+def compact_gdacs(feature):
+    properties = feature.get('properties') or {}
+    return {'type': 'Feature',
+            'properties': {key: properties[key] for key in GDACS_FIELDS if key in properties}}
+
+
+def compact_emdat(event):
+    return {key: value for key, value in event.items() if value not in (None, '', [], {})}
+
+
+def warn_undated(feed, values):
+    """Report records dropped by a date window because their date could not be read"""
+    if values:
+        print(f"   Warning: {feed}: skipped {len(values)} records without a valid date "
+              f"(e.g. {values[0]!r})")
+
+
+def group_drefs(drefs, targets, since=None):
+    """{ISO3: [compact DREF]} for target countries (started on or after since)"""
+    by_country = {}
+    undated = []
+    for dref in drefs:
+        country = dref_country(dref)
+        iso3 = targets.code(country.get('iso3'), country.get('name'))
+        if iso3 is None:
+            continue
+        if since:
+            start = disaster_timeline.day(dref.get('start_date'))
+            if start is None:
+                undated.append(dref.get('start_date'))
+            if not (start and start >= since):
+                continue
+        by_country.setdefault(iso3, []).append(compact_dref(dref, iso3, country.get('name')))
+    warn_undated('drefs', undated)
+    return by_country
+
+
+async def fetch_active_drefs(client, targets):
+    entry, kind = await client.get_json(client.url(IFRC_BASE, ACTIVE_DREF_PATH),
+                                        FEED_TTL['activeDrefs'], auth=True)
+    return group_drefs(entry['data'].get('results') or [], targets), [(entry, kind)]
+
+
+async def fetch_past_drefs(client, targets):
+    """All DREF pages (up to MAX_PAGES), the pages after the first fetched concurrently"""
+    url = client.url(IFRC_BASE, PAST_DREF_PATH)
+    first = await client.get_json(url, FEED_TTL['drefs'], auth=True)
+    pages = min(math.ceil((first[0]['data'].get('count') or 0) / PAGE_SIZE), MAX_PAGES)
+    rest = await asyncio.gather(*(client.get_json(f"{url}&offset={page * PAGE_SIZE}",
+                                                  FEED_TTL['drefs'], auth=True)
+                                  for page in range(1, pages)))
+    responses = [first] + list(rest)
+    drefs = [dref for entry, _ in responses for dref in entry['data'].get('results') or []]
+    return group_drefs(drefs, targets, since=SINCE), responses
+
+
+async def fetch_gdacs(client, targets):
+    entry, kind = await client.get_json(client.url(GDACS_BASE, GDACS_PATH), FEED_TTL['gdacs'])
+    since = years_ago(GDACS_YEARS)
+    by_country = {}
+    undated = []
+    for feature in entry['data'].get('features') or []:
+        properties = feature.get('properties') or {}
+        iso3 = properties.get('iso3') or properties.get('country')
+        if iso3 not in targets.names:
+            continue
+        start = disaster_timeline.day(properties.get('fromdate'))
+        if start is None:
+            undated.append(properties.get('fromdate'))
+        if not (start and start >= since):
+            continue
+        by_country.setdefault(iso3, []).append(compact_gdacs(feature))
+    warn_undated('gdacs', undated)
+    return by_country, [(entry, kind)]
+
+
+async def fetch_emdat(client, targets):
+    """One EM-DAT request per country, concurrently"""
+    codes = list(targets.names)
+    responses = await asyncio.gather(*(
+        client.get_json(client.url(GDACS_BASE, EMDAT_PATH.format(iso3=iso3)), FEED_TTL['emdat'])
+        for iso3 in codes))
+    by_country = {}
+    undated = []
+    for iso3, (entry, _) in zip(codes, responses):
+        events = []
+        for event in entry['data'] or []:
+            start = disaster_timeline.emdat_date(event)
+            if start is None:
+                undated.append(disaster_timeline.raw_start('emdat', event))
+            elif start >= SINCE:
+                events.append(compact_emdat(event))
+        if events:
+            by_country[iso3] = events
+    warn_undated('emdat', undated)
+    return by_country, list(responses)
+
+
+FEEDS = {
+    'activeDrefs': fetch_active_drefs,
+    'drefs': fetch_past_drefs,
+    'gdacs': fetch_gdacs,
+    'emdat': fetch_emdat,
+}
+
+
+def feed_summary(feed, by_country, responses):
+    """Manifest entry of a fetched feed; it expires with its oldest response"""
+    fetched = min(entry['fetched'] for entry, _ in responses)
+    kinds = {}
+    for _, kind in responses:
+        kinds[kind] = kinds.get(kind, 0) + 1
+    return {
+        'fetched': format_time(fetched),
+        'expires': format_time(fetched + FEED_TTL[feed]),
+        'ttl': FEED_TTL[feed],
+        'records': sum(len(records) for records in by_country.values()),
+        'responses': kinds
+    }
+
+
+def load_json(path, default):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return default
+
+
+def write_json(path, document, indent=None):
+    """Write atomically, so the app or the query server never reads a partial file"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_file = path.with_name(path.name + '.tmp')
+    with open(temp_file, 'w', encoding='utf-8') as f:
+        json.dump(document, f, indent=indent, separators=None if indent else (',', ':'))
+    os.replace(temp_file, path)
+
+
+async def fetch_feeds(client, targets):
+    """{feed: ({ISO3: records}, responses) or the exception it failed with}"""
+    results = await asyncio.gather(*(fetch(client, targets) for fetch in FEEDS.values()),
+                                   return_exceptions=True)
+    return dict(zip(FEEDS, results))
+
+
+def prefetch(output_dir=FEEDS_DIR, cache_file=CACHE_FILE, categories_file=CATEGORIES_FILE,
+             concurrency=4, retries=3, timeout=30, backoff=1.0, token=None, api_base=None, force=False):
+    """Fetch every feed and write the snapshots and manifest; returns the manifest"""
+    output_dir, cache_file = Path(output_dir), Path(cache_file)
+    targets = Targets(load_json(categories_file, None))
+    cache = load_json(cache_file, {})
+    client = FeedClient(cache, concurrency, retries, timeout, backoff,
+                        token or os.environ.get('IFRC_API_TOKEN') or DEFAULT_IFRC_TOKEN,
+                        api_base, force)
+
+    started = time.perf_counter()
+    results = asyncio.run(fetch_feeds(client, targets))
+    elapsed = time.perf_counter() - started
+
+    generated = format_time(time.time())
+    feeds = {}
+    snapshots = {iso3: {'version': 1, 'iso3': iso3, 'country': name, 'generated': generated}
+                 for iso3, name in targets.names.items()}
+    for feed, result in results.items():
+        if isinstance(result, BaseException):
+            print(f"   Warning: {feed} feed failed: {result}")
+            feeds[feed] = {'fetched': None, 'expires': None, 'ttl': FEED_TTL[feed],
+                           'records': 0, 'error': str(result)}
+            continue
+        by_country, responses = result
+        feeds[feed] = feed_summary(feed, by_country, responses)
+        for iso3, snapshot in snapshots.items():
+            snapshot[feed] = by_country.get(iso3, [])
+
+    for iso3, snapshot in snapshots.items():
+        write_json(output_dir / f"{iso3}.json", snapshot)
+    manifest = {
+        'version': 1,
+        'generated': generated,
+        'feeds': feeds,
+        'countries': {
+            iso3: dict({'country': snapshot['country'], 'file': f"{iso3}.json"},
+                       **{feed: len(snapshot[feed]) for feed in FEEDS if feed in snapshot})
+            for iso3, snapshot in snapshots.items()
+        }
+    }
+    write_json(output_dir / MANIFEST_NAME, manifest, indent=1)
+    # Keep only the responses of this run (e.g. pages past a shrunken count are dropped)
+    write_json(cache_file, {url: entry for url, entry in cache.items() if url in client.used})
+
+    # Derived files come last, and a record they cannot handle only costs its own file:
+    # the snapshots, manifest and cache above are already consistent
+    if feeds['drefs']['expires']:
+        try:
+            write_json(output_dir / DREF_SUMMARY_NAME,
+                       dref_summary.build_summary(snapshots, feeds['drefs']['fetched']))
+        except Exception as error:
+            # Drop the old file rather than serve it next to newer snapshots
+            (output_dir / DREF_SUMMARY_NAME).unlink(missing_ok=True)
+            print(f"   Warning: DREF summary not written: {error!r}")
+    if all(feeds[feed]['expires'] for feed in TIMELINE_FEEDS):
+        expires = min(feeds[feed]['expires'] for feed in TIMELINE_FEEDS)
+        for iso3, snapshot in snapshots.items():
+            timeline_file = output_dir / TIMELINES_NAME / f"{iso3}.json"
+            try:
+                write_json(timeline_file, disaster_timeline.build_timeline(snapshot, expires))
+            except Exception as error:
+                timeline_file.unlink(missing_ok=True)
+                print(f"   Warning: {iso3} timeline not written: {error!r}")
+
+    print(f"Feed snapshots written to {output_dir}/ ({len(snapshots)} countries, {elapsed:.2f}s, "
+          f"{client.stats['requests']} requests, {client.stats['retries']} retries)")
+    for feed, entry in feeds.items():
+        if entry['expires']:
+            responses = ', '.join(f"{count} {kind}" for kind, count in entry['responses'].items())
+            print(f"   {feed}: {entry['records']} records ({responses}), expires {entry['expires']}")
+        else:
+            print(f"   {feed}: failed; the app will use the live API")
+    return manifest
+
+
+def positive_int(value):
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError('must be >= 1')
+    return number
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--output-dir', type=Path,
+                        help=f'snapshot directory (default: {FEEDS_DIR})')
+    parser.add_argument('--cache-file', type=Path,
+                        help=f'HTTP response cache (default: {CACHE_FILE})')
+    parser.add_argument('--concurrency', type=positive_int, default=4,
+                        help='requests in flight at once (default: 4)')
+    parser.add_argument('--retries', type=int, default=3,
+                        help='retries per request on network errors, 429 and 5xx (default: 3)')
+    parser.add_argument('--timeout', type=float, default=30,
+                        help='seconds per request (default: 30)')
+    parser.add_argument('--force', action='store_true',
+                        help='revalidate every response, even ones younger than their TTL')
+    parser.add_argument('--api-base', metavar='URL',
+                        help='fetch every feed from this base URL instead of the IFRC and GDACS '
+                             'hosts (e.g. a local stub server)')
+    args = parser.parse_args()
+
+    # Paths given on the command line are relative to the caller's directory
+    output_dir = args.output_dir.resolve() if args.output_dir else FEEDS_DIR
+    cache_file = args.cache_file.resolve() if args.cache_file else CACHE_FILE
+    os.chdir(Path(__file__).parent)
+    prefetch(output_dir, cache_file, concurrency=args.concurrency, retries=args.retries,
+             timeout=args.timeout, api_base=args.api_base, force=args.force)
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""Query the indicator SQLite database (build it with: python compile-data.py --sqlite)
+
+Examples:
+  python query-indicators.py lookup "HALE (Healthy life expectancy)" --country Sudan
+  python query-indicators.py lookup NY.GNP.PCAP.CD --country SDN --year 2022 --year 2023
+  python query-indicators.py coverage --year 2023
+  python query-indicators.py indicators
+  python query-indicators.py sql "SELECT country, value FROM observation_view WHERE year = 2023 LIMIT 5"
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+import indicator_db
+
+
+def format_value(value):
+    """Six significant digits, or a grouped integer for large values"""
+    return f"{value:.6g}" if abs(value) < 1e5 else f"{value:,.0f}"
+
+
+def print_table(rows, columns):
+    """Print sqlite3.Row results as an aligned text table"""
+    cells = [[format_value(row[c]) if isinstance(row[c], float) else str(row[c] if row[c] is not None else '')
+              for c in columns] for row in rows]
+    widths = [max([len(c)] + [len(line[i]) for line in cells]) for i, c in enumerate(columns)]
+    print('  '.join(c.ljust(w) for c, w in zip(columns, widths)))
+    print('  '.join('-' * w for w in widths))
+    for line in cells:
+        print('  '.join(cell.ljust(w) for cell, w in zip(line, widths)))
+
+
+def run_lookup(connection, args):
+    rows = indicator_db.lookup_values(connection, args.indicator, args.country, args.year)
+    if not rows:
+        print(f"No data for {args.indicator}" + (f" in {args.country}" if args.country else ''))
+        return
+    columns = ['country', 'year', 'value', 'lower', 'upper', 'sex', 'age', 'metric', 'breakdown', 'source']
+    # Drop dimension columns that are empty for every result
+    columns = [c for c in columns if c in ('country', 'year', 'value', 'source') or any(r[c] for r in rows)]
+    print_table(rows, columns)
+
+
+def run_coverage(connection, args):
+    rows = indicator_db.coverage(connection, args.year, args.indicator)
+    print_table(rows, ['provider', 'indicator', 'year', 'countries', 'observations'])
+
+
+def run_indicators(connection, args):
+    rows = connection.execute("""
+        SELECT i.provider, i.code, i.name, COUNT(*) AS observations,
+               MIN(o.year) AS first_year, MAX(o.year) AS last_year
+        FROM indicators i JOIN observations o ON o.indicator_id = i.id
+        GROUP BY i.id ORDER BY i.provider, i.code
+    """).fetchall()
+    print_table(rows, ['provider', 'code', 'name', 'observations', 'first_year', 'last_year'])
+
+
+def run_sql(connection, args):
+    cursor = connection.execute(args.query)
+    rows = cursor.fetchall()
+    print_table(rows, [d[0] for d in cursor.description or []])
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', type=Path,
+                        help=f'database file (default: {indicator_db.DB_FILE})')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    lookup = commands.add_parser('lookup', help='values of one indicator (code or name)')
+    lookup.add_argument('indicator')
+    lookup.add_argument('--country', help='country name or ISO3 code')
+    lookup.add_argument('--year', type=int, action='append', help='limit to a year (repeatable)')
+    lookup.set_defaults(run=run_lookup)
+
+    summary = commands.add_parser('coverage', help='countries with data per indicator and year')
+    summary.add_argument('--year', type=int, action='append', help='limit to a year (repeatable)')
+    summary.add_argument('--indicator', help='limit to one indicator (code or name)')
+    summary.set_defaults(run=run_coverage)
+
+    listing = commands.add_parser('indicators', help='list indicators with their year range')
+    listing.set_defaults(run=run_indicators)
+
+    sql = commands.add_parser('sql', help='run a read-only SQL query (see observation_view)')
+    sql.add_argument('query')
+    sql.set_defaults(run=run_sql)
+
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    db_file = args.db.resolve() if args.db else indicator_db.DB_FILE
+    os.chdir(Path(__file__).parent)
+
+    try:
+        connection = indicator_db.connect(db_file)
+    except FileNotFoundError as e:
+        sys.exit(str(e))
+
+    start = time.perf_counter()
+    try:
+        args.run(connection, args)
+    except sqlite3.Error as e:
+        sys.exit(f"SQL error: {e}")
+    sys.stdout.flush()
+    print(f"\n({(time.perf_counter() - start) * 1000:.1f} ms)", file=sys.stderr)
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""Serve the app and answer indicator queries from in-memory indexes (asyncio, stdlib only)
+
+Loads the artifacts written by compile-data.py (indicator index, country
+profiles, time-series cubes) once, and answers:
+
+  GET /status                          artifact summary (the app probes it to use the server)
+  GET /indicator/{id}                  years with data
+  GET /indicator/{id}?year=2023        [{"country", "value"}, ...] for one year (404 without data)
+  GET /country/{iso3}/profile          ready-to-render country profile
+  GET /timeseries/{id}                 country x year cube for the trend chart
+
+Any other path is served as a static file of the app (index.html, css/,
+js/, data/, Portfolios/), so `python serve-indicators.py` replaces a
+plain static server. Every response carries an ETag and is gzipped when
+the client accepts it; If-None-Match is answered with 304. Query
+responses are serialised and compressed once and then served from
+memory. The artifacts are reloaded when compile-data.py rewrites the
+index, so a rebuild needs no restart.
+
+Examples:
+  python serve-indicators.py                       # http://127.0.0.1:8765/
+  python serve-indicators.py --port 8000 --data-dir data/portfolios/sahel-lake-chad
+"""
+
+import argparse
+import asyncio
+import gzip
+import hashlib
+import json
+import mimetypes
+from email.utils import formatdate
+from functools import lru_cache
+from http import HTTPStatus
+from pathlib import Path
+from urllib.parse import parse_qs, unquote, urlsplit
+
+ROOT = Path(__file__).resolve().parent
+DATA_DIR = ROOT / 'data'
+
+INDEX_NAME = 'indicator-index.json'
+CUBES_NAME = 'timeseries-cubes.json'
+PROFILES_NAME = 'profiles'
+
+# Static files served next to the query endpoints (paths under ROOT)
+STATIC_FILES = {'index.html', 'IFRC-Logo.png'}
+STATIC_DIRS = {'css', 'js', 'data', 'Portfolios'}
+
+# Bodies smaller than this are sent uncompressed
+MIN_GZIP_BYTES = 512
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/javascript', 'application/geo+json')
+
+# Seconds between checks for a rebuilt index
+RELOAD_INTERVAL = 1.0
+
+# Idle keep-alive connections are closed after this many seconds
+KEEP_ALIVE_TIMEOUT = 15
+MAX_HEADER_BYTES = 16 * 1024
+
+
+class Payload:
+    """A response body with its ETag and (when worthwhile) gzipped variant"""
+
+    def __init__(self, body, content_type, etag=None):
+        self.body = body
+        self.content_type = content_type
+        self.etag = etag or f'"{hashlib.sha256(body).hexdigest()[:20]}"'
+        compressible = content_type.startswith(COMPRESSIBLE_TYPES)
+        self.gzipped = (gzip.compress(body, compresslevel=6, mtime=0)
+                        if compressible and len(body) >= MIN_GZIP_BYTES else None)
+
+
+def json_payload(document):
+    return Payload(json.dumps(document, separators=(',', ':')).encode('utf-8'),
+                   'application/json; charset=utf-8')
+
+
+@lru_cache(maxsize=64)
+def static_payload(path, etag):
+    """Read (and compress) a static file once per version (etag: mtime and size)"""
+    content_type = mimetypes.guess_type(path.name)[0] or 'application/octet-stream'
+    if content_type.startswith('text/') or content_type in ('application/javascript', 'application/json'):
+        content_type += '; charset=utf-8'
+    return Payload(path.read_bytes(), content_type, etag)
+
+
+def accepts_gzip(headers):
+    encodings = [part.split(';')[0].strip() for part in headers.get('accept-encoding', '').split(',')]
+    return 'gzip' in encodings
+
+
+def etag_matches(headers, etag):
+    """True if If-None-Match lists the ETag (weak comparison, as for GET)"""
+    tags = [tag.strip() for tag in headers.get('if-none-match', '').split(',')]
+    return '*' in tags or etag in tags or f'W/{etag}' in tags
+
+
+class IndicatorServer:
+    """In-memory indexes over the compiled artifacts, and the HTTP handling around them"""
+
+    def __init__(self, data_dir=DATA_DIR):
+        self.data_dir = Path(data_dir)
+        self.index_file = self.data_dir / INDEX_NAME
+        self.loaded_version = None
+        self.next_check = 0.0
+        self.load()
+
+    def load(self):
+        """Read the index, profiles and cubes, and drop every cached response"""
+        stat = self.index_file.stat()
+        with open(self.index_file, 'r', encoding='utf-8') as f:
+            self.indicators = json.load(f)['indicators']
+
+        cubes_file = self.data_dir / CUBES_NAME
+        self.cubes = {}
+        if cubes_file.exists():
+            with open(cubes_file, 'r', encoding='utf-8') as f:
+                self.cubes = json.load(f)['indicators']
+
+        self.profiles = {}
+        for profile_file in sorted((self.data_dir / PROFILES_NAME).glob('*.json')):
+            with open(profile_file, 'r', encoding='utf-8') as f:
+                self.profiles[profile_file.stem.upper()] = json.load(f)
+
+        self.loaded_version = (stat.st_mtime_ns, stat.st_size)
+        self.responses = {}
+        print(f"Loaded {len(self.indicators)} indicators, {len(self.profiles)} profiles, "
+              f"{len(self.cubes)} cubes from {self.data_dir}")
+
+    def maybe_reload(self, now):
+        """Reload when compile-data.py has rewritten the index (checked once per interval)"""
+        if now < self.next_check:
+            return
+        self.next_check = now + RELOAD_INTERVAL
+        try:
+            stat = self.index_file.stat()
+        except OSError:
+            return
+        if (stat.st_mtime_ns, stat.st_size) != self.loaded_version:
+            try:
+                self.load()
+            except (OSError, ValueError) as e:
+                # A build may still be writing; keep serving the previous data
+                print(f"Reload failed, keeping previous data: {e}")
+
+    def query(self, path, params):
+        """(status, Payload) for a query path, or None when the path is not a query"""
+        parts = [unquote(part) for part in path.strip('/').split('/')]
+
+        if parts == ['status']:
+            return self.cached(('status',), lambda: {
+                'version': 1,
+                'indicators': len(self.indicators),
+                'profiles': len(self.profiles),
+                'cubes': len(self.cubes),
+                'built': self.loaded_version[0] // 1_000_000_000
+            })
+
+        if len(parts) == 2 and parts[0] == 'indicator':
+            indicator_id = parts[1]
+            entry = self.indicators.get(indicator_id)
+            if entry is None:
+                return self.error(HTTPStatus.NOT_FOUND, f"Unknown indicator: {indicator_id}")
+            if 'year' not in params:
+                return self.cached(('years', indicator_id),
+                                   lambda: {'indicator': indicator_id, 'years': entry['years']})
+            try:
+                year = int(params['year'][0])
+            except ValueError:
+                return self.error(HTTPStatus.BAD_REQUEST, f"Invalid year: {params['year'][0]}")
+            # Only years with data are cached, so clients cannot grow the cache with arbitrary years
+            values = entry['values'].get(str(year))
+            if values is None:
+                return self.error(HTTPStatus.NOT_FOUND, f"No data for {indicator_id} in {year}")
+            return self.cached(('values', indicator_id, year), lambda: {
+                'indicator': indicator_id,
+                'year': year,
+                'values': [{'country': country, 'value': value} for country, value in values.items()]
+            })
+
+        if len(parts) == 3 and parts[0] == 'country' and parts[2] == 'profile':
+            code = parts[1].upper()
+            if code not in self.profiles:
+                return self.error(HTTPStatus.NOT_FOUND, f"No profile for {code}")
+            return self.cached(('profile', code), lambda: self.profiles[code])
+
+        if len(parts) == 2 and parts[0] == 'timeseries':
+            indicator_id = parts[1]
+            if indicator_id not in self.cubes:
+                return self.error(HTTPStatus.NOT_FOUND, f"No time series for {indicator_id}")
+            return self.cached(('timeseries', indicator_id),
+                               lambda: dict(self.cubes[indicator_id], indicator=indicator_id))
+
+        return None
+
+    def cached(self, key, build):
+        """A 200 response, serialised and compressed on first use"""
+        if key not in self.responses:
+            self.responses[key] = json_payload(build())
+        return HTTPStatus.OK, self.responses[key]
+
+    def error(self, status, message):
+        return status, json_payload({'error': message})
+
+    async def static(self, path):
+        """(status, Payload) for a file of the app"""
+        relative = unquote(path).lstrip('/') or 'index.html'
+        parts = Path(relative).parts
+        if not parts or ('..' in parts) or (relative not in STATIC_FILES and parts[0] not in STATIC_DIRS):
+            return self.error(HTTPStatus.NOT_FOUND, f"Not found: {path}")
+
+        file_path = ROOT / relative
+        try:
+            stat = file_path.stat()
+        except OSError:
+            return self.error(HTTPStatus.NOT_FOUND, f"Not found: {path}")
+        if not file_path.is_file():
+            return self.error(HTTPStatus.NOT_FOUND, f"Not found: {path}")
+
+        etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+        loop = asyncio.get_running_loop()
+        # Reading and compressing large files happens off the event loop
+        payload = await loop.run_in_executor(None, static_payload, file_path, etag)
+        return HTTPStatus.OK, payload
+
+    async def respond(self, method, target, headers):
+        """Response bytes for one request"""
+        self.maybe_reload(asyncio.get_running_loop().time())
+
+        if method not in ('GET', 'HEAD'):
+            status, payload = self.error(HTTPStatus.METHOD_NOT_ALLOWED, f"Method not allowed: {method}")
+        else:
+            url = urlsplit(target)
+            result = self.query(url.path, parse_qs(url.query))
+            status, payload = result if result is not None else await self.static(url.path)
+
+        response_headers = {
+            'Date': formatdate(usegmt=True),
+            'Access-Control-Allow-Origin': '*',
+            'Cache-Control': 'no-cache',
+            'Vary': 'Accept-Encoding',
+        }
+        if status == HTTPStatus.METHOD_NOT_ALLOWED:
+            response_headers['Allow'] = 'GET, HEAD'
+
+        body = payload.body
+        if status == HTTPStatus.OK:
+            response_headers['ETag'] = payload.etag
+            if etag_matches(headers, payload.etag):
+                status, body = HTTPStatus.NOT_MODIFIED, b''
+        if status != HTTPStatus.NOT_MODIFIED:
+            response_headers['Content-Type'] = payload.content_type
+            if payload.gzipped is not None and accepts_gzip(headers):
+                body = payload.gzipped
+                response_headers['Content-Encoding'] = 'gzip'
+            response_headers['Content-Length'] = str(len(body))
+
+        head = f"HTTP/1.1 {status.value} {status.phrase}\r\n" + ''.join(
+            f"{name}: {value}\r\n" for name, value in response_headers.items()) + "\r\n"
+        return head.encode('latin-1') + (b'' if method == 'HEAD' else body)
+
+    async def handle(self, reader, writer):
+        """Serve requests on one connection (HTTP/1.1 keep-alive)"""
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), KEEP_ALIVE_TIMEOUT)
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError,
+                        asyncio.TimeoutError, ConnectionError):
+                    break
+
+                lines = head.decode('latin-1').split('\r\n')
+                try:
+                    method, target, version = lines[0].split(' ')
+                except ValueError:
+                    writer.write(b"HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+                    break
+                headers = {}
+                for line in lines[1:]:
+                    name, _, value = line.partition(':')
+                    if name:
+                        headers[name.strip().lower()] = value.strip()
+
+                if headers.get('content-length', '0') != '0':
+                    # No endpoint takes a body; discard it to keep the connection usable
+                    await reader.readexactly(int(headers['content-length']))
+
+                writer.write(await self.respond(method, target, headers))
+                await writer.drain()
+
+                connection = headers.get('connection', '').lower()
+                if connection == 'close' or (version == 'HTTP/1.0' and connection != 'keep-alive'):
+                    break
+        except (ConnectionError, ValueError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(host, port, data_dir):
+    server = IndicatorServer(data_dir)
+    listener = await asyncio.start_server(server.handle, host, port, limit=MAX_HEADER_BYTES,
+                                          backlog=1024)
+    print(f"Serving on http://{host}:{port}/ (Ctrl+C to stop)")
+    async with listener:
+        await listener.serve_forever()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1', help='address to bind (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8765, help='port (default: 8765)')
+    parser.add_argument('--data-dir', type=Path, default=DATA_DIR,
+                        help='directory with the compile-data.py artifacts (default: data/; '
+                             'a portfolio build: data/portfolios/<id>/)')
+    args = parser.parse_args()
+
+    if not (args.data_dir / INDEX_NAME).exists():
+        parser.error(f"{args.data_dir / INDEX_NAME} not found; run: python compile-data.py")
+    try:
+        asyncio.run(serve(args.host, args.port, args.data_dir))
+    except KeyboardInterrupt:
+        pass
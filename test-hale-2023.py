@@ -1,14 +1,13 @@
 #!/usr/bin/env python3
 """Test HALE 2023 data availability"""
 
-import json
+import data_access
 
 print("="*70)
 print("CHECKING HALE 2023 IN COMPILED DATA")
 print("="*70)
 
-with open('data/compiled-indicators.json', 'r', encoding='utf-8') as f:
-    compiled_data = json.load(f)
+compiled_data = data_access.load_compiled()
 
 print(f"\nTotal files in compiled data: {len(compiled_data)}")
 
@@ -17,8 +16,7 @@ for filename in sorted(compiled_data.keys()):
     if 'IHME' not in filename:
         continue
 
-    rows = compiled_data[filename]
-    hale_rows = [r for r in rows if r.get('measure_name') == 'HALE (Healthy life expectancy)']
+    hale_rows = compiled_data[filename].where(measure_name='HALE (Healthy life expectancy)')
 
     if hale_rows:
         years = {}
@@ -33,7 +31,8 @@ for filename in sorted(compiled_data.keys()):
             print(f"    {year}: {years[year]} rows")
 
         # Show sample 2023 data if exists
-        hale_2023 = [r for r in hale_rows if r.get('year') == '2023']
+        hale_2023 = compiled_data[filename].where(measure_name='HALE (Healthy life expectancy)',
+                                                  year='2023')
         if hale_2023:
             print(f"  Sample 2023 data:")
             for row in hale_2023[:5]:
@@ -46,9 +45,7 @@ print("="*70)
 all_hale = []
 for filename in compiled_data.keys():
     if 'IHME' in filename:
-        rows = compiled_data[filename]
-        hale_rows = [r for r in rows if r.get('measure_name') == 'HALE (Healthy life expectancy)']
-        all_hale.extend(hale_rows)
+        all_hale.extend(compiled_data[filename].where(measure_name='HALE (Healthy life expectancy)'))
 
 years_summary = {}
 for row in all_hale:
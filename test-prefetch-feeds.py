@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""Test prefetch-feeds.py against a local stub of the IFRC and GDACS APIs"""
+
+import hashlib
+import importlib.util
+import json
+import tempfile
+import threading
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+ROOT = Path(__file__).resolve().parent
+
+
+def load_script(file_name):
+    path = ROOT / file_name
+    spec = importlib.util.spec_from_file_location(path.stem.replace('-', '_'), path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+prefetch_feeds = load_script('prefetch-feeds.py')
+
+
+def dref(code, iso3, name, start_date, status=0):
+    return {'id': code, 'code': f"MDR{code}", 'name': f"{name} flood", 'status': status,
+            'status_display': 'Active' if status == 0 else 'Closed', 'atype': 0,
+            'dtype': {'id': 12, 'name': 'Flood', 'summary': '...'}, 'start_date': start_date,
+            'end_date': None, 'amount_requested': 250000, 'amount_funded': 100000,
+            'num_beneficiaries': 5000, 'country': {'iso3': iso3, 'name': name, 'id': 1},
+            'region': 2, 'created_at': '2024-01-01T00:00:00Z'}
+
+
+PAST_DREFS = ([dref(i, 'AFG', 'Afghanistan', f"{2015 + i % 10}-03-01T00:00:00Z", i % 2) for i in range(700)]
+              + [dref(900, 'FRA', 'France', '2024-01-01T00:00:00Z'),
+                 dref(901, None, 'DR Congo', '2023-06-01T00:00:00Z'),
+                 dref(902, 'AFG', 'Afghanistan', '2022-05-04T00:00:00Z', 1),
+                 dref(903, 'SOM', 'Somalia', '2022-11-20T00:00:00Z', 1),
+                 dref(904, 'SOM', 'Somalia', '05/03/2023', 1)])
+ACTIVE_DREFS = [d for d in PAST_DREFS if d['status'] == 0][:5]
+# GDACS keeps a rolling 5-year window, so its events (and the EM-DAT record of the same
+# earthquake) are dated from today; the DREF and EM-DAT cut-off is the fixed SINCE
+QUAKE = date.today() - timedelta(days=30)
+
+
+def quake_day(offset):
+    return (QUAKE + timedelta(days=offset)).isoformat()
+
+
+GDACS = {'type': 'FeatureCollection', 'features': [
+    {'type': 'Feature', 'geometry': {'type': 'Point', 'coordinates': [65, 33]},
+     'properties': {'eventid': 1, 'eventtype': 'EQ', 'name': 'Earthquake in Afghanistan',
+                    'alertlevel': 'Orange', 'iso3': 'AFG', 'country': 'Afghanistan',
+                    'fromdate': f"{quake_day(0)}T00:00:00", 'todate': f"{quake_day(1)}T00:00:00",
+                    'htmldescription': 'x' * 500, 'url': {'report': 'https://example.org'}}},
+    {'type': 'Feature', 'properties': {'eventid': 2, 'eventtype': 'FL', 'iso3': 'AFG',
+                                       'fromdate': '2001-01-01T00:00:00'}},
+    {'type': 'Feature', 'properties': {'eventid': 3, 'eventtype': 'TC', 'iso3': 'PHL',
+                                       'fromdate': f"{quake_day(-30)}T00:00:00"}},
+]}
+EMDAT = {'AFG': [{'disastertype': 'Flood', 'fromDate': '2022-05-01', 'totaldeaths': 12, 'comment': None},
+                 {'disastertype': 'Drought', 'startyear': 2010},
+                 {'disastertype': 'Earthquake', 'fromDate': quake_day(-3), 'toDate': quake_day(0),
+                  'totaldeaths': 40}],
+         # Dates as the API sometimes sends them: float years, no zero padding, month/day/year
+         'ETH': [{'disastertype': 'Drought', 'startyear': 2019.0},
+                 {'disastertype': 'Flood', 'fromDate': '2022-5-3'},
+                 {'disastertype': 'Storm', 'fromDate': '05/10/2023'},
+                 {'disastertype': 'Flood', 'fromDate': 'not a date'},
+                 {'disastertype': 'Flood', 'startyear': '2017.0'}]}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Serves the four endpoints with ETags; /gdacsapi/api/events fails once with a 503"""
+
+    requests = []
+    failures = {'gdacs': 1}
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        StubHandler.requests.append(self.path)
+        if url.path == '/api/v2/appeal/':
+            if self.headers.get('Authorization') != 'Token test-token':
+                return self.send_error(401)
+            drefs = ACTIVE_DREFS if query.get('status') == ['0'] else PAST_DREFS
+            offset = int(query.get('offset', ['0'])[0])
+            body = {'count': len(drefs), 'results': drefs[offset:offset + 500]}
+        elif url.path.endswith('/geteventlist/SEARCH'):
+            if StubHandler.failures['gdacs']:
+                StubHandler.failures['gdacs'] -= 1
+                return self.send_error(503)
+            body = GDACS
+        elif url.path.endswith('/getemdatbyiso3'):
+            body = EMDAT.get(query['iso3'][0], [])
+        else:
+            return self.send_error(404)
+
+        data = json.dumps(body).encode('utf-8')
+        etag = '"' + hashlib.md5(data).hexdigest() + '"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def run(output_dir, cache_file, api_base, force=False):
+    StubHandler.requests = []
+    return prefetch_feeds.prefetch(output_dir, cache_file, ROOT / 'data' / 'indicator-categories.json',
+                                   backoff=0.01, token='test-token', api_base=api_base, force=force)
+
+
+def check(label, condition):
+    print(f"  {'PASS' if condition else 'FAIL'}: {label}")
+    return condition
+
+
+server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+threading.Thread(target=server.serve_forever, daemon=True).start()
+api_base = f"http://127.0.0.1:{server.server_address[1]}"
+
+print("=" * 70)
+print("PREFETCH AGAINST A STUB SERVER")
+print("=" * 70)
+
+results = []
+with tempfile.TemporaryDirectory() as temp:
+    output_dir, cache_file = Path(temp) / 'feeds', Path(temp) / 'http-cache.json'
+
+    print("\nFirst run:")
+    manifest = run(output_dir, cache_file, api_base)
+    first_requests = len(StubHandler.requests)
+    afg = json.loads((output_dir / 'AFG.json').read_text())
+    cod = json.loads((output_dir / 'COD.json').read_text())
+    results += [
+        check('one file per target country', len(list(output_dir.glob('???.json'))) == 25),
+        check('past DREF pages fetched (2 pages + 25 EM-DAT + active + GDACS retry)',
+              first_requests == 2 + 25 + 1 + 2),
+        check('past DREFs filtered to target countries since 2018',
+              len(afg['drefs']) == sum(1 for d in PAST_DREFS
+                                       if d['country']['iso3'] == 'AFG' and d['start_date'] >= '2018')),
+        check('DREF matched by country alias', len(cod['drefs']) == 1),
+        check('DREFs compacted', set(afg['drefs'][0]) <= set(prefetch_feeds.DREF_FIELDS) | {'country'}),
+        check('GDACS filtered to target countries and last 5 years',
+              [e['properties']['eventid'] for e in afg['gdacs']] == [1]),
+        check('GDACS geometry and descriptions dropped', 'htmldescription' not in afg['gdacs'][0]['properties']),
+        check('EM-DAT filtered since 2018 and nulls dropped', afg['emdat'][:1] == [
+            {'disastertype': 'Flood', 'fromDate': '2022-05-01', 'totaldeaths': 12}] and len(afg['emdat']) == 2),
+        check('manifest lists every feed with an expiry',
+              all(manifest['feeds'][feed]['expires'] for feed in prefetch_feeds.FEEDS)),
+    ]
+
+    summary = json.loads((output_dir / 'dref-summary.json').read_text())
+    afg_summary = summary['countries']['AFG']
+    results += [
+        check('DREF summary built from the snapshot', summary['fetched'] == manifest['feeds']['drefs']['fetched']),
+        check('DREF summary totals match the snapshot',
+              afg_summary['totals']['count'] == len(afg['drefs'])
+              and afg_summary['totals']['active'] == sum(1 for d in afg['drefs'] if d['status'] == 0)
+              and afg_summary['totals']['amountRequested'] == 250000 * len(afg['drefs'])),
+        check('DREF summary per year adds up',
+              sum(entry['count'] for entry in afg_summary['years'].values()) == len(afg['drefs'])),
+        check('DREF summary per hazard', afg_summary['hazards']['Flood']['count'] == len(afg['drefs'])),
+        check('DREF summary lists the newest operations',
+              [d['start_date'] for d in afg_summary['recent']]
+              == sorted((d['start_date'] for d in afg['drefs']), reverse=True)[:5]),
+        check('countries without DREFs left out of the summary', 'ETH' not in summary['countries']),
+        check('DREF summary reads non-ISO start dates',
+              list(summary['countries']['SOM']['years']) == ['2023', '2022']
+              and [d['code'] for d in summary['countries']['SOM']['recent']] == ['MDR904', 'MDR903']),
+    ]
+
+    timeline = json.loads((output_dir / 'timelines' / 'AFG.json').read_text())
+    disasters = [event for event in timeline['events'] if event['kind'] == 'disaster']
+    quake = next(event for event in disasters if event['hazard'] == 'earthquake')
+    flood = next(event for event in disasters if event['hazard'] == 'flood')
+    results += [
+        check('timeline merges the GDACS and EM-DAT earthquake',
+              len(disasters) == 2 and quake['sources'] == ['emdat', 'gdacs']
+              and (quake['start'], quake['end'], quake['deaths'], quake['alertlevel'])
+              == (quake_day(-3), quake_day(1), 40, 'Orange')),
+        check('timeline links the DREF of the EM-DAT flood to it',
+              [dref['code'] for dref in flood.get('drefs', [])] == ['MDR902'] and 'drefs' not in quake),
+        check('timeline keeps every other DREF once, standalone',
+              sum(event['kind'] == 'dref' for event in timeline['events']) == len(afg['drefs']) - 1),
+        check('timeline sorted by start date',
+              [event['start'] for event in timeline['events']]
+              == sorted(event['start'] for event in timeline['events'])),
+        check('timeline dates normalised and unreadable ones skipped',
+              [event['start'] for event in json.loads((output_dir / 'timelines' / 'ETH.json').read_text())['events']]
+              == ['2019-01-01', '2022-05-03', '2023-05-10']),
+        check('a record without a readable date does not fail the timeline',
+              prefetch_feeds.disaster_timeline.build_timeline(
+                  {'iso3': 'XXX', 'country': 'X', 'emdat': [{'fromDate': '2022.0-01-01'}],
+                   'drefs': [{'start_date': '13/45/2022'}]}, None)['events'] == []),
+        check('timeline expires with its earliest feed',
+              timeline['expires'] == min(manifest['feeds'][feed]['expires'] for feed in ('drefs', 'gdacs', 'emdat'))),
+    ]
+
+    print("\nSecond run (within the TTL):")
+    run(output_dir, cache_file, api_base)
+    results.append(check('no requests while fresh', StubHandler.requests == []))
+    results.append(check('snapshot unchanged', json.loads((output_dir / 'AFG.json').read_text())['drefs']
+                         == afg['drefs']))
+
+    print("\nThird run (--force):")
+    manifest = run(output_dir, cache_file, api_base, force=True)
+    results.append(check('every response revalidated with a 304',
+                         all(set(entry['responses']) == {'not-modified'}
+                             for entry in manifest['feeds'].values())))
+    results.append(check('snapshot unchanged after 304s',
+                         json.loads((output_dir / 'AFG.json').read_text())['emdat'] == afg['emdat']))
+
+server.shutdown()
+print(f"\n{sum(results)}/{len(results)} checks passed")
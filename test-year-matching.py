@@ -1,14 +1,14 @@
 #!/usr/bin/env python3
 """Test if year matching works correctly"""
 
-import json
+import ihme_filters
+import data_access
 
 print("="*70)
 print("TESTING YEAR MATCHING FOR HALE 2023")
 print("="*70)
 
-with open('data/compiled-indicators.json', 'r', encoding='utf-8') as f:
-    compiled_data = json.load(f)
+compiled_data = data_access.load_compiled()
 
 # Simulate what the JavaScript does
 indicatorId = 'HALE (Healthy life expectancy)'
@@ -18,29 +18,17 @@ print(f"\nLooking for: {indicatorId}, year: {year} (type: {type(year)})")
 
 data = []
 
-for fileName, rows in compiled_data.items():
+for fileName, table in compiled_data.items():
     if 'IHME' not in fileName:
         continue
 
     print(f"\nChecking file: {fileName}")
 
-    for rowData in rows:
-        measureName = rowData.get('measure_name')
-        if measureName != indicatorId:
-            continue
+    measureRows = table.where(measure_name=indicatorId)
 
+    # Apply the shared aggregate filter (data/ihme-filter-spec.json)
+    for rowData in ihme_filters.filter_rows(measureRows):
         rowYear = rowData.get('year')
-        ageName = rowData.get('age_name')
-        sexName = rowData.get('sex_name')
-        metricName = rowData.get('metric_name')
-        causeName = rowData.get('cause_name')
-        reiName = rowData.get('rei_name')
-
-        # Apply filtering
-        if ageName != '0-6 days' or sexName != 'Both' or metricName != 'Years':
-            continue
-        if causeName or reiName:
-            continue
 
         # Check year - this is the critical part
         # JavaScript uses: if (rowYear == year)
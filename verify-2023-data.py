@@ -1,12 +1,10 @@
 #!/usr/bin/env python3
 """Verify 2023 data was compiled correctly"""
 
-import json
-from pathlib import Path
+import data_access
 
 # Load compiled data
-with open('data/compiled-indicators.json', 'r', encoding='utf-8') as f:
-    compiled_data = json.load(f)
+compiled_data = data_access.load_compiled()
 
 print("VERIFICATION: 2023 IHME Data in Compiled JSON")
 print("="*70)
@@ -17,22 +15,16 @@ ihme_files = [f for f in compiled_data.keys() if 'IHME' in f]
 print(f"\nTotal IHME files in compiled data: {len(ihme_files)}")
 
 for filename in sorted(ihme_files):
-    rows = compiled_data[filename]
+    table = compiled_data[filename]
 
     # Count rows by year
-    year_counts = {}
-    measure_counts = {}
+    year_counts = {year: len(positions) for year, positions in table.index('year').items()}
+    measure_counts = {measure: len(positions)
+                      for measure, positions in table.index('measure_name').items()}
 
-    for row in rows:
-        year = row.get('year', 'N/A')
-        measure = row.get('measure_name', 'N/A')
-
-        year_counts[year] = year_counts.get(year, 0) + 1
-        measure_counts[measure] = measure_counts.get(measure, 0) + 1
-
-    if rows:
+    if len(table):
         print(f"\n{filename}")
-        print(f"  Total rows: {len(rows)}")
+        print(f"  Total rows: {len(table)}")
         print(f"  Years: {dict(sorted(year_counts.items()))}")
         print(f"  Measures: {list(measure_counts.keys())}")
 
@@ -44,16 +36,12 @@ print("="*70)
 measure_year_data = {}
 
 for filename in ihme_files:
-    rows = compiled_data[filename]
-    for row in rows:
-        measure = row.get('measure_name', 'Unknown')
-        year = row.get('year', 'Unknown')
-
+    for (measure, year), rows in compiled_data[filename].group_by('measure_name', 'year').items():
         key = f"{measure}"
         if key not in measure_year_data:
             measure_year_data[key] = {}
 
-        measure_year_data[key][year] = measure_year_data[key].get(year, 0) + 1
+        measure_year_data[key][year] = measure_year_data[key].get(year, 0) + len(rows)
 
 for measure in sorted(measure_year_data.keys()):
     years = measure_year_data[measure]
@@ -1,31 +1,27 @@
 #!/usr/bin/env python3
-"""Verify the consolidated IHME file"""
+"""Verify the consolidated IHME file
 
-import csv
-from pathlib import Path
-from collections import defaultdict
+Reads the compiled coverage bitsets (data/coverage.json, written by
+compile-data.py) instead of rescanning the CSV; rebuild them after
+re-running the consolidation.
+"""
 
-portfolios_dir = Path('Portfolios')
-consolidated_file = portfolios_dir / 'IHME_GBD_ALL_YEARS_CONSOLIDATED.csv'
+import indicator_coverage
+
+consolidated_file = 'IHME_GBD_ALL_YEARS_CONSOLIDATED.csv'
 
 print("="*70)
 print("VERIFYING CONSOLIDATED IHME FILE")
 print("="*70)
 
-# Count rows by measure-year-country
-data_by_measure_year = defaultdict(lambda: defaultdict(set))
-total_rows = 0
-
-with open(consolidated_file, 'r', encoding='utf-8') as f:
-    reader = csv.DictReader(f)
-
-    for row in reader:
-        total_rows += 1
-        measure = row.get('measure_name', '')
-        year = row.get('year', '')
-        country = row.get('location_name', '')
-
-        data_by_measure_year[measure][year].add(country)
+# Countries by measure-year
+coverage = indicator_coverage.load()
+data_by_measure_year = {
+    measure: {year: coverage.countries_with_data(measure, year, source=consolidated_file)
+              for year in coverage.years(measure, source=consolidated_file)}
+    for measure in coverage.series(consolidated_file)
+}
+total_rows = coverage.source_rows(consolidated_file)
 
 print(f"\nTotal rows: {total_rows:,}")
 print(f"Total measures: {len(data_by_measure_year)}")
@@ -49,8 +45,8 @@ measures_with_2023 = []
 measures_without_2023 = []
 
 for measure in sorted(data_by_measure_year.keys()):
-    if '2023' in data_by_measure_year[measure]:
-        countries_2023 = len(data_by_measure_year[measure]['2023'])
+    if 2023 in data_by_measure_year[measure]:
+        countries_2023 = len(data_by_measure_year[measure][2023])
         measures_with_2023.append((measure, countries_2023))
         print(f"[YES] {measure}: {countries_2023} countries")
     else: